@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AffiliationAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'affiliation_app'
+
+    def ready(self):
+        # connect catalog cache invalidation
+        from . import signals
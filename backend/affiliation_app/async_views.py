@@ -0,0 +1,31 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException
+from rest_framework.status import HTTP_200_OK, HTTP_304_NOT_MODIFIED
+from user_app.async_views import api_error
+from user_app.authentication import aauthenticate
+from .cache import aget_catalog
+from .views import AllAffiliations, catalog_headers, not_modified
+
+# keyset pages and projections still go through the DRF view
+_paged = AllAffiliations.as_view()
+
+
+class AsyncAllAffiliations(View):
+    '''Async AllAffiliations: the cached catalog (or a 304) served without leaving the event loop'''
+
+    async def get(self, request):
+        if {"cursor", "limit", "fields"} & set(request.GET):
+            return await sync_to_async(_paged)(request)
+        # the endpoint is public, but like the DRF view a bad token is still rejected
+        if request.headers.get("Authorization"):
+            try:
+                await aauthenticate(request)
+            except APIException as e:
+                return api_error(e)
+        catalog = await aget_catalog()
+        headers = catalog_headers(catalog)
+        if not_modified(request, catalog):
+            return HttpResponse(status=HTTP_304_NOT_MODIFIED, headers=headers)
+        return HttpResponse(catalog["body"], content_type="application/json", status=HTTP_200_OK, headers=headers)
@@ -0,0 +1,114 @@
+import hashlib
+import uuid
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from core_app import asynccache
+from core_app.fastpath import values_rows
+from core_app.renderers import dumps
+from .models import Affiliation
+from .serializers import AffiliationSerializer
+
+VERSION_KEY = "affiliations:catalog:version"
+CATALOG_KEY = "affiliations:catalog:{}"
+
+# last catalog this process built or fetched, keyed by version so it never goes stale
+_local = {"version": None, "catalog": None}
+
+
+def _cache():
+    return caches[getattr(settings, "AFFILIATION_CACHE_ALIAS", "default")]
+
+
+def catalog_version():
+    '''Current catalog version, created on first use'''
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    '''Invalidate every cached catalog by moving to a fresh version'''
+    _cache().set(VERSION_KEY, uuid.uuid4().hex, None)
+    _local["version"] = None
+    _local["catalog"] = None
+
+
+def build_catalog():
+    '''Serialize the whole affiliation table once into a cacheable document'''
+    rows = values_rows(Affiliation.objects.order_by("id"), AffiliationSerializer)
+    body = dumps(rows)
+    return {
+        "etag": '"{}"'.format(hashlib.sha256(body).hexdigest()),
+        "body": body,
+        "rows": rows,
+        "by_category": {row["category"]: row for row in rows},
+        "by_id": {row["id"]: row for row in rows},
+    }
+
+
+def get_with_version(key):
+    '''The catalog version and a value stored next to it, in one cache round trip'''
+    version, values = get_many_with_version([key])
+    return version, values.get(key)
+
+
+def get_many_with_version(keys):
+    '''The catalog version and {key: value} for the keys found, in one cache round trip'''
+    values = _cache().get_many([VERSION_KEY, *keys])
+    version = values.pop(VERSION_KEY, None)
+    if version is None:
+        version = catalog_version()
+    return version, values
+
+
+def set_alongside(key, value, timeout):
+    '''Store a value in the catalog's cache so get_with_version can read both together'''
+    _cache().set(key, value, timeout)
+
+
+def set_many_alongside(values, timeout):
+    _cache().set_many(values, timeout)
+
+
+def delete_alongside(key):
+    _cache().delete(key)
+
+
+def delete_many_alongside(keys):
+    _cache().delete_many(keys)
+
+
+def get_catalog(version=None):
+    '''Read-through lookup: process memo, then shared cache, then the database'''
+    version = version or catalog_version()
+    if _local["version"] == version:
+        return _local["catalog"]
+    cache = _cache()
+    key = CATALOG_KEY.format(version)
+    catalog = cache.get(key)
+    if catalog is None:
+        catalog = build_catalog()
+        cache.set(key, catalog, getattr(settings, "AFFILIATION_CACHE_TIMEOUT", None))
+    _local["version"] = version
+    _local["catalog"] = catalog
+    return catalog
+
+
+async def aget_catalog():
+    '''get_catalog for async views: a warm catalog costs one cache read and no thread hop'''
+    cache = _cache()
+    version = await asynccache.aget(cache, VERSION_KEY)
+    if version is not None:
+        if _local["version"] == version:
+            return _local["catalog"]
+        catalog = await asynccache.aget(cache, CATALOG_KEY.format(version))
+        if catalog is not None:
+            _local["version"] = version
+            _local["catalog"] = catalog
+            return catalog
+    # first use or a rebuild, which needs the database
+    return await sync_to_async(get_catalog)(version)
@@ -1,7 +1,9 @@
 from rest_framework.serializers import ModelSerializer
+from core_app.instrumentation import TimedSerializerMixin
+from core_app.pagination import SparseFieldsMixin
 from .models import Affiliation
 
-class AffiliationSerializer(ModelSerializer):
+class AffiliationSerializer(TimedSerializerMixin, SparseFieldsMixin, ModelSerializer):
     class Meta:
         model = Affiliation
         fields = ["id", "category"]
\ No newline at end of file
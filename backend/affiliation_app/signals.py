@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import bump_version
+from .models import Affiliation
+
+
+@receiver(post_save, sender=Affiliation)
+@receiver(post_delete, sender=Affiliation)
+def invalidate_catalog(sender, **kwargs):
+    # any change to the table gets a new catalog version and etag once it is committed
+    transaction.on_commit(bump_version)
@@ -1,3 +1,46 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
+from .cache import bump_version
+from .models import Affiliation
 
 # Create your tests here.
+class AffiliationCatalogTests(TestCase):
+    def setUp(self):
+        bump_version()
+        Affiliation.objects.create(category="Green Party")
+        self.client = APIClient()
+
+    def test_catalog_is_served_from_cache(self):
+        first = self.client.get("/api/v1/affiliations/")
+        self.assertEqual(first.json(), [{"id": Affiliation.objects.get().id, "category": "Green Party"}])
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/v1/affiliations/")
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first["ETag"], second["ETag"])
+
+    def test_matching_etag_returns_304(self):
+        etag = self.client.get("/api/v1/affiliations/")["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/v1/affiliations/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_save_invalidates_catalog(self):
+        etag = self.client.get("/api/v1/affiliations/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Affiliation.objects.create(category="Libertarian Party")
+        response = self.client.get("/api/v1/affiliations/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_single_category_lookup(self):
+        response = self.client.get("/api/v1/affiliations/green party/")
+        self.assertEqual(response.data["category"], "Green Party")
+        self.assertEqual(self.client.get("/api/v1/affiliations/nope/").status_code, 404)
+
+    def test_paged_and_projected_list(self):
+        Affiliation.objects.create(category="Libertarian Party")
+        response = self.client.get("/api/v1/affiliations/?limit=1&fields=category")
+        self.assertEqual(response.data["results"], [{"category": "Green Party"}])
+        response = self.client.get(f"/api/v1/affiliations/?limit=1&cursor={response.data['next']}")
+        self.assertEqual(response.data["results"][0]["category"], "Libertarian Party")
+        self.assertIsNone(response.data["next"])
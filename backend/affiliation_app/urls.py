@@ -1,8 +1,21 @@
+from django.conf import settings
 from django.urls import path
+from . import views
 from .views import AllAffiliations, An_Affiliation
 
+# (route, DRF view) replaced by an async view
+replaced = []
+
+# under ASGI the catalog is served by the async view
+if settings.ASYNC_READ_VIEWS:
+    from .async_views import AsyncAllAffiliations as AllAffiliations
+    replaced += [("", views.AllAffiliations)]
+
 # paths for interest_app views for all interest categories and an interest category
 urlpatterns = [
     path("", AllAffiliations.as_view(), name="all_interest_categories"),
-    path("<str:interest>/", An_Affiliation.as_view(), name="an_interest"),
-]
\ No newline at end of file
+    path("<str:affiliation>/", An_Affiliation.as_view(), name="an_interest"),
+]
+
+# kept after the async route so the schema still documents it (see user_app.urls)
+urlpatterns += [path(route, view.as_view()) for route, view in replaced]
@@ -1,28 +1,59 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.http import parse_etags
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from .serializers import Affiliation, AffiliationSerializer
+from .cache import get_catalog
+from core_app.pagination import keyset_list
 from user_app.views import TokenReq
 from rest_framework.status import (
     HTTP_200_OK,
     HTTP_201_CREATED,
-    HTTP_400_BAD_REQUEST
+    HTTP_304_NOT_MODIFIED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_404_NOT_FOUND,
 )
-from drf_yasg.utils import swagger_auto_schema
+from core_app.docs import openapi, swagger_auto_schema
+
+
+def catalog_headers(catalog):
+    return {
+        "ETag": catalog["etag"],
+        "Cache-Control": f"public, max-age={getattr(settings, 'AFFILIATION_CATALOG_MAX_AGE', 60)}",
+    }
+
+
+def not_modified(request, catalog):
+    # strong comparison against the If-None-Match list
+    etags = parse_etags(request.headers.get("If-None-Match", ""))
+    return "*" in etags or catalog["etag"] in etags
+
 
 # Create your views here.
 class AllAffiliations(APIView):
     '''All affiliations'''
     @swagger_auto_schema(
         operation_summary="Get all affiliations",
-        operation_description="Retrieve all affiliations.",
+        operation_description="Retrieve all affiliations. Passing cursor, limit or fields returns a keyset page {next, results} instead.",
+        manual_parameters=[
+            openapi.Parameter("cursor", openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter("limit", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter("fields", openapi.IN_QUERY, type=openapi.TYPE_STRING, description="comma separated, e.g. id,category"),
+        ],
         responses={200: AffiliationSerializer(many=True)},
     )
     def get(self, request):
+        # paged or projected requests read the table a page at a time
+        if {"cursor", "limit", "fields"} & set(request.query_params):
+            return keyset_list(self, request, Affiliation.objects.all(), AffiliationSerializer)
         try: 
-            # if valid rquest get all affiliations, serialize data and return data & status 200
-            affiliations = Affiliation.objects.all()
-            ser_affiliations = AffiliationSerializer(affiliations, many=True)
-            return Response(ser_affiliations.data, status=HTTP_200_OK)
+            # serve the cached catalog, or a 304 if the client already has this version
+            catalog = get_catalog()
+            headers = catalog_headers(catalog)
+            if not_modified(request, catalog):
+                return Response(status=HTTP_304_NOT_MODIFIED, headers=headers)
+            return HttpResponse(catalog["body"], content_type="application/json", status=HTTP_200_OK, headers=headers)
         # if not valid return error message and response 400
         except Exception as e: 
             return Response(e, status=HTTP_400_BAD_REQUEST)
@@ -35,13 +66,15 @@ class An_Affiliation(APIView):
         responses={200: AffiliationSerializer()},
     )
     def get(self, request, affiliation):
-        try: 
-            # if valid interest category serialize data and return it with status 200
-            affiliation = Affiliation.objects.get(category = interest.title())
-            ser_affiliation = AffiliationSerializer(interest)
-            return Response(ser_affiliation.data, status=HTTP_200_OK)
-        except Exception as e:
-            return Response(e, status=HTTP_400_BAD_REQUEST)
+        # look the category up in the cached catalog
+        catalog = get_catalog()
+        headers = catalog_headers(catalog)
+        if not_modified(request, catalog):
+            return Response(status=HTTP_304_NOT_MODIFIED, headers=headers)
+        ser_affiliation = catalog["by_category"].get(affiliation.title())
+        if ser_affiliation is None:
+            return Response("Affiliation not found.", status=HTTP_404_NOT_FOUND)
+        return Response(ser_affiliation, status=HTTP_200_OK, headers=headers)
         
     @swagger_auto_schema(
         operation_summary="Add a new interest category",
@@ -53,7 +86,7 @@ class An_Affiliation(APIView):
         # make a copy of the data 
         data = request.data.copy()
         # set interest to category key
-        data['affiliation'] = affiliation.title()
+        data['category'] = affiliation.title()
         # serialize data 
         ser_data = AffiliationSerializer(data=data)
         # validate serialized category is valid
@@ -64,4 +97,4 @@ class An_Affiliation(APIView):
         # else return error message and status 400
         else: 
             print(ser_data.errors)
-            return Response(status=HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            return Response(status=HTTP_400_BAD_REQUEST)
@@ -0,0 +1,275 @@
+"""
+Load benchmark for the v1 API.
+
+Seeds users (with tokens and profiles) and affiliations, starts a local server unless --url
+is given, then drives each endpoint at the requested concurrency and writes a JSON report
+with throughput, latency percentiles and queries per request (read from the Server-Timing
+header, so the server runs with PERF_SAMPLE_RATE=1, and with the login and register throttles
+off). Latencies and throughput count 2xx responses only; anything else is reported under errors
+and statuses. A server given with --url keeps its own throttle settings.
+
+Runs against whatever database the settings point at, e.g. SQLite:
+
+    DB_ENGINE=sqlite SQLITE_PATH=/tmp/bench.sqlite3 python -m benchmarks.api_load --users 200 --concurrency 8 --output run.json
+    python -m benchmarks.api_load --compare before.json run.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'publiceyeusa.settings')
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PASSWORD = "bench-password-1"
+SCENARIOS = ["affiliations", "info", "profile", "display_name", "edit_profile", "login", "register"]
+THROTTLE_SCOPES = ["login_ip", "login_account", "login_endpoint", "register_ip", "register_endpoint"]
+QUERIES_RE = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+def seed(users, affiliations):
+    '''Create the benchmark dataset and return [(email, token)]'''
+    import django
+    django.setup()
+    from django.contrib.auth.hashers import make_password
+    from django.core.management import call_command
+    from rest_framework.authtoken.models import Token
+    from affiliation_app.models import Affiliation
+    from profile_app.models import Profile
+    from user_app.models import User
+
+    call_command("migrate", verbosity=0)
+    for i in range(affiliations):
+        Affiliation.objects.get_or_create(category=f"Bench Party {i}")
+    affiliation_ids = list(Affiliation.objects.values_list("id", flat=True))
+
+    existing = set(User.objects.filter(email__startswith="bench").values_list("email", flat=True))
+    # one hash is valid for every seeded user since they share the password
+    password = make_password(PASSWORD)
+    new_users = [
+        User(username=email, email=email, password=password)
+        for email in (f"bench{i}@bench.com" for i in range(users))
+        if email not in existing
+    ]
+    User.objects.bulk_create(new_users, batch_size=500)
+    seeded = list(User.objects.filter(email__startswith="bench", email__endswith="@bench.com").order_by("id")[:users])
+    Token.objects.bulk_create([Token(user=user, key=Token.generate_key()) for user in seeded], ignore_conflicts=True)
+    Profile.objects.bulk_create([Profile(user=user, display_name=f"bench {user.id}") for user in seeded], ignore_conflicts=True)
+    ProfileAffiliation = Profile.affiliations.through
+    links = []
+    for profile_id in Profile.objects.filter(user__in=seeded).values_list("id", flat=True):
+        for affiliation_id in random.sample(affiliation_ids, min(3, len(affiliation_ids))):
+            links.append(ProfileAffiliation(profile_id=profile_id, affiliation_id=affiliation_id))
+    ProfileAffiliation.objects.bulk_create(links, batch_size=1000, ignore_conflicts=True)
+    tokens = dict(Token.objects.filter(user__in=seeded).values_list("user__email", "key"))
+    return [(user.email, tokens[user.email]) for user in seeded], affiliation_ids
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server():
+    port = free_port()
+    # login and register would otherwise measure the throttle's 429s after the first few requests
+    throttles = {f"THROTTLE_{scope.upper()}": "" for scope in THROTTLE_SCOPES}
+    env = dict(os.environ, PERF_SAMPLE_RATE="1.0", **throttles)
+    server = subprocess.Popen(
+        [sys.executable, "manage.py", "runserver", "--noreload", f"127.0.0.1:{port}"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return server, url
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+class Driver:
+    '''HTTP client for the worker threads, optionally one keep-alive connection per thread'''
+
+    def __init__(self, url, keep_alive=False):
+        parsed = urllib.parse.urlparse(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.keep_alive = keep_alive
+        self.local = threading.local()
+
+    def request(self, method, path, token=None, body=None):
+        conn = getattr(self.local, "conn", None)
+        if conn is None or not self.keep_alive:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        headers = {"Content-Type": "application/json"}
+        if not self.keep_alive:
+            # runserver writes headers and body separately, closing the connection flushes the
+            # response instead of waiting out a delayed ACK
+            headers["Connection"] = "close"
+        if token:
+            headers["Authorization"] = f"Token {token}"
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if not self.keep_alive:
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            self.local.conn = None
+            return time.perf_counter() - start, 0, None
+        elapsed = time.perf_counter() - start
+        match = QUERIES_RE.search(response.getheader("Server-Timing") or "")
+        return elapsed, response.status, int(match.group(1)) if match else None
+
+
+def scenario_request(name, users, affiliation_ids, counter):
+    email, token = random.choice(users)
+    if name == "affiliations":
+        return "GET", "/api/v1/affiliations/", None, None
+    if name == "info":
+        return "GET", "/api/v1/users/", token, None
+    if name == "profile":
+        return "GET", "/api/v1/profile/", token, None
+    if name == "display_name":
+        return "GET", "/api/v1/profile/display_name/", token, None
+    if name == "edit_profile":
+        body = {"display_name": f"bench {random.randint(100, 999)}", "affiliations": random.sample(affiliation_ids, min(3, len(affiliation_ids)))}
+        return "PUT", "/api/v1/profile/edit_profile/", token, body
+    if name == "login":
+        return "POST", "/api/v1/users/login/", None, {"email": email, "password": PASSWORD}
+    if name == "register":
+        return "POST", "/api/v1/users/register/", None, {"email": f"new{time.time_ns()}{next(counter)}@bench.com", "password": PASSWORD}
+    raise ValueError(name)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_scenario(driver, name, users, affiliation_ids, concurrency, requests):
+    counter = iter(range(sys.maxsize))
+
+    def one(_):
+        method, path, token, body = scenario_request(name, users, affiliation_ids, counter)
+        return driver.request(method, path, token, body)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - start
+    statuses = {}
+    for elapsed, status, q in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    # latency and query figures only cover successful responses, failures are reported on their own
+    ok = [(elapsed, q) for elapsed, status, q in results if 200 <= status < 300]
+    failed = [elapsed for elapsed, status, q in results if not 200 <= status < 300]
+    latencies = [elapsed for elapsed, q in ok]
+    queries = [q for elapsed, q in ok if q is not None]
+    report = {
+        "requests": requests,
+        "ok": len(ok),
+        "errors": len(failed),
+        "statuses": statuses,
+        "throughput_rps": round(len(ok) / wall, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p90_ms": round(percentile(latencies, 90) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else None,
+        "queries_per_request": round(statistics.mean(queries), 2) if queries else None,
+    }
+    if failed:
+        report["error_p50_ms"] = round(percentile(failed, 50) * 1000, 2)
+    return report
+
+
+def compare(before_path, after_path):
+    before = json.loads(Path(before_path).read_text())["scenarios"]
+    after = json.loads(Path(after_path).read_text())["scenarios"]
+    diff = {}
+    for name in sorted(set(before) & set(after)):
+        diff[name] = {}
+        for key in ("throughput_rps", "p50_ms", "p99_ms", "queries_per_request"):
+            old, new = before[name].get(key), after[name].get(key)
+            if old is None or new is None:
+                continue
+            diff[name][key] = {"before": old, "after": new, "change_pct": round((new - old) / old * 100, 1) if old else None}
+    return diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark for the v1 API")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--affiliations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--url", help="benchmark a running server instead of starting one")
+    parser.add_argument("--keep-alive", action="store_true", help="reuse connections (for servers that flush responses, not runserver)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for a reproducible request mix")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two reports and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        print(json.dumps(compare(*args.compare), indent=2))
+        return
+
+    random.seed(args.seed)
+    sys.path.insert(0, str(BACKEND_DIR))
+    users, affiliation_ids = seed(args.users, args.affiliations)
+    from django.conf import settings
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = start_server()
+    try:
+        driver = Driver(url, keep_alive=args.keep_alive)
+        scenarios = {}
+        for name in args.scenarios.split(","):
+            scenarios[name] = run_scenario(driver, name, users, affiliation_ids, args.concurrency, args.requests)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "meta": {
+            "url": url,
+            "database": settings.DATABASES["default"]["ENGINE"],
+            "db_pool": getattr(settings, "DB_POOL", "none"),
+            "users": args.users,
+            "affiliations": args.affiliations,
+            "concurrency": args.concurrency,
+            "keep_alive": args.keep_alive,
+            "requests_per_scenario": args.requests,
+            "seed": args.seed,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "scenarios": scenarios,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Async read endpoints benchmark.
+
+Fires concurrent GETs at users/, profile/, profile/display_name/ and affiliations/, once
+through the sync DRF views and once through their async versions, and reports throughput
+and latency percentiles for each. Requests go through the ASGI handler in-process, the way
+an ASGI server (uvicorn, daphne) would call it, against a throwaway test database.
+
+    python -m benchmarks.async_reads --concurrency 200 --requests 4000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'publiceyeusa.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import path
+from rest_framework.authtoken.models import Token
+from affiliation_app.async_views import AsyncAllAffiliations
+from affiliation_app.models import Affiliation
+from affiliation_app.views import AllAffiliations
+from profile_app.async_views import AsyncCurrentUserProfile, AsyncDisplayName
+from profile_app.models import Profile
+from profile_app.views import CurrentUserProfile, DisplayName
+from user_app.async_views import AsyncInfo
+from user_app.models import User
+from user_app.views import Info
+from .login_storm import summarize
+
+urlpatterns = [
+    path("sync/users/", Info.as_view()),
+    path("sync/profile/", CurrentUserProfile.as_view()),
+    path("sync/display_name/", DisplayName.as_view()),
+    path("sync/affiliations/", AllAffiliations.as_view()),
+    path("async/users/", AsyncInfo.as_view()),
+    path("async/profile/", AsyncCurrentUserProfile.as_view()),
+    path("async/display_name/", AsyncDisplayName.as_view()),
+    path("async/affiliations/", AsyncAllAffiliations.as_view()),
+]
+
+ENDPOINTS = ["users", "profile", "display_name", "affiliations"]
+
+
+def seed(users):
+    affiliations = Affiliation.objects.bulk_create([Affiliation(category=f"Party {i}") for i in range(20)])
+    tokens = []
+    for i in range(users):
+        user = User.objects.create_user(username=f"reader{i}@bench.com", email=f"reader{i}@bench.com", password=None)
+        profile = Profile.objects.create(user=user, display_name=f"reader {i}")
+        profile.affiliations.set(affiliations[i % 5:i % 5 + 5])
+        tokens.append(Token.objects.create(user=user).key)
+    return tokens
+
+
+async def run_phase(prefix, endpoint, tokens, concurrency, total):
+    client = AsyncClient()
+    samples, statuses = [], {}
+    queue = iter(range(total))
+
+    async def worker():
+        for i in queue:
+            headers = {"Accept": "application/json", "Authorization": f"Token {tokens[i % len(tokens)]}"}
+            start = time.perf_counter()
+            response = await client.get(f"/{prefix}/{endpoint}/", headers=headers)
+            samples.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    result = summarize(samples)
+    result["requests_per_s"] = round(total / elapsed, 1)
+    result["statuses"] = statuses
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000, help="per endpoint and mode")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS, choices=ENDPOINTS)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with override_settings(ROOT_URLCONF=__name__):
+            tokens = seed(args.users)
+            report = {"concurrency": args.concurrency, "requests": args.requests}
+            for endpoint in args.endpoints:
+                # one warm-up pass so both modes start with the token and catalog caches filled
+                asyncio.run(run_phase("sync", endpoint, tokens, 8, len(tokens)))
+                report[endpoint] = {
+                    prefix: asyncio.run(run_phase(prefix, endpoint, tokens, args.concurrency, args.requests))
+                    for prefix in ("sync", "async")
+                }
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
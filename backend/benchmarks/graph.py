@@ -0,0 +1,127 @@
+"""
+Relationship graph benchmark.
+
+Loads a synthetic graph of donors, committees, candidates, members and bills into a throwaway
+test database and times "who funds this bill" (4 hops back from a bill) answered with one edge
+table query per hop, as chained ORM lookups would, against the in-memory CSR traversal. Also
+times loading the graph and catching up with an ingested page as a delta.
+
+    python -m benchmarks.graph --donors 100000 --contributions 300000 --runs 5
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'publiceyeusa.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection
+from django.db.models import Sum
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from graph_app.edges import donor_node, node
+from graph_app.graph import current_graph, forget_graph
+from graph_app.models import GraphEdge, GraphState
+from graph_app.queries import connected_money
+
+CANDIDATES = 500
+# top donors returned, the API's largest page
+LIMIT = 100
+
+
+def seed(donors, contributions, seed=7):
+    rng = random.Random(seed)
+    edges = []
+    for i in range(CANDIDATES):
+        candidate, member = node("candidate", f"H{i:08}"), node("member", f"M{i:06}")
+        edges.append(GraphEdge(source=node("committee", f"C{i:08}"), target=candidate, kind="committee", revision=1))
+        edges.append(GraphEdge(source=candidate, target=member, kind="member", revision=1))
+        edges += [GraphEdge(source=member, target=node("bill", f"118-hr-{i}{j}"), kind="sponsor", revision=1) for j in range(5)]
+    totals = defaultdict(lambda: [Decimal(0), 0])
+    for _ in range(contributions):
+        # a few committees raise most of the money
+        committee = min(int(rng.paretovariate(1.2)) - 1, CANDIDATES - 1)
+        pair = totals[(donor_node(f"DONOR {rng.randrange(donors)}", "CA"), node("committee", f"C{committee:08}"))]
+        pair[0] += Decimal(rng.randrange(100, 500000)) / 100
+        pair[1] += 1
+    edges += [
+        GraphEdge(source=source, target=target, kind="contribution", amount=amount, contributions=count, revision=1)
+        for (source, target), (amount, count) in totals.items()
+    ]
+    GraphEdge.objects.bulk_create(edges, batch_size=5000)
+    GraphState.objects.create(pk=1, revision=1, base_revision=1)
+    return len(edges)
+
+
+def chained_queries(bill):
+    '''Donor totals behind a bill with one query per hop over the edge table'''
+    frontier = {bill}
+    for _ in range(3):
+        frontier = set(GraphEdge.objects.filter(target__in=frontier, active=True).values_list("source", flat=True))
+    rows = (
+        GraphEdge.objects.filter(target__in=frontier, kind="contribution", active=True)
+        .values("source").annotate(total=Sum("amount")).order_by("-total", "source")[:LIMIT]
+    )
+    return {row["source"]: row["total"] for row in rows}
+
+
+def timed(runs, func):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 2), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--donors", type=int, default=100000)
+    parser.add_argument("--contributions", type=int, default=300000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        # GRAPH_HOT_DEGREE is raised so every run traverses instead of reading the result cache
+        with override_settings(GRAPH_REFRESH_INTERVAL=0, GRAPH_HOT_DEGREE=10 ** 12):
+            edges = seed(args.donors, args.contributions)
+            forget_graph()
+            load_ms, graph = timed(1, current_graph)
+            report = {"edges": edges, "nodes": graph.nodes, "load_ms": load_ms, "bills": {}}
+            # the bills of the biggest, a middling and a small committee's candidate
+            for i in (0, 10, 300):
+                bill = node("bill", f"118-hr-{i}0")
+                queries_ms, expected = timed(args.runs, lambda: chained_queries(bill))
+                csr_ms, result = timed(args.runs, lambda: connected_money(bill, 4, "in", "donor", LIMIT))
+                report["bills"][bill] = {
+                    "chained_queries_ms": queries_ms,
+                    "csr_ms": csr_ms,
+                    "speedup": round(queries_ms / csr_ms, 1),
+                    "same_result": {row["id"]: row["amount"] for row in result["results"]} == {key: f"{total:.2f}" for key, total in expected.items()},
+                }
+            # an ingested page: 1000 changed contribution edges under a new revision
+            changed = list(GraphEdge.objects.filter(kind="contribution")[:1000])
+            for edge in changed:
+                edge.amount += 1
+                edge.revision = 2
+            GraphEdge.objects.bulk_update(changed, ["amount", "revision"])
+            GraphState.objects.filter(pk=1).update(revision=2)
+            report["delta_ms"], _ = timed(1, current_graph)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Login storm benchmark.
+
+Measures latency of a non-auth endpoint (the affiliation catalog) while a burst of
+logins runs, once through the sync DRF Login view and once through AsyncLogin.
+Everything runs in-process on the ASGI handler against a throwaway test database.
+
+    python -m benchmarks.login_storm --concurrency 8 --seconds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'publiceyeusa.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import path
+from affiliation_app.models import Affiliation
+from affiliation_app.views import AllAffiliations
+from user_app.async_views import AsyncLogin
+from user_app.models import User
+from user_app.views import Login
+
+urlpatterns = [
+    path("sync/login/", Login.as_view()),
+    path("async/login/", AsyncLogin.as_view()),
+    path("affiliations/", AllAffiliations.as_view()),
+]
+
+EMAIL = "storm@bench.com"
+PASSWORD = "storm-password-1"
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(samples):
+    return {
+        "requests": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+        "mean_ms": round(statistics.mean(samples) * 1000, 2),
+    }
+
+
+async def probe(client, stop):
+    # sequential catalog reads, the "everything else" traffic
+    samples = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/affiliations/")
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.005)
+    return samples
+
+
+async def stormer(client, url, stop, statuses):
+    while not stop.is_set():
+        response = await client.post(url, {"email": EMAIL, "password": PASSWORD}, content_type="application/json")
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def run_phase(login_url, concurrency, seconds):
+    client = AsyncClient()
+    stop = asyncio.Event()
+    statuses = {}
+    storm = [asyncio.create_task(stormer(client, login_url, stop, statuses)) for _ in range(concurrency if login_url else 0)]
+    probe_task = asyncio.create_task(probe(client, stop))
+    await asyncio.sleep(seconds)
+    stop.set()
+    samples = await probe_task
+    await asyncio.gather(*storm)
+    result = summarize(samples)
+    result["login_statuses"] = statuses
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with override_settings(ROOT_URLCONF=__name__):
+            User.objects.create_user(username=EMAIL, email=EMAIL, password=PASSWORD)
+            Affiliation.objects.bulk_create([Affiliation(category=f"Party {i}") for i in range(20)])
+            report = {
+                "concurrency": args.concurrency,
+                "seconds": args.seconds,
+                "baseline": asyncio.run(run_phase(None, args.concurrency, args.seconds)),
+                "sync_login_storm": asyncio.run(run_phase("/sync/login/", args.concurrency, args.seconds)),
+                "async_login_storm": asyncio.run(run_phase("/async/login/", args.concurrency, args.seconds)),
+            }
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Read serializer benchmark.
+
+Serializes 10k-object payloads for ProfileSerializer, AffiliationSerializer,
+DisplayNameSerializer and UserSerializer twice: through DRF fields + JSONRenderer, and
+through the .values() fast path + orjson. Checks the bytes match and reports the timings.
+
+    python -m benchmarks.serializers --objects 10000 --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'publiceyeusa.settings')
+
+import django
+
+django.setup()
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+from affiliation_app.models import Affiliation
+from affiliation_app.serializers import AffiliationSerializer
+from core_app.fastpath import values_rows
+from core_app.renderers import dumps
+from profile_app.loaders import profile_queryset, profile_rows
+from profile_app.models import Profile
+from profile_app.serializers import DisplayNameSerializer, ProfileSerializer
+from user_app.models import User
+from user_app.serializers import UserSerializer
+
+
+def seed(count):
+    Affiliation.objects.bulk_create([Affiliation(category=f"Party {i} – ünïcode") for i in range(count)])
+    affiliations = list(Affiliation.objects.order_by("id")[:5])
+    password = make_password("bench-password")
+    User.objects.bulk_create([User(username=f"u{i}@bench.com", email=f"u{i}@bench.com", password=password) for i in range(count)])
+    users = User.objects.order_by("id")
+    Profile.objects.bulk_create([Profile(user=user, display_name=f"User {user.id}") for user in users])
+    through = Profile.affiliations.through
+    through.objects.bulk_create([
+        through(profile_id=profile_id, affiliation_id=affiliation.id)
+        for profile_id in Profile.objects.values_list("id", flat=True)
+        for affiliation in affiliations[:profile_id % 5]
+    ])
+
+
+def cases():
+    # name: (DRF path, fast path), both producing the response body from the database
+    renderer = JSONRenderer()
+    profiles = Profile.objects.order_by("id")
+    return {
+        "profile": (
+            lambda: renderer.render(ProfileSerializer(profile_queryset().order_by("id"), many=True).data),
+            lambda: dumps(profile_rows(profiles)),
+        ),
+        "affiliation": (
+            lambda: renderer.render(AffiliationSerializer(Affiliation.objects.order_by("id"), many=True).data),
+            lambda: dumps(values_rows(Affiliation.objects.order_by("id"), AffiliationSerializer)),
+        ),
+        "display_name": (
+            lambda: renderer.render(DisplayNameSerializer(profiles, many=True).data),
+            lambda: dumps(values_rows(profiles, DisplayNameSerializer)),
+        ),
+        "user": (
+            lambda: renderer.render(UserSerializer(User.objects.order_by("id"), many=True).data),
+            lambda: dumps(values_rows(User.objects.order_by("id"), UserSerializer)),
+        ),
+    }
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func()
+        samples.append(time.perf_counter() - start)
+    return body, round(statistics.median(samples) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--objects", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        seed(args.objects)
+        report = {"objects": args.objects, "repeat": args.repeat}
+        for name, (drf, fast) in cases().items():
+            drf_body, drf_ms = timed(drf, args.repeat)
+            fast_body, fast_ms = timed(fast, args.repeat)
+            if drf_body != fast_body:
+                raise SystemExit(f"{name}: fast path output differs from the DRF serializer")
+            report[name] = {"bytes": len(drf_body), "drf_ms": drf_ms, "fast_ms": fast_ms, "speedup": round(drf_ms / fast_ms, 1)}
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Columnar snapshot benchmark.
+
+Loads synthetic contributions into a throwaway test database, writes their snapshot and times
+the same finance slices grouped by the database and summed from the memory mapped snapshot.
+
+    python -m benchmarks.snapshots --rows 200000 --runs 5
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'publiceyeusa.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from federal_app.industries import INDUSTRIES
+from federal_app.models import Contribution
+from federal_app.snapshots import build, open_snapshot
+from finance_app.slices import slice_totals
+
+STATES = ["CA", "NY", "TX", "FL", "IL", "PA", "OH", "GA", "NC", "MI", "DC", "WA"]
+SLICES = [
+    ("state", {}, {}),
+    ("industry", {"state": "CA"}, {}),
+    ("month", {"cycle": 2024}, {"min_date": datetime.date(2024, 3, 1)}),
+    ("committee", {}, {}),
+]
+
+
+def seed(rows, seed=7):
+    rng = random.Random(seed)
+    industries = [name for name, _ in INDUSTRIES]
+    start = datetime.date(2023, 1, 1)
+    batch = []
+    for i in range(rows):
+        batch.append(Contribution(
+            external_id=str(10_000_000 + i),
+            committee_id=f"C{rng.randrange(500):08}",
+            contributor_state=rng.choice(STATES),
+            industry=rng.choice(industries),
+            amount=Decimal(rng.randrange(100, 500000)) / 100,
+            receipt_date=start + datetime.timedelta(days=rng.randrange(730)),
+            cycle=2024,
+        ))
+        if len(batch) == 10000:
+            Contribution.objects.bulk_create(batch)
+            batch = []
+    Contribution.objects.bulk_create(batch)
+
+
+def timed(runs, func):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 2), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with tempfile.TemporaryDirectory() as directory, override_settings(SNAPSHOT_DIR=directory):
+            seed(args.rows)
+            build_ms, _ = timed(1, lambda: build("contributions"))
+            snapshot = open_snapshot("contributions")
+            report = {"rows": args.rows, "snapshot_build_ms": build_ms, "snapshot_mb": round(snapshot.size / 1e6, 1), "slices": {}}
+            for group_by, filters, extra in SLICES:
+                name = "+".join([group_by, *filters, *extra])
+                database_ms, expected = timed(args.runs, lambda: slice_totals(group_by, filters, **extra))
+                with override_settings(FINANCE_SLICE_SOURCE="snapshot"):
+                    snapshot_ms, result = timed(args.runs, lambda: slice_totals(group_by, filters, **extra))
+                report["slices"][name] = {
+                    "database_ms": database_ms,
+                    "snapshot_ms": snapshot_ms,
+                    "speedup": round(database_ms / snapshot_ms, 1),
+                    "same_result": result == expected,
+                }
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
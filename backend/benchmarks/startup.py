@@ -0,0 +1,102 @@
+"""
+Cold start benchmark.
+
+Boots the WSGI application (settings, app registry, URLconf and every view module) in a
+fresh interpreter under `python -X importtime`, once per settings profile, and reports
+boot time, total import time, module count and where the import time goes.
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --settings publiceyeusa.settings_api --top 30
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# what a worker does before it can answer its first request
+BOOT = """
+import json, time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({"boot_ms": (time.perf_counter() - start) * 1000}))
+"""
+
+
+def parse_importtime(stderr):
+    '''[(module, self us, cumulative us)] from -X importtime output'''
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def boot_once(settings_module):
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module, "PYTHONPATH": str(BACKEND_DIR)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise SystemExit(f"{settings_module} failed to boot:\n{result.stderr[-2000:]}")
+    boot_ms = json.loads(result.stdout.strip().splitlines()[-1])["boot_ms"]
+    return boot_ms, parse_importtime(result.stderr)
+
+
+def profile(settings_module, runs, top):
+    boots, imports, packages, last = [], [], Counter(), None
+    for _ in range(runs):
+        boot_ms, modules = boot_once(settings_module)
+        boots.append(boot_ms)
+        imports.append(sum(self_us for _, self_us, _ in modules) / 1000)
+        last = modules
+    # attribute self time to top-level packages, from the last run
+    for name, self_us, _ in last:
+        packages[name.split(".")[0]] += self_us
+    return {
+        "boot_ms": round(statistics.median(boots), 1),
+        "import_ms": round(statistics.median(imports), 1),
+        "modules": len(last),
+        "top_packages_ms": {name: round(us / 1000, 1) for name, us in packages.most_common(top)},
+        "top_modules_cumulative_ms": {
+            name: round(cumulative / 1000, 1)
+            for name, _, cumulative in sorted(last, key=lambda module: -module[2])[:top]
+        },
+        "packages": sorted(packages),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--settings", nargs="+", default=["publiceyeusa.settings", "publiceyeusa.settings_api"])
+    parser.add_argument("--runs", type=int, default=5, help="boots per profile, medians are reported")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    report = {name: profile(name, args.runs, args.top) for name in args.settings}
+    if len(args.settings) == 2:
+        full, lean = (report[name] for name in args.settings)
+        report["difference"] = {
+            "boot_ms": round(full["boot_ms"] - lean["boot_ms"], 1),
+            "import_ms": round(full["import_ms"] - lean["import_ms"], 1),
+            "modules": full["modules"] - lean["modules"],
+            "packages_not_loaded": sorted(set(full["packages"]) - set(lean["packages"])),
+        }
+    for entry in report.values():
+        entry.pop("packages", None)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
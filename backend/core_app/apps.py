@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+
+
+class CoreAppConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core_app'
+
+    def ready(self):
+        # start counting database connections
+        from . import db_metrics
+        db_metrics.connect()
+        # check --deploy: several workers need caches they all see
+        from . import caching
+        # query timing only costs anything when requests are being sampled
+        from django.conf import settings
+        if getattr(settings, "PERF_SAMPLE_RATE", 0) > 0:
+            from .instrumentation import install_query_timing
+            install_query_timing()
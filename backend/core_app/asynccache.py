@@ -0,0 +1,28 @@
+from asgiref.sync import sync_to_async
+from django.core.cache.backends.locmem import LocMemCache
+
+# Django 5.0's cache a* methods are sync_to_async wrappers that queue on the one
+# thread_sensitive thread. LocMem never blocks so it's called inline, anything else
+# (Redis, memcached) runs on the shared executor where lookups don't wait on each other.
+
+
+def _inline(cache):
+    return isinstance(cache, LocMemCache)
+
+
+async def aget(cache, key, default=None):
+    if _inline(cache):
+        return cache.get(key, default)
+    return await sync_to_async(cache.get, thread_sensitive=False)(key, default)
+
+
+async def aget_many(cache, keys):
+    if _inline(cache):
+        return cache.get_many(keys)
+    return await sync_to_async(cache.get_many, thread_sensitive=False)(keys)
+
+
+async def aset(cache, key, value, timeout):
+    if _inline(cache):
+        return cache.set(key, value, timeout)
+    return await sync_to_async(cache.set, thread_sensitive=False)(key, value, timeout)
@@ -0,0 +1,125 @@
+import io
+import json
+import logging
+from urllib.parse import urlsplit
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from .middleware import PerformanceMiddleware
+from .renderers import dumps
+
+logger = logging.getLogger("publiceyeusa.batch")
+
+API_PREFIX = "/api/v1/"
+METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+# request headers a sub-request must not inherit from the batch envelope
+ENVELOPE_META = {"CONTENT_TYPE", "CONTENT_LENGTH", "QUERY_STRING", "PATH_INFO", "REQUEST_METHOD", "HTTP_IF_NONE_MATCH"}
+
+
+class InvalidBatch(Exception):
+    pass
+
+
+def max_batch_size():
+    return getattr(settings, "BATCH_MAX_REQUESTS", 20)
+
+
+def clean_items(data):
+    '''Validate the batch body: a list of {method, path, body?} no longer than BATCH_MAX_REQUESTS'''
+    items = data.get("requests") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise InvalidBatch("requests must be a non-empty list.")
+    if len(items) > max_batch_size():
+        raise InvalidBatch(f"A batch can hold at most {max_batch_size()} requests.")
+    cleaned = []
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+            raise InvalidBatch("Every request needs a path.")
+        method = str(item.get("method", "GET")).upper()
+        if method not in METHODS:
+            raise InvalidBatch(f"Unsupported method {method}.")
+        cleaned.append({"method": method, "path": item["path"], "body": item.get("body")})
+    return cleaned
+
+
+def sub_request(request, item):
+    '''An HttpRequest for one item that shares the batch's user, token and session'''
+    url = urlsplit(item["path"])
+    path = url.path if url.path.startswith("/") else API_PREFIX + url.path
+    sub = HttpRequest()
+    sub.method = item["method"]
+    sub.path = sub.path_info = path
+    sub.META = {key: value for key, value in request.META.items() if key not in ENVELOPE_META}
+    # sub-responses are always negotiated as JSON so they can be spliced into the envelope
+    sub.META.update(REQUEST_METHOD=sub.method, PATH_INFO=path, QUERY_STRING=url.query, HTTP_ACCEPT="application/json")
+    sub.GET = QueryDict(url.query)
+    sub.COOKIES = request.COOKIES
+    body = b"" if item["body"] is None else json.dumps(item["body"]).encode()
+    sub._stream = io.BytesIO(body)
+    sub._read_started = False
+    sub.META.update(CONTENT_TYPE="application/json", CONTENT_LENGTH=str(len(body)))
+    if hasattr(request, "session"):
+        sub.session = request.session
+    # sub-views run their own authentication on the inherited Authorization header, which the
+    # batch view has just put in token_cache, so the token is still only looked up once
+    sub.user = request.user
+    return sub
+
+
+def call_view(sub):
+    match = sub.resolver_match
+    if iscoroutinefunction(match.func):
+        response = async_to_sync(match.func)(sub, *match.args, **match.kwargs)
+    else:
+        response = match.func(sub, *match.args, **match.kwargs)
+    if hasattr(response, "render"):
+        response.render()
+    return response
+
+
+def run_item(request, item, batch_view):
+    '''Run one item against the existing views, returning (status, raw JSON body)'''
+    path = urlsplit(item["path"]).path
+    if path.startswith("/") and not path.startswith(API_PREFIX):
+        return 400, dumps(f"Only {API_PREFIX} paths can be batched.")
+    sub = sub_request(request, item)
+    try:
+        match = resolve(sub.path_info)
+    except Resolver404:
+        return 404, dumps("Not found.")
+    if getattr(match.func, "view_class", None) is batch_view:
+        return 400, dumps("Batches can't be nested.")
+    sub.resolver_match = match
+    try:
+        # sampled and recorded under the sub-request's own endpoint like a direct call
+        response = PerformanceMiddleware(call_view)(sub)
+    except Http404:
+        # DRF views answer these themselves, plain Django views leave them to the handler
+        return 404, dumps("Not found.")
+    except PermissionDenied:
+        return 403, dumps("Forbidden.")
+    except Exception:
+        logger.exception("batched %s %s failed", sub.method, sub.path)
+        return 500, dumps("Server error.")
+    return response.status_code, response_body(response)
+
+
+def response_body(response):
+    # JSON bodies are spliced in as-is rather than decoded and re-encoded
+    content = response.content
+    if not content:
+        return b"null"
+    if response.get("Content-Type", "").startswith("application/json"):
+        return content
+    return dumps(content.decode(response.charset or "utf-8", errors="replace"))
+
+
+def run_batch(request, items, batch_view):
+    '''The combined response body: {"responses": [{"status": ..., "body": ...}, ...]} in item order'''
+    parts = []
+    for item in items:
+        status, body = run_item(request, item, batch_view)
+        parts.append(b'{"status":%d,"body":%s}' % (status, body))
+    return b'{"responses":[' + b",".join(parts) + b"]}"
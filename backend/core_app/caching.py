@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+# Version keys (the affiliation catalog, bootstrap documents) and revoked tokens only
+# invalidate every worker when the alias they live in is shared between processes.
+SHARED_ALIASES = ("AFFILIATION_CACHE_ALIAS", "TOKEN_CACHE_ALIAS")
+
+
+def process_local(alias):
+    '''True when the alias keeps its entries in this process only'''
+    return isinstance(caches[alias], LocMemCache)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_caches(app_configs=None, **kwargs):
+    '''check --deploy: several workers on caches that can't see each other's invalidations
+
+    Throttle counters only get looser per worker, so those are a warning.
+    '''
+    workers = getattr(settings, "WEB_WORKERS", 1)
+    if workers <= 1:
+        return []
+    messages = []
+    for setting in SHARED_ALIASES:
+        alias = getattr(settings, setting, None)
+        if alias and process_local(alias):
+            messages.append(checks.Error(
+                f"{setting} '{alias}' is a per-process LocMemCache but WEB_CONCURRENCY is {workers}.",
+                hint="Point it at a shared cache (CACHE_BACKEND / CACHE_LOCATION).",
+                id="core_app.E001",
+            ))
+    store = getattr(settings, "THROTTLE_STORE", "cache")
+    alias = getattr(settings, "THROTTLE_CACHE_ALIAS", "default")
+    if store == "memory" or process_local(alias):
+        messages.append(checks.Warning(
+            f"Throttle counters are per process (THROTTLE_STORE={store}, THROTTLE_CACHE_ALIAS={alias}) "
+            f"with {workers} workers, so each worker allows the full rate.",
+            hint="Use THROTTLE_STORE=cache with a shared THROTTLE_CACHE_ALIAS.",
+            id="core_app.W001",
+        ))
+    return messages
@@ -0,0 +1,49 @@
+import threading
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_lock = threading.Lock()
+_counters = {
+    "connections_opened": 0,
+    "requests": 0,
+    "requests_reusing_connection": 0,
+    # each request in flight holds at most one connection, on its own thread
+    "requests_in_flight": 0,
+}
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    with _lock:
+        _counters["connections_opened"] += 1
+
+
+def _on_request_started(sender, **kwargs):
+    # a request that starts with an open connection skips the connect + auth handshake
+    reused = connections["default"].connection is not None
+    with _lock:
+        _counters["requests"] += 1
+        _counters["requests_in_flight"] += 1
+        if reused:
+            _counters["requests_reusing_connection"] += 1
+
+
+def _on_request_finished(sender, **kwargs):
+    with _lock:
+        _counters["requests_in_flight"] -= 1
+
+
+def connect():
+    connection_created.connect(_on_connection_created, dispatch_uid="core_app.db_metrics.connection_created")
+    request_started.connect(_on_request_started, dispatch_uid="core_app.db_metrics.request_started")
+    request_finished.connect(_on_request_finished, dispatch_uid="core_app.db_metrics.request_finished")
+
+
+def pool_stats():
+    '''Connection reuse and in-flight request counters for this process'''
+    with _lock:
+        stats = dict(_counters)
+    stats["mode"] = getattr(settings, "DB_POOL", "none")
+    stats["engine"] = settings.DATABASES["default"]["ENGINE"]
+    return stats
@@ -0,0 +1,21 @@
+from django.conf import settings
+
+# drf_yasg costs ~100ms of imports (it pulls in pkg_resources), so views take their schema
+# decorators from here and API-only workers, which don't serve the schema, never import it.
+if "drf_yasg" in settings.INSTALLED_APPS:
+    from drf_yasg import openapi
+    from drf_yasg.utils import swagger_auto_schema
+else:
+    def _inert(*args, **kwargs):
+        return None
+
+    class _Unused:
+        '''Stands in for drf_yasg.openapi: constants and constructors evaluate to nothing'''
+
+        def __getattr__(self, name):
+            return _inert
+
+    openapi = _Unused()
+
+    def swagger_auto_schema(*args, **kwargs):
+        return lambda view: view
@@ -0,0 +1,46 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+
+# columns whose python value from .values() is already what the DRF field would emit
+PLAIN_FIELDS = (models.AutoField, models.BigAutoField, models.IntegerField, models.CharField, models.TextField, models.BooleanField)
+_checked = {}
+
+
+def values_fields(serializer_class, nested=()):
+    '''Meta.fields of a ModelSerializer, checked to be columns .values() can return as-is
+
+    Fields named in nested are left out, for callers that fill those in themselves.
+    '''
+    key = (serializer_class, tuple(nested))
+    fields = _checked.get(key)
+    if fields is None:
+        meta = serializer_class.Meta
+        fields = tuple(name for name in meta.fields if name not in nested)
+        for name in fields:
+            field = meta.model._meta.get_field(name)
+            # relations, floats, decimals and dates all need DRF's own representation
+            if field.is_relation or not isinstance(field, PLAIN_FIELDS):
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{name} can't be read from .values()")
+            if serializer_class._declared_fields.get(name) is not None:
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{name} is declared on the serializer")
+        _checked[key] = fields
+    return fields
+
+
+def values_rows(queryset, serializer_class):
+    '''What serializer_class(queryset, many=True).data would hold, as plain dicts straight from .values()'''
+    return list(queryset.values(*values_fields(serializer_class)))
+
+
+def values_row(queryset, serializer_class):
+    '''Single row counterpart of values_rows, None when nothing matches'''
+    return queryset.values(*values_fields(serializer_class)).first()
+
+
+async def avalues_rows(queryset, serializer_class):
+    '''values_rows for async views, read with the async ORM'''
+    return [row async for row in queryset.values(*values_fields(serializer_class))]
+
+
+async def avalues_row(queryset, serializer_class):
+    return await queryset.values(*values_fields(serializer_class)).afirst()
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode, urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.cache import caches
+
+
+class TokenBucket:
+    '''rate tokens per second, up to capacity banked for bursts'''
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        '''Block until a token is available, returns the seconds waited'''
+        waited = 0
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            self.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        '''Upstream told us to stop (429, quota exhausted), hold every caller for a while'''
+        with self.lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+            self.tokens = 0
+
+
+@dataclass
+class OutboundResponse:
+    status_code: int
+    headers: dict
+    content: bytes
+    from_cache: bool = False
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} from upstream", response=self)
+
+
+@dataclass
+class HostStats:
+    requests: int = 0
+    cache_hits: int = 0
+    revalidated: int = 0
+    shared_flights: int = 0
+    rate_limited_wait: float = 0.0
+    upstream_time: float = 0.0
+    upstream_calls: int = 0
+    errors: int = 0
+    latencies: list = field(default_factory=list)
+
+
+class OutboundClient:
+    '''Shared client for third-party APIs
+
+    - one keep-alive connection pool per host (requests.Session + HTTPAdapter)
+    - token bucket per host from OUTBOUND_RATE_LIMITS, paused on 429/Retry-After and exhausted quotas
+    - concurrent identical GETs share one upstream call (single flight)
+    - GET responses cached in OUTBOUND_CACHE_ALIAS and revalidated with ETag / Last-Modified
+    '''
+
+    def __init__(self, rate_limits=None, cache_alias=None, pool_size=None, timeout=30):
+        self.rate_limits = rate_limits if rate_limits is not None else getattr(settings, "OUTBOUND_RATE_LIMITS", {})
+        self.cache_alias = cache_alias or getattr(settings, "OUTBOUND_CACHE_ALIAS", "default")
+        self.timeout = timeout
+        pool_size = pool_size or getattr(settings, "OUTBOUND_POOL_SIZE", 10)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._buckets = {}
+        self._flights = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        with self._lock:
+            if host not in self._buckets:
+                rate, burst = self.rate_limits.get(host, self.rate_limits.get("*", (None, None)))
+                self._buckets[host] = TokenBucket(rate, burst) if rate else None
+            return self._buckets[host]
+
+    def host_stats(self, host):
+        with self._lock:
+            return self._stats.setdefault(host, HostStats())
+
+    def get_json(self, url, params=None, **kwargs):
+        response = self.get(url, params, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def get(self, url, params=None, headers=None, auth=None, cache=True):
+        full_url = url + ("?" + urlencode(sorted((params or {}).items())) if params else "")
+        host = urlsplit(url).netloc
+        stats = self.host_stats(host)
+        key = hashlib.sha256(json.dumps([full_url, sorted((headers or {}).items()), repr(auth)]).encode()).hexdigest()
+        with self._lock:
+            stats.requests += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+            else:
+                stats.shared_flights += 1
+        if not leader:
+            return flight.result()
+        try:
+            response = self._fetch(full_url, host, key, headers or {}, auth, cache, stats)
+            flight.set_result(response)
+            return response
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+
+    def _fetch(self, url, host, key, headers, auth, use_cache, stats):
+        cache = caches[self.cache_alias] if use_cache else None
+        cached = cache.get("outbound:" + key) if cache is not None else None
+        if cached is not None and cached["expires"] > time.time():
+            with self._lock:
+                stats.cache_hits += 1
+            return OutboundResponse(cached["status"], cached["headers"], cached["content"], from_cache=True)
+        if cached is not None:
+            # stale, ask upstream whether it changed
+            if cached["headers"].get("etag"):
+                headers = {**headers, "If-None-Match": cached["headers"]["etag"]}
+            if cached["headers"].get("last-modified"):
+                headers = {**headers, "If-Modified-Since": cached["headers"]["last-modified"]}
+
+        bucket = self.bucket(host)
+        if bucket is not None:
+            waited = bucket.acquire()
+            with self._lock:
+                stats.rate_limited_wait += waited
+        start = time.perf_counter()
+        try:
+            upstream = self.session.get(url, headers=headers, auth=auth, timeout=self.timeout)
+        except requests.RequestException:
+            with self._lock:
+                stats.errors += 1
+            raise
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            stats.upstream_calls += 1
+            stats.upstream_time += elapsed
+            stats.latencies.append(elapsed)
+            del stats.latencies[:-1000]
+        self._respect_quota(bucket, upstream)
+
+        response_headers = {k.lower(): v for k, v in upstream.headers.items()}
+        if upstream.status_code == 304 and cached is not None:
+            with self._lock:
+                stats.revalidated += 1
+            cached["expires"] = time.time() + _max_age(response_headers)
+            cache.set("outbound:" + key, cached, getattr(settings, "OUTBOUND_CACHE_TIMEOUT", 86400))
+            return OutboundResponse(cached["status"], cached["headers"], cached["content"], from_cache=True)
+
+        response = OutboundResponse(upstream.status_code, response_headers, upstream.content)
+        cacheable = upstream.status_code == 200 and "no-store" not in response_headers.get("cache-control", "")
+        if cache is not None and cacheable and (response_headers.get("etag") or response_headers.get("last-modified") or _max_age(response_headers)):
+            cache.set("outbound:" + key, {
+                "status": response.status_code,
+                "headers": {k: v for k, v in response_headers.items() if k in ("etag", "last-modified", "content-type", "cache-control")},
+                "content": response.content,
+                "expires": time.time() + _max_age(response_headers),
+            }, getattr(settings, "OUTBOUND_CACHE_TIMEOUT", 86400))
+        return response
+
+    def _respect_quota(self, bucket, upstream):
+        if bucket is None:
+            return
+        if upstream.status_code == 429:
+            seconds = _retry_after(upstream.headers.get("Retry-After"))
+        elif upstream.headers.get("X-RateLimit-Remaining") == "0":
+            seconds = _rate_limit_reset(upstream.headers.get("X-RateLimit-Reset"))
+        else:
+            return
+        # a bad or far-off reset mustn't hold every caller for hours
+        bucket.pause(min(seconds or 60, getattr(settings, "OUTBOUND_MAX_PAUSE", 300)))
+
+    def stats(self):
+        '''Hit rate and upstream latency per host'''
+        with self._lock:
+            report = {}
+            for host, stats in self._stats.items():
+                ordered = sorted(stats.latencies)
+                report[host] = {
+                    "requests": stats.requests,
+                    "cache_hits": stats.cache_hits,
+                    "revalidated": stats.revalidated,
+                    "shared_flights": stats.shared_flights,
+                    "hit_rate": round((stats.cache_hits + stats.revalidated + stats.shared_flights) / stats.requests, 3) if stats.requests else 0,
+                    "upstream_calls": stats.upstream_calls,
+                    "upstream_errors": stats.errors,
+                    "upstream_mean_ms": round(stats.upstream_time / stats.upstream_calls * 1000, 2) if stats.upstream_calls else None,
+                    "upstream_p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 2) if ordered else None,
+                    "rate_limited_wait_s": round(stats.rate_limited_wait, 3),
+                }
+            return report
+
+
+def _max_age(headers):
+    for directive in headers.get("cache-control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name == "max-age" and value.isdigit():
+            return int(value)
+    return 0
+
+
+def _retry_after(value):
+    '''Seconds from a Retry-After style header, either delta seconds or an HTTP date'''
+    if not value:
+        return None
+    if value.isdigit():
+        return int(value)
+    try:
+        return max(0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _rate_limit_reset(value):
+    '''Seconds from X-RateLimit-Reset, which some APIs send as delta seconds and others as an epoch timestamp'''
+    seconds = _retry_after(value)
+    if seconds is not None and seconds > time.time():
+        return seconds - time.time()
+    return seconds
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    '''The process-wide client, so every caller shares its pools, buckets and cache'''
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OutboundClient()
+        return _client
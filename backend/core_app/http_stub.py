@@ -0,0 +1,60 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+class StubServer:
+    '''Local HTTP server standing in for a third-party API in tests and benchmarks
+
+    routes maps a path to a function(request) -> (status, headers, body) where request is a
+    dict with method, path, query and headers. body may be bytes, str or anything JSON encodable.
+    Every request is appended to .requests.
+
+        with StubServer({"/candidates/": lambda request: (200, {}, {"results": []})}) as stub:
+            get_client().get_json(stub.url + "/candidates/")
+    '''
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                request = {
+                    "method": "GET",
+                    "path": parts.path,
+                    "query": dict(parse_qsl(parts.query)),
+                    "headers": {k.lower(): v for k, v in self.headers.items()},
+                }
+                stub.requests.append(request)
+                route = stub.routes.get(parts.path)
+                status, headers, body = route(request) if route else (404, {}, {"detail": "not found"})
+                if not isinstance(body, (bytes, str)):
+                    body = json.dumps(body)
+                    headers = {"Content-Type": "application/json", **headers}
+                body = body.encode() if isinstance(body, str) else body
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,209 @@
+import contextvars
+import threading
+import time
+from rest_framework.serializers import ListSerializer
+
+# upper bounds for the histograms, the last bucket is +Inf
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# stats for the request being sampled on this thread/task, None when not sampled
+current = contextvars.ContextVar("perf_request", default=None)
+
+
+class RequestStats:
+    '''What one sampled request spent its time on'''
+    __slots__ = ("queries", "db_time", "serializer_time", "sql")
+
+    def __init__(self, capture_sql=False):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.sql = [] if capture_sql else None
+
+    def __call__(self, execute, sql, params, many, context):
+        # django execute_wrapper hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            if self.sql is not None:
+                self.sql.append((round(elapsed * 1000, 2), sql))
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.sum += value
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+
+class EndpointStats:
+    __slots__ = ("duration", "queries", "db_time", "serializer_time", "response_bytes", "statuses")
+
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.response_bytes = 0
+        self.statuses = {}
+
+
+class Registry:
+    '''Per-endpoint aggregates for this process'''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._events = {}
+
+    def record(self, endpoint, status, duration, stats, response_bytes):
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = self._endpoints[endpoint] = EndpointStats()
+            entry.duration.observe(duration)
+            entry.queries.observe(stats.queries)
+            entry.db_time += stats.db_time
+            entry.serializer_time += stats.serializer_time
+            entry.response_bytes += response_bytes
+            entry.statuses[status] = entry.statuses.get(status, 0) + 1
+
+    def count_event(self, name, endpoint):
+        '''Count something that happened outside a sampled request, e.g. a shed request'''
+        with self._lock:
+            key = (name, endpoint)
+            self._events[key] = self._events.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._events.clear()
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {}
+            for name, entry in sorted(self._endpoints.items()):
+                count = entry.duration.count
+                endpoints[name] = {
+                    "requests": count,
+                    "mean_ms": round(entry.duration.sum / count * 1000, 2),
+                    "mean_queries": round(entry.queries.sum / count, 2),
+                    "mean_db_ms": round(entry.db_time / count * 1000, 2),
+                    "mean_serializer_ms": round(entry.serializer_time / count * 1000, 2),
+                    "mean_response_bytes": round(entry.response_bytes / count),
+                    "statuses": dict(entry.statuses),
+                    "duration_buckets": {str(bound): total for bound, total in entry.duration.cumulative()},
+                }
+            events = {}
+            for (name, endpoint), count in sorted(self._events.items()):
+                events.setdefault(name, {})[endpoint] = count
+            return {"endpoints": endpoints, "events": events}
+
+    def prometheus(self):
+        '''Prometheus text exposition format'''
+        lines = []
+        with self._lock:
+            items = sorted(self._endpoints.items())
+            lines.append("# TYPE publiceyeusa_request_duration_seconds histogram")
+            for name, entry in items:
+                for bound, total in entry.duration.cumulative():
+                    lines.append(f'publiceyeusa_request_duration_seconds_bucket{{endpoint="{name}",le="{_le(bound)}"}} {total}')
+                lines.append(f'publiceyeusa_request_duration_seconds_sum{{endpoint="{name}"}} {entry.duration.sum}')
+                lines.append(f'publiceyeusa_request_duration_seconds_count{{endpoint="{name}"}} {entry.duration.count}')
+            lines.append("# TYPE publiceyeusa_request_queries histogram")
+            for name, entry in items:
+                for bound, total in entry.queries.cumulative():
+                    lines.append(f'publiceyeusa_request_queries_bucket{{endpoint="{name}",le="{_le(bound)}"}} {total}')
+                lines.append(f'publiceyeusa_request_queries_sum{{endpoint="{name}"}} {entry.queries.sum}')
+                lines.append(f'publiceyeusa_request_queries_count{{endpoint="{name}"}} {entry.queries.count}')
+            for metric, attr in (
+                ("publiceyeusa_db_seconds_total", "db_time"),
+                ("publiceyeusa_serializer_seconds_total", "serializer_time"),
+                ("publiceyeusa_response_bytes_total", "response_bytes"),
+            ):
+                lines.append(f"# TYPE {metric} counter")
+                for name, entry in items:
+                    lines.append(f'{metric}{{endpoint="{name}"}} {getattr(entry, attr)}')
+            lines.append("# TYPE publiceyeusa_requests_total counter")
+            for name, entry in items:
+                for status, count in sorted(entry.statuses.items()):
+                    lines.append(f'publiceyeusa_requests_total{{endpoint="{name}",status="{status}"}} {count}')
+            lines.append("# TYPE publiceyeusa_events_total counter")
+            for (event, endpoint), count in sorted(self._events.items()):
+                lines.append(f'publiceyeusa_events_total{{event="{event}",endpoint="{endpoint}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _le(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+registry = Registry()
+
+
+class TimedSerializerMixin:
+    '''Serializer mixin that adds to_representation time to the sampled request's serializer time
+
+    Only the outermost serializer, or each item of an outermost many=True list, is timed so
+    nested serializers aren't counted twice.
+    '''
+
+    def to_representation(self, instance):
+        stats = current.get()
+        parent = self.parent
+        if stats is None or parent is not None and not (isinstance(parent, ListSerializer) and parent.parent is None):
+            return super().to_representation(instance)
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serializer_time += time.perf_counter() - start
+
+
+def execute_hook(execute, sql, params, many, context):
+    '''Connection-wide execute wrapper that feeds the sampled request's stats, if any
+
+    The stats travel in a contextvar, so queries an async view runs through sync_to_async
+    (on another thread's connection) are still counted.
+    '''
+    stats = current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def _instrument_connection(sender, connection, **kwargs):
+    # connection_created fires again on reconnect, the wrapper list survives it
+    if execute_hook not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_hook)
+
+
+def install_query_timing():
+    '''Count queries of sampled requests on every connection, whichever thread opens it'''
+    from django.db.backends.signals import connection_created
+    connection_created.connect(_instrument_connection, dispatch_uid="core_app.instrumentation.query_timing")
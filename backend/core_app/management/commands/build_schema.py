@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from core_app.schema import build_schema, code_version
+
+
+class Command(BaseCommand):
+    help = "Build the OpenAPI schema once for the current code version (JSON and YAML, plain and gzipped)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--code-version", help="code version to build for, defaults to CODE_VERSION or a source hash")
+
+    def handle(self, *args, **options):
+        from publiceyeusa.urls import api_info
+        version = options["code_version"] or code_version()
+        for path in build_schema(api_info(), version):
+            self.stdout.write(f"wrote {path}")
@@ -0,0 +1,100 @@
+import logging
+import random
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject, empty
+from .instrumentation import RequestStats, current, registry
+
+slow_log = logging.getLogger("publiceyeusa.slow_requests")
+
+
+def endpoint_name(request):
+    # resolved url name, so /api/v1/affiliations/green/ and /red/ aggregate together
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    return match.view_name or match.route
+
+
+def sees_timing(request):
+    '''Server-Timing goes to staff, or to everyone under DEBUG: CORS exposes it to any origin'''
+    if settings.DEBUG:
+        return True
+    user = getattr(request, "user", None)
+    # token views have swapped AuthenticationMiddleware's lazy session user for theirs by now;
+    # resolving an untouched lazy one could query the database, from async code too
+    if user is None or isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return False
+    return user.is_staff
+
+
+class PerformanceMiddleware:
+    '''Samples requests and records wall time, DB queries and time, serializer time and response size
+
+    Sampled responses to staff carry a Server-Timing header; aggregates are served by core_app's metrics views.
+    With PERF_SLOW_REQUEST_MS set every request is timed, so none slow enough is missed from the log.
+    Works under WSGI and ASGI, so async views don't get pushed onto a thread by this middleware.
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "PERF_SAMPLE_RATE", 0.1)
+        self.slow_ms = getattr(settings, "PERF_SLOW_REQUEST_MS", None)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sampled = self.sampled()
+        if not sampled and not self.slow_ms:
+            return self.get_response(request)
+        stats, token, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, stats, start, sampled)
+
+    async def __acall__(self, request):
+        sampled = self.sampled()
+        if not sampled and not self.slow_ms:
+            return await self.get_response(request)
+        stats, token, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, stats, start, sampled)
+
+    def sampled(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self):
+        # queries are counted by instrumentation.execute_hook on whatever connection runs them
+        stats = RequestStats(capture_sql=bool(self.slow_ms))
+        return stats, current.set(stats), time.perf_counter()
+
+    def finish(self, request, response, stats, start, sampled=True):
+        duration = time.perf_counter() - start
+
+        endpoint = endpoint_name(request)
+        if sampled:
+            size = 0 if response.streaming else len(response.content)
+            registry.record(endpoint, response.status_code, duration, stats, size)
+        if sampled and sees_timing(request):
+            response["Server-Timing"] = (
+                f"app;dur={duration * 1000:.2f}, "
+                f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", '
+                f"ser;dur={stats.serializer_time * 1000:.2f}"
+            )
+        if self.slow_ms and duration * 1000 >= self.slow_ms:
+            slow_log.warning(
+                "slow request %s %s (%s) %.1fms, %d queries, %.1fms db\n%s",
+                request.method, request.path, endpoint, duration * 1000, stats.queries, stats.db_time * 1000,
+                "\n".join(f"  {ms}ms {sql}" for ms, sql in stats.sql),
+            )
+        return response
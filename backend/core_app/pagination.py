@@ -0,0 +1,152 @@
+import base64
+import json
+from django.core.exceptions import ValidationError as FieldValidationError
+from django.db.models import BooleanField, F, Func, Q, Value
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValidationError({"cursor": "Invalid cursor."})
+    if not isinstance(values, list):
+        raise ValidationError({"cursor": "Invalid cursor."})
+    return values
+
+
+class RowComparison(Func):
+    '''(a, b) > (x, y) as one row value comparison, which PostgreSQL starts an index range scan from'''
+    conditional = True
+    output_field = BooleanField()
+
+    def __init__(self, columns, values, operator):
+        super().__init__(*columns, *values)
+        self.operator = operator
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sqls, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            sqls.append(sql)
+            params.extend(expression_params)
+        half = len(sqls) // 2
+        return f"({', '.join(sqls[:half])}) {self.operator} ({', '.join(sqls[half:])})", params
+
+
+class KeysetPagination(BasePagination):
+    '''Cursor pagination on the ordering columns, so every page is an index range scan
+
+    The ordering columns must be NOT NULL and end in a unique one (normally id), and should be
+    covered by an index in that order. The cursor carries the last row's
+    ordering values, and the next page is the rows strictly after it, however deep the client is.
+    '''
+    ordering = ("id",)
+    default_limit = 50
+    max_limit = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, "keyset_ordering", self.ordering)
+        self.fields = [(name.lstrip("-"), name.startswith("-")) for name in ordering]
+        limit = self.get_limit(request)
+        queryset = queryset.order_by(*ordering)
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != len(self.fields):
+                raise ValidationError({"cursor": "Invalid cursor."})
+            queryset = queryset.filter(self.after(queryset.model, values))
+        rows = list(queryset[:limit + 1])
+        self.next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            self.next_cursor = encode_cursor([getattr(rows[-1], name) for name, descending in self.fields])
+        return rows
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            raise ValidationError({"limit": "Must be a number."})
+        return max(1, min(limit, self.max_limit))
+
+    def after(self, model, values):
+        fields = []
+        for (name, descending), value in zip(self.fields, values):
+            field = model._meta.get_field(name)
+            try:
+                fields.append((name, descending, field, field.to_python(value)))
+            except (FieldValidationError, TypeError, ValueError):
+                raise ValidationError({"cursor": "Invalid cursor."})
+        if len({descending for _, descending, _, _ in fields}) == 1:
+            return RowComparison(
+                [F(name) for name, _, _, _ in fields],
+                [Value(value, output_field=field) for _, _, field, value in fields],
+                "<" if fields[0][1] else ">",
+            )
+        # mixed directions: a > x OR (a = x AND b < y), with a >= x repeated up front so the
+        # scan still starts at x on the leading column
+        condition = Q()
+        equal = Q()
+        for name, descending, _, value in fields:
+            condition |= equal & Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+            equal &= Q(**{name: value})
+        leading, descending, _, value = fields[0]
+        return Q(**{f"{leading}__{'lte' if descending else 'gte'}": value}) & condition
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.next_cursor, "results": data})
+
+
+class SparseFieldsMixin:
+    '''Serializer mixin that only keeps the fields listed in context["fields"]'''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get("fields")
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def requested_fields(request, serializer_class):
+    '''Parse ?fields=a,b against the serializer's fields, None when not given'''
+    fields = request.query_params.get("fields")
+    if not fields:
+        return None
+    fields = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = set(fields) - set(serializer_class.Meta.fields)
+    if unknown:
+        raise ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown))}."})
+    return fields
+
+
+def keyset_list(view, request, queryset, serializer_class):
+    '''A keyset page of queryset, loading and serializing only the requested fields'''
+    fields = requested_fields(request, serializer_class)
+    if fields:
+        # ordering columns have to be loaded to build the next cursor
+        ordering = [name.lstrip("-") for name in getattr(view, "keyset_ordering", KeysetPagination.ordering)]
+        model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+        queryset = queryset.only(*(set(fields) | set(ordering)) & model_fields)
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(queryset, request, view)
+    ser_page = serializer_class(page, many=True, context={"request": request, "fields": fields})
+    return paginator.get_paginated_response(ser_page.data)
+
+
+class KeysetListView(APIView):
+    '''Read-only list endpoint with ?cursor=&limit=&fields='''
+    queryset = None
+    serializer_class = None
+    keyset_ordering = ("id",)
+
+    def get(self, request):
+        return keyset_list(self, request, self.queryset.all(), self.serializer_class)
@@ -0,0 +1,28 @@
+class InvalidQuery(Exception):
+    '''A query parameter the endpoint can't use, answered with a 400'''
+    pass
+
+
+def int_param(params, name, default=None, maximum=None):
+    '''A positive whole number parameter, at most maximum when given'''
+    value = params.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise InvalidQuery(f"{name} must be a number.")
+    if maximum is not None and not 1 <= value <= maximum:
+        raise InvalidQuery(f"{name} must be between 1 and {maximum}.")
+    if value < 1:
+        raise InvalidQuery(f"{name} must be at least 1.")
+    return value
+
+
+def limit_param(params, default, maximum):
+    '''A page size, clamped to 1..maximum like KeysetPagination's limit'''
+    try:
+        value = int(params.get("limit") or default)
+    except ValueError:
+        raise InvalidQuery("limit must be a number.")
+    return max(1, min(value, maximum))
@@ -0,0 +1,52 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None
+
+_renderer = JSONRenderer()
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # anything orjson can't encode natively goes through DRF's encoder, same as JSONRenderer
+    return _encoder.default(obj)
+
+
+def dumps(data):
+    '''Compact JSON bytes, byte-identical to DRF's JSONRenderer for data without floats
+
+    orjson and json format some floats differently (1e+16 vs 1e16), which is why the fast paths
+    only serialize the column types values_fields() allows.
+    '''
+    if orjson is not None and _renderer.compact and not _renderer.ensure_ascii:
+        try:
+            # DRF formats datetimes itself, so hand those back to its encoder
+            ret = orjson.dumps(data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except (orjson.JSONEncodeError, TypeError):
+            return _renderer.render(data)
+        # JSONRenderer always escapes the two line separators javascript chokes on
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+    return _renderer.render(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    '''JSONRenderer that encodes with orjson, for views that return .values() fast path rows'''
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # pretty printing is rare and only the stdlib encoder supports arbitrary indents
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+
+def with_fast_json(renderer_classes):
+    '''renderer_classes with JSONRenderer swapped for FastJSONRenderer'''
+    return [FastJSONRenderer if renderer is JSONRenderer else renderer for renderer in renderer_classes]
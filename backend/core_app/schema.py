@@ -0,0 +1,133 @@
+import gzip
+import hashlib
+import os
+import threading
+from importlib import import_module
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from django.views import View
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+# swagger<format>/ suffix -> content type and drf_yasg codec
+FORMATS = {
+    ".json": ("application/json", OpenAPICodecJson),
+    ".yaml": ("application/yaml", OpenAPICodecYaml),
+}
+
+_lock = threading.Lock()
+# pre-serialized documents for the code version this process runs
+_documents = {}
+
+
+def source_files():
+    '''Python sources of the project package and the installed apps that live under BASE_DIR
+
+    Only those directories are walked, so a virtualenv or anything else kept under BASE_DIR
+    is never read.
+    '''
+    base = Path(settings.BASE_DIR).resolve()
+    roots = {Path(config.path).resolve() for config in apps.get_app_configs()}
+    roots.add(Path(import_module(settings.ROOT_URLCONF).__file__).resolve().parent)
+    files = set()
+    for root in roots:
+        if root.is_relative_to(base):
+            files.update(path for path in root.rglob("*.py") if "migrations" not in path.relative_to(root).parts)
+    return sorted(files)
+
+
+def code_version():
+    '''CODE_VERSION from the environment, or a hash of the project's python sources'''
+    if getattr(settings, "CODE_VERSION", None):
+        return settings.CODE_VERSION
+    base = Path(settings.BASE_DIR).resolve()
+    digest = hashlib.sha256()
+    for path in source_files():
+        digest.update(str(path.relative_to(base)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def schema_dir():
+    return Path(getattr(settings, "SCHEMA_CACHE_DIR", Path(settings.BASE_DIR) / ".schema_cache"))
+
+
+def schema_path(version, fmt, gzipped=False):
+    return schema_dir() / f"schema-{version}{fmt}{'.gz' if gzipped else ''}"
+
+
+def _write(path, body):
+    # write then rename so other workers never read a half written file
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(body)
+    os.replace(tmp, path)
+
+
+def build_schema(info, version=None):
+    '''Introspect every view once and store the JSON and YAML documents, plain and gzipped'''
+    version = version or code_version()
+    generator = OpenAPISchemaGenerator(info)
+    schema = generator.get_schema(request=None, public=True)
+    schema_dir().mkdir(parents=True, exist_ok=True)
+    paths = []
+    for fmt, (content_type, codec) in FORMATS.items():
+        body = codec(validators=[]).encode(schema)
+        _write(schema_path(version, fmt), body)
+        _write(schema_path(version, fmt, gzipped=True), gzip.compress(body, mtime=0))
+        paths.append(schema_path(version, fmt))
+    return paths
+
+
+def get_document(info, fmt):
+    '''Pre-serialized schema for this code version, building it on first use'''
+    if fmt in _documents:
+        return _documents[fmt]
+    with _lock:
+        if fmt not in _documents:
+            # code can't change under a running process, so the version is worked out once
+            version = _documents.setdefault("version", code_version())
+            if not schema_path(version, fmt).exists():
+                build_schema(info, version)
+            body = schema_path(version, fmt).read_bytes()
+            _documents[fmt] = {
+                "body": body,
+                "gzip": schema_path(version, fmt, gzipped=True).read_bytes(),
+                "etag": '"{}"'.format(hashlib.sha256(body).hexdigest()),
+            }
+    return _documents[fmt]
+
+
+class CachedSchemaView(View):
+    '''Serve the build-once schema with ETag, Cache-Control and gzip when accepted'''
+    info = None
+
+    def get(self, request, format=".json"):
+        if format not in FORMATS:
+            return HttpResponse(status=404)
+        document = get_document(self.info, format)
+        headers = {
+            "ETag": document["etag"],
+            "Cache-Control": f"public, max-age={getattr(settings, 'SCHEMA_MAX_AGE', 3600)}",
+            "Vary": "Accept-Encoding",
+        }
+        if document["etag"] in parse_etags(request.headers.get("If-None-Match", "")):
+            return HttpResponse(status=304, headers=headers)
+        body = document["body"]
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            body = document["gzip"]
+            headers["Content-Encoding"] = "gzip"
+        return HttpResponse(body, content_type=FORMATS[format][0], headers=headers)
+
+
+def schema_ui(ui_view, info):
+    '''Wrap a drf_yasg UI view so its ?format=openapi spec request is served from the cache'''
+    spec_view = CachedSchemaView.as_view(info=info)
+
+    def view(request, *args, **kwargs):
+        if request.GET.get("format") == "openapi":
+            return spec_view(request, format=".json")
+        return ui_view(request, *args, **kwargs)
+    return view
@@ -0,0 +1,324 @@
+import gzip
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from django.apps import apps
+from django.conf import settings
+from unittest.mock import patch
+from django.core.exceptions import ImproperlyConfigured
+from django.http import Http404
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ModelSerializer
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from user_app.models import User
+from . import schema
+from .caching import check_shared_caches
+from .instrumentation import RequestStats, current, registry
+from .http_client import OutboundClient, TokenBucket
+from .http_stub import StubServer
+from .fastpath import values_fields, values_rows
+from .renderers import FastJSONRenderer, dumps
+
+# Create your tests here.
+class DatabasePoolStatsTests(TestCase):
+    def test_staff_only(self):
+        user = User.objects.create_user(username="s@s.com", email="s@s.com", password="pass12345!")
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+        self.assertEqual(client.get("/api/v1/metrics/db/").status_code, 403)
+        user.is_staff = True
+        user.save()
+        response = client.get("/api/v1/metrics/db/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("connections_opened", response.data)
+        # counted process-wide from the request signals, this request is the one in flight
+        self.assertEqual(response.data["requests_in_flight"], 1)
+
+
+class CachedSchemaTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        override = override_settings(SCHEMA_CACHE_DIR=self.tmp.name, CODE_VERSION="test")
+        override.enable()
+        self.addCleanup(override.disable)
+        schema._documents.clear()
+        self.addCleanup(schema._documents.clear)
+
+    def test_schema_is_built_once_and_served_with_etag(self):
+        response = self.client.get("/swagger.json/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("/profile/", json.loads(response.content)["paths"])
+        with self.assertNumQueries(0):
+            cached = self.client.get("/swagger.json/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_code_version_only_reads_project_sources(self):
+        base = Path(settings.BASE_DIR).resolve()
+        files = schema.source_files()
+        self.assertIn(base / "core_app" / "schema.py", files)
+        self.assertIn(base / "publiceyeusa" / "urls.py", files)
+        # apps' own directories only: no virtualenvs, benchmarks or migrations
+        tops = {path.relative_to(base).parts[0] for path in files}
+        self.assertLessEqual(tops, {config.name.split(".")[0] for config in apps.get_app_configs()} | {"publiceyeusa"})
+        self.assertFalse(any("migrations" in path.parts for path in files))
+        with self.settings(CODE_VERSION=None):
+            self.assertEqual(len(schema.code_version()), 16)
+
+    def test_gzip_and_ui_spec(self):
+        plain = self.client.get("/swagger.yaml/").content
+        zipped = self.client.get("/swagger.yaml/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(zipped["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(zipped.content), plain)
+        spec = self.client.get("/redoc/?format=openapi")
+        self.assertEqual(spec.content, self.client.get("/swagger.json/").content)
+
+
+@override_settings(PERF_SAMPLE_RATE=1.0, PERF_SLOW_REQUEST_MS=1)
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+        user = User.objects.create_user(username="s@s.com", email="s@s.com", password="pass12345!", is_staff=True)
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+
+    def test_sampled_request_is_recorded(self):
+        with self.assertLogs("publiceyeusa.slow_requests") as logs:
+            response = self.api.get("/api/v1/affiliations/")
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn("SELECT", logs.output[0])
+        stats = self.api.get("/api/v1/metrics/").data["endpoints"]["all_interest_categories"]
+        self.assertEqual(stats["requests"], 1)
+        self.assertEqual(stats["statuses"], {200: 1})
+        text = self.api.get("/api/v1/metrics/prometheus/").content.decode()
+        self.assertIn('publiceyeusa_request_duration_seconds_count{endpoint="all_interest_categories"} 1', text)
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_slow_requests_are_logged_unsampled(self):
+        with self.assertLogs("publiceyeusa.slow_requests") as logs:
+            response = self.api.get("/api/v1/affiliations/")
+        self.assertIn("SELECT", logs.output[0])
+        # only sampled requests get the header and the aggregates
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(registry.snapshot()["endpoints"], {})
+
+    @override_settings(PERF_SLOW_REQUEST_MS=None)
+    def test_timing_header_is_for_staff(self):
+        self.assertNotIn("Server-Timing", self.client.get("/api/v1/affiliations/"))
+        user = User.objects.create_user(username="u@s.com", email="u@s.com", password="pass12345!")
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+        self.assertNotIn("Server-Timing", api.get("/api/v1/users/"))
+        self.assertIn("Server-Timing", self.api.get("/api/v1/users/"))
+
+    def test_serializer_time_counts_outermost_serializers(self):
+        from affiliation_app.models import Affiliation
+        from profile_app.models import Profile
+        from profile_app.serializers import ProfileSerializer
+        profile = Profile.objects.create(user=User.objects.get(), display_name="staff")
+        profile.affiliations.set([Affiliation.objects.create(category="Green")])
+        stats = RequestStats()
+        token = current.set(stats)
+        try:
+            ProfileSerializer([profile], many=True).data
+        finally:
+            current.reset(token)
+        self.assertGreater(stats.serializer_time, 0)
+
+
+class OutboundClientTests(TestCase):
+    def setUp(self):
+        self.client_ = OutboundClient(rate_limits={})
+
+    def test_etag_revalidation(self):
+        def catalog(request):
+            if request["headers"].get("if-none-match") == '"v1"':
+                return 304, {"ETag": '"v1"'}, b""
+            return 200, {"ETag": '"v1"'}, {"results": [1, 2]}
+        with StubServer({"/catalog/": catalog}) as stub:
+            first = self.client_.get(stub.url + "/catalog/", {"page": 1})
+            second = self.client_.get(stub.url + "/catalog/", {"page": 1})
+        self.assertFalse(first.from_cache)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.json(), {"results": [1, 2]})
+        self.assertEqual(len(stub.requests), 2)
+        host = stub.url.split("//")[1]
+        self.assertEqual(self.client_.stats()[host]["revalidated"], 1)
+
+    def test_concurrent_identical_requests_share_one_call(self):
+        def slow(request):
+            time.sleep(0.2)
+            return 200, {"Cache-Control": "no-store"}, {"ok": True}
+        with StubServer({"/slow/": slow}) as stub:
+            threads = [threading.Thread(target=self.client_.get_json, args=(stub.url + "/slow/",)) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(stub.requests), 1)
+
+    def test_token_bucket_waits_and_pauses(self):
+        now = [0.0]
+        bucket = TokenBucket(rate=2, capacity=1, clock=lambda: now[0], sleep=lambda s: now.__setitem__(0, now[0] + s))
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+        bucket.pause(10)
+        self.assertGreaterEqual(bucket.acquire(), 10)
+
+    @override_settings(OUTBOUND_MAX_PAUSE=120)
+    def test_rate_limit_reset_pauses(self):
+        # delta seconds, epoch timestamps, and both clamped to OUTBOUND_MAX_PAUSE
+        for reset, pause in ((30, 30), (int(time.time()) + 45, 45), (int(time.time()) + 86400, 120), (7200, 120)):
+            bucket = TokenBucket(rate=1, capacity=1, clock=lambda: 0.0)
+            upstream = SimpleNamespace(status_code=200, headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)})
+            self.client_._respect_quota(bucket, upstream)
+            self.assertAlmostEqual(bucket.paused_until, pause, delta=1)
+
+
+class FastPathTests(TestCase):
+    def test_dumps_matches_json_renderer(self):
+        data = [{"id": 1, "category": "a\u2028b\u2029 \x1f é 😀 \"\\/"}, {"id": 2, "category": None, "flag": True}]
+        self.assertEqual(dumps(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(data, "application/json; indent=2"), JSONRenderer().render(data, "application/json; indent=2"))
+
+    def test_values_rows_match_serializer(self):
+        class EmailSerializer(ModelSerializer):
+            class Meta:
+                model = User
+                fields = ["email", "is_staff"]
+        User.objects.create_user(username="f@f.com", email="f@f.com", password="pass12345!")
+        users = User.objects.order_by("id")
+        self.assertEqual(dumps(values_rows(users, EmailSerializer)), JSONRenderer().render(EmailSerializer(users, many=True).data))
+
+    def test_rejects_fields_needing_drf(self):
+        class JoinedSerializer(ModelSerializer):
+            class Meta:
+                model = User
+                fields = ["email", "date_joined"]
+        with self.assertRaises(ImproperlyConfigured):
+            values_fields(JoinedSerializer)
+
+
+class BatchTests(TestCase):
+    def setUp(self):
+        from affiliation_app.models import Affiliation
+        from profile_app.models import Profile
+        from user_app.authentication import token_cache
+        token_cache.clear()
+        self.user = User.objects.create_user(username="b@b.com", email="b@b.com", password="pass12345!")
+        Profile.objects.create(user=self.user, display_name="batcher")
+        Affiliation.objects.create(category="Green Party")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+
+    def batch(self, requests):
+        return self.client.post("/api/v1/batch/", {"requests": requests}, format="json")
+
+    def test_matches_individual_calls(self):
+        paths = ["users/", "profile/", "profile/display_name/", "affiliations/"]
+        response = self.batch([{"path": path} for path in paths])
+        self.assertEqual(response.status_code, 200)
+        for path, item in zip(paths, response.json()["responses"]):
+            single = self.client.get(f"/api/v1/{path}")
+            self.assertEqual((item["status"], item["body"]), (single.status_code, single.json()))
+
+    def test_token_is_authenticated_once(self):
+        from user_app.authentication import token_cache
+        token_cache.clear()
+        # one token lookup, then only the sub-views' own queries
+        with self.assertNumQueries(1 + 2 + 1):
+            self.batch([{"path": "profile/"}, {"path": "profile/display_name/"}])
+
+    def test_per_item_status_and_writes(self):
+        response = self.batch([
+            {"method": "PUT", "path": "profile/edit_profile/", "body": {"display_name": "renamed"}},
+            {"path": "nowhere/"},
+            {"path": "batch/", "method": "POST"},
+            {"path": "/admin/"},
+        ])
+        statuses = [item["status"] for item in response.json()["responses"]]
+        self.assertEqual(statuses, [200, 404, 400, 400])
+        self.assertEqual(response.json()["responses"][0]["body"]["display_name"], "renamed")
+
+    def test_plain_view_errors_keep_their_status(self):
+        from django.urls import ResolverMatch
+        from . import batch
+
+        async def missing(request):
+            raise Http404()
+        with patch.object(batch, "resolve", return_value=ResolverMatch(missing, (), {})):
+            response = self.batch([{"path": "users/"}])
+        self.assertEqual(response.json()["responses"], [{"status": 404, "body": "Not found."}])
+
+    @override_settings(PERF_SAMPLE_RATE=1.0)
+    def test_sub_requests_are_recorded(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+        self.batch([{"path": "users/"}, {"path": "profile/"}])
+        endpoints = registry.snapshot()["endpoints"]
+        self.assertEqual((endpoints["info"]["requests"], endpoints["user_profile"]["requests"]), (1, 1))
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_batch_size_cap(self):
+        self.assertEqual(self.batch([{"path": "users/"}] * 3).status_code, 400)
+        self.assertEqual(self.batch([]).status_code, 400)
+
+
+@override_settings(THROTTLE_STORE="memory")
+class SlidingWindowTests(TestCase):
+    def setUp(self):
+        from .throttling import get_store
+        get_store().clear()
+
+    def test_previous_window_is_weighted(self):
+        from .throttling import hit
+        # 4 hits late in window 0 fill the limit
+        self.assertEqual([hit("k", 4, 60, now=50)[0] for _ in range(5)], [True] * 4 + [False])
+        # a quarter into window 1, 5 * 0.75 of the previous window still counts
+        allowed, wait = hit("k", 4, 60, now=75)
+        self.assertFalse(allowed)
+        self.assertGreaterEqual(wait, 1)
+        # near the end of window 1 most of it has faded
+        self.assertTrue(hit("k", 4, 60, now=115)[0])
+
+
+class ApiWorkerSettingsTests(TestCase):
+    def test_boots_without_schema_imports(self):
+        import os
+        import subprocess
+        import sys
+        from django.conf import settings
+        script = (
+            "import sys, django; django.setup();"
+            "from django.urls import get_resolver; get_resolver().url_patterns;"
+            "print(sorted(m for m in ('drf_yasg', 'pkg_resources', 'requests_oauthlib') if m in sys.modules))"
+        )
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "publiceyeusa.settings_api", "DB_ENGINE": "sqlite", "DJANGO_KEY": "x"}
+        result = subprocess.run([sys.executable, "-c", script], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+
+class SharedCacheTests(TestCase):
+    def ids(self):
+        return [message.id for message in check_shared_caches()]
+
+    def test_several_workers_need_shared_caches(self):
+        # one worker may use LocMem
+        self.assertEqual(self.ids(), [])
+        with override_settings(WEB_WORKERS=4):
+            self.assertEqual(self.ids(), ["core_app.E001", "core_app.W001"])
+            shared = {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+            with override_settings(CACHES={"default": settings.CACHES["default"], "shared": shared}, AFFILIATION_CACHE_ALIAS="shared"):
+                self.assertEqual(self.ids(), ["core_app.W001"])
+                with override_settings(THROTTLE_CACHE_ALIAS="shared"):
+                    self.assertEqual(self.ids(), [])
+                with override_settings(TOKEN_CACHE_ALIAS="default"):
+                    self.assertEqual(self.ids(), ["core_app.E001", "core_app.W001"])
@@ -0,0 +1,174 @@
+import hashlib
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+from .instrumentation import registry
+
+DURATIONS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+
+
+def parse_rate(rate):
+    '''"20/min" -> (20, 60)'''
+    count, period = rate.split("/")
+    return int(count), DURATIONS[period]
+
+
+class MemoryCounterStore:
+    '''Per-process counters with expiry, for tests and single-worker setups'''
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._counters.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            return 0
+        return entry[0]
+
+    def incr(self, key, ttl):
+        now = time.monotonic()
+        with self._lock:
+            value, expires = self._counters.get(key, (0, 0))
+            if expires <= now:
+                # expired windows are dropped as they're touched, plus a sweep when the dict grows
+                value, expires = 0, now + ttl
+                if len(self._counters) > 10000:
+                    self._counters = {k: v for k, v in self._counters.items() if v[1] > now}
+            self._counters[key] = (value + 1, expires)
+            return value + 1
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+
+class CacheCounterStore:
+    '''Counters in a Django cache alias; point it at a Redis cache to share limits across workers'''
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def get(self, key):
+        return caches[self.alias].get(key, 0)
+
+    def incr(self, key, ttl):
+        cache = caches[self.alias]
+        # add only succeeds for the first hit in a window, after that incr is atomic on Redis and memcached
+        if cache.add(key, 1, ttl):
+            return 1
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # expired between add and incr
+            cache.add(key, 1, ttl)
+            return 1
+
+
+_stores = {}
+
+
+def get_store():
+    '''The configured counter store: THROTTLE_STORE is "memory" or "cache" (THROTTLE_CACHE_ALIAS)'''
+    kind = getattr(settings, "THROTTLE_STORE", "cache")
+    if kind not in _stores:
+        if kind == "memory":
+            _stores[kind] = MemoryCounterStore()
+        else:
+            _stores[kind] = CacheCounterStore(getattr(settings, "THROTTLE_CACHE_ALIAS", "default"))
+    return _stores[kind]
+
+
+def hit(key, limit, window, now=None):
+    '''Sliding window counter: one read and one increment, whatever the rate
+
+    The previous fixed window is weighted by how much of it still overlaps the sliding
+    window, which approximates a true sliding log without storing timestamps.
+    Returns (allowed, seconds until the estimate drops back under the limit).
+    '''
+    now = time.time() if now is None else now
+    index, offset = divmod(now, window)
+    store = get_store()
+    previous = store.get(f"throttle:{key}:{int(index) - 1}")
+    current = store.incr(f"throttle:{key}:{int(index)}", window * 2)
+    weight = 1 - offset / window
+    if previous * weight + current <= limit:
+        return True, None
+    # the previous window's share fades linearly, the current one only resets with the next window
+    if previous and current <= limit:
+        wait = (previous * weight + current - limit) / previous * window
+    else:
+        wait = window - offset
+    return False, max(1, math.ceil(wait))
+
+
+class RateThrottle(BaseThrottle):
+    '''Limits a view by THROTTLE_RATES["<view.throttle_scope>_<kind>"], skipped when that rate isn't set'''
+    kind = None
+
+    def get_key(self, request, view, data):
+        raise NotImplementedError
+
+    def check(self, request, view, data):
+        scope = f"{getattr(view, 'throttle_scope', None)}_{self.kind}"
+        rate = getattr(settings, "THROTTLE_RATES", {}).get(scope)
+        self.retry_after = None
+        if not rate:
+            return True
+        key = self.get_key(request, view, data)
+        if key is None:
+            return True
+        allowed, self.retry_after = hit(f"{scope}:{key}", *parse_rate(rate))
+        if not allowed:
+            # shed requests show up next to the endpoint stats
+            registry.count_event("throttled", scope)
+        return allowed
+
+    def allow_request(self, request, view):
+        return self.check(request, view, request.data)
+
+    def wait(self):
+        return self.retry_after
+
+
+class IPRateThrottle(RateThrottle):
+    '''Per client address: REMOTE_ADDR, or X-Forwarded-For read through REST_FRAMEWORK NUM_PROXIES trusted proxies'''
+    kind = "ip"
+
+    def get_key(self, request, view, data):
+        return self.get_ident(request)
+
+
+class AccountRateThrottle(RateThrottle):
+    '''Per target account, so one email can't be guessed at from many addresses'''
+    kind = "account"
+
+    def get_key(self, request, view, data):
+        email = data.get("email") if hasattr(data, "get") else None
+        if not isinstance(email, str) or not email:
+            return None
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+
+
+class EndpointRateThrottle(RateThrottle):
+    '''Everyone together, admission control for the endpoint as a whole'''
+    kind = "endpoint"
+
+    def get_key(self, request, view, data):
+        return "all"
+
+
+AUTH_THROTTLES = [EndpointRateThrottle, IPRateThrottle, AccountRateThrottle]
+
+
+def throttle_wait(throttle_classes, request, view, data):
+    '''Run throttles for a plain Django view; seconds to wait when any rejects, else None'''
+    waits = []
+    for throttle_class in throttle_classes:
+        throttle = throttle_class()
+        if not throttle.check(request, view, data):
+            waits.append(throttle.wait())
+    return max(waits) if waits else None
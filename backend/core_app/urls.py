@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import DatabasePoolStats, EndpointStats, PrometheusMetrics
+
+# operational metrics, staff only
+urlpatterns = [
+    path("", EndpointStats.as_view(), name="endpoint_stats"),
+    path("prometheus/", PrometheusMetrics.as_view(), name="prometheus_metrics"),
+    path("db/", DatabasePoolStats.as_view(), name="db_pool_stats"),
+]
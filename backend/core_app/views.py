@@ -0,0 +1,84 @@
+import sys
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAdminUser
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+from .docs import openapi, swagger_auto_schema
+from user_app.authentication import CachedTokenAuthentication
+from django.http import HttpResponse
+from .batch import InvalidBatch, clean_items, run_batch
+from .db_metrics import pool_stats
+from .instrumentation import registry
+
+
+def outbound_stats():
+    # an outbound client only exists once something imported http_client, so don't import it just to report nothing
+    if "core_app.http_client" not in sys.modules:
+        return {}
+    from .http_client import get_client
+    return get_client().stats()
+
+
+# Create your views here.
+class DatabasePoolStats(APIView):
+    '''Connection pool metrics for the worker that serves the request'''
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(auto_schema=None)
+    def get(self, request):
+        return Response(pool_stats(), status=HTTP_200_OK)
+
+
+class EndpointStats(APIView):
+    '''Aggregated per-endpoint timing, query and size stats for this worker'''
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(auto_schema=None)
+    def get(self, request):
+        return Response({**registry.snapshot(), "outbound": outbound_stats()}, status=HTTP_200_OK)
+
+
+class PrometheusMetrics(APIView):
+    '''The same stats in Prometheus text format'''
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(auto_schema=None)
+    def get(self, request):
+        lines = [registry.prometheus()]
+        for metric in ("requests", "cache_hits", "revalidated", "shared_flights", "upstream_calls", "upstream_errors"):
+            lines.append(f"# TYPE publiceyeusa_outbound_{metric}_total counter\n")
+            for host, stats in outbound_stats().items():
+                lines.append(f'publiceyeusa_outbound_{metric}_total{{host="{host}"}} {stats[metric]}\n')
+        return HttpResponse("".join(lines), content_type="text/plain; version=0.0.4")
+
+
+class Batch(APIView):
+    '''Run several API requests in one round trip, authenticating the token once'''
+    authentication_classes = [CachedTokenAuthentication]
+
+    @swagger_auto_schema(
+        operation_summary="Batch API requests",
+        operation_description="Runs each sub-request against the v1 API in order and returns every status and body. Sub-requests share the batch's token. At most BATCH_MAX_REQUESTS per batch.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={"requests": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "method": openapi.Schema(type=openapi.TYPE_STRING, default="GET"),
+                    "path": openapi.Schema(type=openapi.TYPE_STRING, description="relative to /api/v1/, e.g. profile/"),
+                    "body": openapi.Schema(type=openapi.TYPE_OBJECT),
+                },
+            ))},
+        ),
+        responses={200: "{responses: [{status, body}]} in request order.", 400: "Invalid or oversized batch."},
+    )
+    def post(self, request):
+        try:
+            items = clean_items(request.data)
+        except InvalidBatch as e:
+            return Response(str(e), status=HTTP_400_BAD_REQUEST)
+        # the sub-responses are already JSON, so the envelope is assembled as bytes
+        return HttpResponse(run_batch(request, items, Batch), content_type="application/json", status=HTTP_200_OK)
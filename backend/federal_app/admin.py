@@ -0,0 +1,5 @@
+from django.contrib import admin
+from .models import Bill, Candidate, Contribution, Organization, SyncCheckpoint
+
+# Register your models here.
+admin.site.register([Candidate, Organization, Bill, Contribution, SyncCheckpoint])
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class FederalAppConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'federal_app'
+
+    def ready(self):
+        # append ingested pages to the columnar snapshots
+        from . import signals
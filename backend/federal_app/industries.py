@@ -0,0 +1,44 @@
+import re
+
+# Itemized receipts only carry the donor's occupation and employer. Donors are bucketed
+# into a coarse industry from those, first matching keyword wins, so finance rollups
+# can group by it with a plain column. Keywords match whole words, or words starting
+# with them when they end in *, so OIL doesn't match SOIL SCIENTIST. Trades come before
+# Energy so an ELECTRICIAN isn't counted as a utility.
+
+INDUSTRIES = [
+    ("Retired", ("RETIRED",)),
+    ("Not Employed", ("NOT EMPLOYED", "UNEMPLOYED", "HOMEMAKER", "STUDENT")),
+    ("Lawyers & Lobbyists", ("ATTORNEY", "LAWYER", "LAW FIRM", "PARALEGAL", "LOBBYIST", "COUNSEL")),
+    ("Health", ("PHYSICIAN", "DOCTOR", "NURSE", "DENTIST", "PHARMAC*", "HOSPITAL", "HEALTH*", "MEDICAL", "SURGEON")),
+    ("Education", ("TEACHER", "PROFESSOR", "EDUCATOR", "UNIVERSITY", "SCHOOL", "COLLEGE")),
+    ("Finance & Real Estate", ("BANK*", "FINANCE", "FINANCIAL", "INVEST*", "CAPITAL", "INSURANCE", "REAL ESTATE", "REALTOR", "ACCOUNTANT", "CPA")),
+    ("Technology", ("SOFTWARE", "ENGINEER*", "PROGRAMMER", "DEVELOPER", "TECHNOLOG*", "DATA SCIENTIST")),
+    ("Construction", ("CONSTRUCTION", "CONTRACTOR", "BUILDER", "ARCHITECT*", "ELECTRICIAN", "PLUMBER")),
+    ("Energy", ("OIL", "GAS", "ENERGY", "PETROLEUM", "UTILITY", "UTILITIES", "ELECTRIC")),
+    ("Agriculture", ("FARM*", "RANCH*", "AGRICULTUR*")),
+    ("Government", ("GOVERNMENT", "PUBLIC SERVANT", "MILITARY", "ARMY", "NAVY", "POLICE", "FIREFIGHTER")),
+    ("Business", ("CEO", "EXECUTIVE", "PRESIDENT", "OWNER", "MANAGER", "CONSULTANT", "SELF-EMPLOYED", "SELF EMPLOYED", "SALES")),
+]
+OTHER = "Other"
+UNKNOWN = "Unknown"
+
+
+def _pattern(keywords):
+    words = (re.escape(keyword[:-1]) + r"\w*" if keyword.endswith("*") else re.escape(keyword) for keyword in keywords)
+    return re.compile(r"\b(?:" + "|".join(words) + r")\b")
+
+
+PATTERNS = [(industry, _pattern(keywords)) for industry, keywords in INDUSTRIES]
+
+
+def classify(occupation, employer):
+    '''Industry for a donor from their occupation, then their employer'''
+    for text in (occupation, employer):
+        text = (text or "").upper()
+        if not text or text in ("INFORMATION REQUESTED", "N/A", "NONE"):
+            continue
+        for industry, pattern in PATTERNS:
+            if pattern.search(text):
+                return industry
+    return OTHER if (occupation or employer) else UNKNOWN
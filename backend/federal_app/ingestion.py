@@ -0,0 +1,317 @@
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from django.conf import settings
+from core_app.http_client import get_client
+from django.db import transaction
+from .industries import classify
+from .models import Bill, Candidate, Contribution, Organization, SyncCheckpoint
+from .signals import records_ingested
+
+
+# Transports: where pages come from
+
+class HttpTransport:
+    '''GET JSON pages from an upstream API through the shared outbound client, retrying 429/5xx'''
+
+    def __init__(self, base_url, api_key=None, retries=3):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.retries = retries
+
+    def get(self, path, params):
+        params = dict(params)
+        if self.api_key:
+            params["api_key"] = self.api_key
+        client = get_client()
+        for attempt in range(self.retries + 1):
+            # pages move on every run, so skip the response cache
+            response = client.get(self.base_url + path, params, cache=False)
+            if (response.status_code != 429 and response.status_code < 500) or attempt == self.retries:
+                response.raise_for_status()
+                return response.json()
+            time.sleep(2 ** attempt)
+
+
+class FixtureTransport:
+    '''Replay recorded responses from a cassette file instead of calling the API
+
+    The cassette is {"requests": [{"api": "fec", "path": "/candidates/", "params": {...}, "response": {...}}]}
+    '''
+
+    def __init__(self, cassette, api):
+        data = json.loads(Path(cassette).read_text())
+        self.responses = {
+            self.key(entry["path"], entry["params"]): entry["response"]
+            for entry in data["requests"] if entry["api"] == api
+        }
+
+    @staticmethod
+    def key(path, params):
+        params = {k: str(v) for k, v in params.items() if k != "api_key"}
+        return path, json.dumps(params, sort_keys=True)
+
+    def get(self, path, params):
+        try:
+            return self.responses[self.key(path, params)]
+        except KeyError:
+            raise LookupError(f"no recorded response for {path} {params}")
+
+
+def default_transports(cassette=None):
+    if cassette:
+        return {api: FixtureTransport(cassette, api) for api in ("fec", "congress")}
+    return {
+        "fec": HttpTransport(settings.FEC_API_URL, settings.FEC_API_KEY),
+        "congress": HttpTransport(settings.CONGRESS_API_URL, settings.CONGRESS_API_KEY),
+    }
+
+
+# Sources: how to page through an endpoint and map its records to rows
+
+class Source:
+    name = None
+    api = None
+    path = None
+    model = None
+    per_page = 100
+
+    def first_cursor(self):
+        return {"page": 1}
+
+    def params(self, cursor, watermark):
+        raise NotImplementedError
+
+    def parse(self, payload, cursor):
+        '''Return (records, next cursor or None when this was the last page)'''
+        raise NotImplementedError
+
+    def to_row(self, record):
+        raise NotImplementedError
+
+    def watermark(self, row):
+        '''Value the next incremental run starts after, "" when the source has none'''
+        return ""
+
+
+class FecPagedSource(Source):
+    api = "fec"
+
+    def params(self, cursor, watermark):
+        return {"page": cursor["page"], "per_page": self.per_page, "sort": self.sort, **self.filters()}
+
+    def filters(self):
+        return {}
+
+    def parse(self, payload, cursor):
+        pagination = payload.get("pagination", {})
+        next_cursor = None
+        if cursor["page"] < pagination.get("pages", 0):
+            next_cursor = {"page": cursor["page"] + 1}
+        return payload.get("results", []), next_cursor
+
+
+class FecCandidates(FecPagedSource):
+    name = "fec_candidates"
+    path = "/candidates/"
+    model = Candidate
+    sort = "candidate_id"
+
+    def filters(self):
+        return {"cycle": settings.FEC_CYCLE}
+
+    def to_row(self, record):
+        return {
+            "external_id": record["candidate_id"],
+            "name": record.get("name") or "",
+            "party": record.get("party_full") or "",
+            "office": record.get("office") or "",
+            "state": record.get("state") or "",
+            "district": record.get("district") or "",
+            "election_years": record.get("election_years") or [],
+            "source_updated": record.get("last_file_date") or "",
+        }
+
+
+class FecCommittees(FecPagedSource):
+    name = "fec_committees"
+    path = "/committees/"
+    model = Organization
+    sort = "committee_id"
+
+    def filters(self):
+        return {"cycle": settings.FEC_CYCLE}
+
+    def to_row(self, record):
+        return {
+            "external_id": record["committee_id"],
+            "name": record.get("name") or "",
+            "committee_type": record.get("committee_type_full") or "",
+            "designation": record.get("designation_full") or "",
+            "party": record.get("party_full") or "",
+            "state": record.get("state") or "",
+            "candidate_ids": record.get("candidate_ids") or [],
+            "source_updated": record.get("last_file_date") or "",
+        }
+
+
+class FecContributions(Source):
+    '''Schedule A itemized receipts, paged with FEC's keyset cursor (last_indexes)'''
+    name = "fec_contributions"
+    api = "fec"
+    path = "/schedules/schedule_a/"
+    model = Contribution
+
+    def first_cursor(self):
+        return {}
+
+    def params(self, cursor, watermark):
+        params = {
+            "per_page": self.per_page,
+            "sort": "contribution_receipt_date",
+            "two_year_transaction_period": settings.FEC_CYCLE,
+            **cursor,
+        }
+        if watermark:
+            params["min_date"] = watermark
+        return params
+
+    def parse(self, payload, cursor):
+        results = payload.get("results", [])
+        last_indexes = payload.get("pagination", {}).get("last_indexes")
+        return results, (last_indexes if results and last_indexes else None)
+
+    def to_row(self, record):
+        receipt_date = (record.get("contribution_receipt_date") or "")[:10] or None
+        return {
+            "external_id": str(record["sub_id"]),
+            "committee_id": record.get("committee_id") or "",
+            "candidate_id": record.get("candidate_id") or "",
+            "contributor_name": record.get("contributor_name") or "",
+            "contributor_state": record.get("contributor_state") or "",
+            "contributor_employer": record.get("contributor_employer") or "",
+            "contributor_occupation": record.get("contributor_occupation") or "",
+            "industry": classify(record.get("contributor_occupation"), record.get("contributor_employer")),
+            "amount": record.get("contribution_receipt_amount") or 0,
+            "receipt_date": receipt_date,
+            "cycle": record.get("two_year_transaction_period"),
+        }
+
+    def watermark(self, row):
+        return row["receipt_date"] or ""
+
+
+class CongressBills(Source):
+    '''congress.gov bills, oldest update first, starting after the last completed run'''
+    name = "congress_bills"
+    api = "congress"
+    path = "/bill"
+    model = Bill
+    per_page = 250
+
+    def first_cursor(self):
+        return {"offset": 0}
+
+    def params(self, cursor, watermark):
+        params = {"format": "json", "limit": self.per_page, "offset": cursor["offset"], "sort": "updateDate asc"}
+        if watermark:
+            params["fromDateTime"] = watermark
+        return params
+
+    def parse(self, payload, cursor):
+        bills = payload.get("bills", [])
+        next_cursor = None
+        if payload.get("pagination", {}).get("next") and bills:
+            next_cursor = {"offset": cursor["offset"] + len(bills)}
+        return bills, next_cursor
+
+    def to_row(self, record):
+        action = record.get("latestAction") or {}
+        sponsor = (record.get("sponsors") or [{}])[0]
+        return {
+            "external_id": f"{record['congress']}-{record['type'].lower()}-{record['number']}",
+            "congress": record["congress"],
+            "bill_type": record["type"].lower(),
+            "number": str(record["number"]),
+            "title": record.get("title") or "",
+            "sponsor_id": sponsor.get("bioguideId") or "",
+            "sponsor_name": sponsor.get("fullName") or "",
+            "latest_action": action.get("text") or "",
+            "latest_action_date": action.get("actionDate"),
+            "source_updated": record.get("updateDateIncludingText") or record.get("updateDate") or "",
+        }
+
+    def watermark(self, row):
+        return row["source_updated"]
+
+
+SOURCES = {source.name: source for source in (FecCandidates(), FecCommittees(), FecContributions(), CongressBills())}
+
+
+# Pipeline
+
+def upsert(model, rows, batch_size=500):
+    '''Insert or update rows by external_id in bulk statements'''
+    if not rows:
+        return 0
+    update_fields = [field for field in rows[0] if field != "external_id"] + ["synced_at"]
+    model.objects.bulk_create(
+        [model(**row) for row in rows],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["external_id"],
+        update_fields=update_fields,
+    )
+    return len(rows)
+
+
+@dataclass
+class SyncResult:
+    source: str
+    pages: int = 0
+    records: int = 0
+    completed: bool = False
+
+
+def sync(source, transport, max_pages=None, restart=False):
+    '''Sync one source page by page, checkpointing after every page so it can resume
+
+    A run that stops part way (error, max_pages, killed worker) continues from the saved
+    cursor next time. Once a run completes, the next one starts from the first page again
+    but only asks for records after the watermark the completed run reached.
+    '''
+    checkpoint, created = SyncCheckpoint.objects.get_or_create(source=source.name)
+    if restart:
+        checkpoint.watermark = ""
+        checkpoint.completed = True
+    if checkpoint.completed:
+        checkpoint.cursor = source.first_cursor()
+        checkpoint.run_watermark = checkpoint.watermark
+        checkpoint.completed = False
+        checkpoint.save()
+
+    result = SyncResult(source.name)
+    while max_pages is None or result.pages < max_pages:
+        payload = transport.get(source.path, source.params(checkpoint.cursor, checkpoint.watermark))
+        records, next_cursor = source.parse(payload, checkpoint.cursor)
+        # last record wins if a page repeats an id, one statement can't upsert a row twice
+        rows = list({row["external_id"]: row for row in map(source.to_row, records)}.values())
+        with transaction.atomic():
+            upsert(source.model, rows)
+            checkpoint.records_synced += len(rows)
+            checkpoint.run_watermark = max([checkpoint.run_watermark] + [source.watermark(row) for row in rows])
+            if next_cursor is None:
+                checkpoint.completed = True
+                checkpoint.cursor = {}
+                checkpoint.watermark = checkpoint.run_watermark
+            else:
+                checkpoint.cursor = next_cursor
+            checkpoint.save()
+        records_ingested.send(sender=source.__class__, source=source.name, model=source.model, external_ids=[row["external_id"] for row in rows])
+        result.pages += 1
+        result.records += len(rows)
+        if checkpoint.completed:
+            result.completed = True
+            break
+    return result
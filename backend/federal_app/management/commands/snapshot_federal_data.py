@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from federal_app.snapshots import DATASETS, build, open_snapshot, snapshot_root
+
+
+class Command(BaseCommand):
+    help = "Rebuild the columnar snapshots of the federal tables under SNAPSHOT_DIR, or describe them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("datasets", nargs="*", help=f"datasets to rebuild, default all of: {', '.join(DATASETS)}")
+        parser.add_argument("--batch-size", type=int, default=100000, help="rows per part")
+        parser.add_argument("--info", action="store_true", help="print rows and parts of the current snapshots instead")
+
+    def handle(self, *args, **options):
+        names = options["datasets"] or list(DATASETS)
+        unknown = set(names) - set(DATASETS)
+        if unknown:
+            raise CommandError(f"unknown datasets: {', '.join(sorted(unknown))}")
+        if snapshot_root() is None:
+            raise CommandError("SNAPSHOT_DIR is not set")
+        for name in names:
+            if options["info"]:
+                snapshot = open_snapshot(name)
+                if snapshot is None:
+                    self.stdout.write(f"{name}: not written")
+                    continue
+                self.stdout.write(f"{name}: {snapshot.rows} rows in {len(snapshot.parts)} parts, {snapshot.size / 1e6:.1f} MB")
+            else:
+                rows = build(name, batch_size=options["batch_size"])
+                self.stdout.write(f"{name}: wrote {rows} rows")
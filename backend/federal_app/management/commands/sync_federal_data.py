@@ -0,0 +1,45 @@
+import logging
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from federal_app.ingestion import SOURCES, default_transports, sync
+
+logger = logging.getLogger("publiceyeusa.ingestion")
+
+
+class Command(BaseCommand):
+    help = "Sync candidates, committees, contributions and bills from the federal APIs into local tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("sources", nargs="*", help=f"sources to sync, default all of: {', '.join(SOURCES)}")
+        parser.add_argument("--fixtures", help="replay a recorded cassette file instead of calling the APIs")
+        parser.add_argument("--max-pages", type=int, help="stop after this many pages per source, the next run resumes")
+        parser.add_argument("--restart", action="store_true", help="ignore checkpoints and sync from scratch")
+        parser.add_argument("--loop", action="store_true", help="keep syncing as a worker")
+        parser.add_argument("--interval", type=int, default=900, help="seconds between worker passes")
+
+    def handle(self, *args, **options):
+        names = options["sources"] or list(SOURCES)
+        unknown = set(names) - set(SOURCES)
+        if unknown:
+            raise CommandError(f"unknown sources: {', '.join(sorted(unknown))}")
+        transports = default_transports(options["fixtures"])
+        restart = options["restart"]
+        while True:
+            for name in names:
+                source = SOURCES[name]
+                try:
+                    result = sync(source, transports[source.api], max_pages=options["max_pages"], restart=restart)
+                except Exception:
+                    if not options["loop"]:
+                        raise
+                    # one upstream outage mustn't stop the worker, the source resumes from its checkpoint next pass
+                    logger.exception("%s: sync failed, retrying in %ss", name, options["interval"])
+                    close_old_connections()
+                    continue
+                state = "complete" if result.completed else "paused"
+                self.stdout.write(f"{name}: {result.records} records in {result.pages} pages ({state})")
+            restart = False
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
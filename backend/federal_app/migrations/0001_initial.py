@@ -0,0 +1,91 @@
+# Generated by Django 5.0.3 on 2026-10-17 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.CharField(max_length=30, unique=True)),
+                ('congress', models.PositiveIntegerField()),
+                ('bill_type', models.CharField(max_length=10)),
+                ('number', models.CharField(max_length=10)),
+                ('title', models.TextField(blank=True)),
+                ('sponsor_id', models.CharField(blank=True, db_index=True, max_length=20)),
+                ('sponsor_name', models.CharField(blank=True, max_length=200)),
+                ('latest_action', models.TextField(blank=True)),
+                ('latest_action_date', models.DateField(blank=True, null=True)),
+                ('source_updated', models.CharField(blank=True, max_length=40)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Candidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.CharField(max_length=20, unique=True)),
+                ('name', models.CharField(max_length=200)),
+                ('party', models.CharField(blank=True, max_length=100)),
+                ('office', models.CharField(blank=True, max_length=20)),
+                ('state', models.CharField(blank=True, max_length=2)),
+                ('district', models.CharField(blank=True, max_length=5)),
+                ('election_years', models.JSONField(blank=True, default=list)),
+                ('source_updated', models.CharField(blank=True, max_length=40)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Contribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.CharField(max_length=30, unique=True)),
+                ('committee_id', models.CharField(db_index=True, max_length=20)),
+                ('candidate_id', models.CharField(blank=True, db_index=True, max_length=20)),
+                ('contributor_name', models.CharField(blank=True, max_length=200)),
+                ('contributor_state', models.CharField(blank=True, max_length=2)),
+                ('contributor_employer', models.CharField(blank=True, max_length=200)),
+                ('contributor_occupation', models.CharField(blank=True, max_length=200)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('receipt_date', models.DateField(blank=True, null=True)),
+                ('cycle', models.PositiveIntegerField(blank=True, null=True)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Organization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.CharField(max_length=20, unique=True)),
+                ('name', models.CharField(max_length=200)),
+                ('committee_type', models.CharField(blank=True, max_length=50)),
+                ('designation', models.CharField(blank=True, max_length=50)),
+                ('party', models.CharField(blank=True, max_length=100)),
+                ('state', models.CharField(blank=True, max_length=2)),
+                ('candidate_ids', models.JSONField(blank=True, default=list)),
+                ('source_updated', models.CharField(blank=True, max_length=40)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SyncCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50, unique=True)),
+                ('cursor', models.JSONField(blank=True, default=dict)),
+                ('watermark', models.CharField(blank=True, max_length=40)),
+                ('run_watermark', models.CharField(blank=True, max_length=40)),
+                ('completed', models.BooleanField(default=True)),
+                ('records_synced', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.3 on 2026-10-17 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('federal_app', '0002_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contribution',
+            name='industry',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['committee_id', 'cycle'], name='federal_app_committ_d224c2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['contributor_state', 'cycle'], name='federal_app_contrib_48f369_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['industry', 'cycle'], name='federal_app_industr_a94672_idx'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+from django.db import models
+
+# Create your models here.
+# Rows are keyed by the id the upstream API uses (external_id) so ingestion can upsert in bulk.
+# References between sources are kept as those external ids because pages arrive in any order.
+
+class Candidate(models.Model):
+    external_id = models.CharField(max_length=20, unique=True)
+    name = models.CharField(max_length=200)
+    party = models.CharField(max_length=100, blank=True)
+    office = models.CharField(max_length=20, blank=True)
+    state = models.CharField(max_length=2, blank=True)
+    district = models.CharField(max_length=5, blank=True)
+    election_years = models.JSONField(default=list, blank=True)
+    source_updated = models.CharField(max_length=40, blank=True)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # keyset pagination order for the candidate list
+        indexes = [models.Index(fields=["name", "id"])]
+
+
+class Organization(models.Model):
+    external_id = models.CharField(max_length=20, unique=True)
+    name = models.CharField(max_length=200)
+    committee_type = models.CharField(max_length=50, blank=True)
+    designation = models.CharField(max_length=50, blank=True)
+    party = models.CharField(max_length=100, blank=True)
+    state = models.CharField(max_length=2, blank=True)
+    candidate_ids = models.JSONField(default=list, blank=True)
+    source_updated = models.CharField(max_length=40, blank=True)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # keyset pagination order for the organization list
+        indexes = [models.Index(fields=["name", "id"])]
+
+
+class Bill(models.Model):
+    external_id = models.CharField(max_length=30, unique=True)
+    congress = models.PositiveIntegerField()
+    bill_type = models.CharField(max_length=10)
+    number = models.CharField(max_length=10)
+    title = models.TextField(blank=True)
+    sponsor_id = models.CharField(max_length=20, blank=True, db_index=True)
+    sponsor_name = models.CharField(max_length=200, blank=True)
+    latest_action = models.TextField(blank=True)
+    latest_action_date = models.DateField(null=True, blank=True)
+    source_updated = models.CharField(max_length=40, blank=True)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # keyset pagination order for the bill list (newest congress first, scanned backwards)
+        indexes = [models.Index(fields=["congress", "id"])]
+
+
+class Contribution(models.Model):
+    external_id = models.CharField(max_length=30, unique=True)
+    committee_id = models.CharField(max_length=20, db_index=True)
+    candidate_id = models.CharField(max_length=20, blank=True, db_index=True)
+    contributor_name = models.CharField(max_length=200, blank=True)
+    contributor_state = models.CharField(max_length=2, blank=True)
+    contributor_employer = models.CharField(max_length=200, blank=True)
+    contributor_occupation = models.CharField(max_length=200, blank=True)
+    # federal_app.industries.classify(occupation, employer), set at ingest
+    industry = models.CharField(max_length=50, blank=True)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    receipt_date = models.DateField(null=True, blank=True)
+    cycle = models.PositiveIntegerField(null=True, blank=True)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # finance rollups recompute one (column, cycle) group at a time
+        indexes = [
+            models.Index(fields=["committee_id", "cycle"]),
+            models.Index(fields=["contributor_state", "cycle"]),
+            models.Index(fields=["industry", "cycle"]),
+        ]
+
+
+class SyncCheckpoint(models.Model):
+    '''Where a source's sync got to, saved with every page so a run can resume'''
+    source = models.CharField(max_length=50, unique=True)
+    # next page to fetch for the run in progress, empty once the run completes
+    cursor = models.JSONField(default=dict, blank=True)
+    # incremental sync starts after this value, promoted from run_watermark when a run completes
+    watermark = models.CharField(max_length=40, blank=True)
+    run_watermark = models.CharField(max_length=40, blank=True)
+    completed = models.BooleanField(default=True)
+    records_synced = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
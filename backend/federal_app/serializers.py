@@ -0,0 +1,19 @@
+from rest_framework.serializers import ModelSerializer
+from core_app.instrumentation import TimedSerializerMixin
+from core_app.pagination import SparseFieldsMixin
+from .models import Bill, Candidate, Organization
+
+class CandidateSerializer(TimedSerializerMixin, SparseFieldsMixin, ModelSerializer):
+    class Meta:
+        model = Candidate
+        fields = ["id", "external_id", "name", "party", "office", "state", "district", "election_years"]
+
+class OrganizationSerializer(TimedSerializerMixin, SparseFieldsMixin, ModelSerializer):
+    class Meta:
+        model = Organization
+        fields = ["id", "external_id", "name", "committee_type", "designation", "party", "state", "candidate_ids"]
+
+class BillSerializer(TimedSerializerMixin, SparseFieldsMixin, ModelSerializer):
+    class Meta:
+        model = Bill
+        fields = ["id", "external_id", "congress", "bill_type", "number", "title", "sponsor_id", "sponsor_name", "latest_action", "latest_action_date"]
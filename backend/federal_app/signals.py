@@ -0,0 +1,13 @@
+from django.dispatch import Signal, receiver
+from .snapshots import append_records
+
+# sent after each ingested page is committed
+# kwargs: source (name), model, external_ids (list of the upserted ids)
+records_ingested = Signal()
+
+
+@receiver(records_ingested)
+def snapshot_ingested_records(sender, model, external_ids, **kwargs):
+    # with SNAPSHOT_DIR set every ingested page is also appended to the columnar snapshots.
+    # federal_app is installed before the apps that aggregate pages, so this runs first.
+    append_records(model, external_ids)
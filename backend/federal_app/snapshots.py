@@ -0,0 +1,483 @@
+import datetime
+import fcntl
+import json
+import os
+import math
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from .models import Bill, Candidate, Contribution, Organization
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - snapshots need numpy, the ORM tables don't
+    np = None
+
+# Columnar snapshots of the federal tables.
+#
+# A dataset directory holds manifest.json plus immutable parts, one per written batch. A part
+# is a directory with one .npy file per column, so every column can be memory mapped on its own:
+#   key       external ids as fixed width bytes (S<max_length>)
+#   dict      dictionary encoded strings: <name>.npy int32 codes, plus the part's dictionary as
+#             <name>.offsets.npy (int64) and <name>.values.npy (utf-8 bytes), Arrow style
+#   int       int64, with <name>.valid.npy when the batch has nulls
+#   decimal   int64 scaled by 10**decimal_places
+#   date      datetime64[D], NaT for null
+# Parts are immutable, a row ingested again lands in a newer part and the newest wins. Appended
+# pages are merged as they pile up: whenever the last SNAPSHOT_COMPACT_FANOUT parts are of the
+# same size tier (log base fanout of rows / SNAPSHOT_COMPACT_MIN_ROWS) they are rewritten as one,
+# so a dataset has a few parts per tier and every row is rewritten about once per tier. Replaced
+# parts stay on disk, listed as retired in the manifest, for SNAPSHOT_RETIRE_SECONDS, so readers
+# still holding an older manifest can keep mapping their columns.
+
+
+@dataclass(frozen=True)
+class Dataset:
+    name: str
+    model: type
+    columns: tuple
+
+    def specs(self):
+        return [column_spec(self.model._meta.get_field(name)) for name in self.columns]
+
+
+DATASETS = {
+    dataset.name: dataset for dataset in (
+        Dataset("contributions", Contribution, (
+            "external_id", "committee_id", "candidate_id", "contributor_state", "industry",
+            "contributor_employer", "contributor_occupation", "amount", "receipt_date", "cycle",
+        )),
+        Dataset("candidates", Candidate, ("external_id", "name", "party", "office", "state", "district")),
+        Dataset("committees", Organization, ("external_id", "name", "committee_type", "designation", "party", "state")),
+        Dataset("bills", Bill, ("external_id", "congress", "bill_type", "number", "sponsor_id", "latest_action_date")),
+    )
+}
+DATASETS_BY_MODEL = {dataset.model: dataset for dataset in DATASETS.values()}
+
+
+def column_spec(field):
+    if field.name == "external_id":
+        return {"name": field.name, "kind": "key", "width": field.max_length}
+    if isinstance(field, (models.CharField, models.TextField)):
+        return {"name": field.name, "kind": "dict"}
+    if isinstance(field, models.DecimalField):
+        return {"name": field.name, "kind": "decimal", "scale": field.decimal_places}
+    if isinstance(field, models.DateField) and not isinstance(field, models.DateTimeField):
+        return {"name": field.name, "kind": "date"}
+    if isinstance(field, models.IntegerField):
+        return {"name": field.name, "kind": "int"}
+    raise ImproperlyConfigured(f"{field.model.__name__}.{field.name} has no columnar encoding")
+
+
+def snapshot_root():
+    root = getattr(settings, "SNAPSHOT_DIR", None)
+    if not root:
+        return None
+    if np is None:
+        raise ImproperlyConfigured("SNAPSHOT_DIR is set but numpy isn't installed")
+    return Path(root)
+
+
+# Writing
+
+def encode_strings(values):
+    '''(int32 codes, int64 offsets, uint8 utf-8 bytes) for a column of strings'''
+    lookup = {}
+    codes = np.fromiter((lookup.setdefault(value or "", len(lookup)) for value in values), dtype=np.int32, count=len(values))
+    encoded = [value.encode() for value in lookup]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return codes, offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def write_column(path, spec, values):
+    name, kind = spec["name"], spec["kind"]
+    if kind == "key":
+        np.save(path / f"{name}.npy", np.array([value.encode() for value in values], dtype=f"S{spec['width']}"))
+    elif kind == "dict":
+        codes, offsets, data = encode_strings(values)
+        np.save(path / f"{name}.npy", codes)
+        np.save(path / f"{name}.offsets.npy", offsets)
+        np.save(path / f"{name}.values.npy", data)
+    elif kind == "decimal":
+        np.save(path / f"{name}.npy", np.array([int(value.scaleb(spec["scale"])) for value in values], dtype=np.int64))
+    elif kind == "date":
+        np.save(path / f"{name}.npy", np.array(values, dtype="datetime64[D]"))
+    else:
+        valid = np.array([value is not None for value in values], dtype=bool)
+        np.save(path / f"{name}.npy", np.array([value or 0 for value in values], dtype=np.int64))
+        if not valid.all():
+            np.save(path / f"{name}.valid.npy", valid)
+
+
+def write_part(directory, specs, rows):
+    '''Write rows (tuples in column order) as a part, visible only once it is complete'''
+    tmp = directory / f".tmp-{uuid.uuid4().hex}"
+    tmp.mkdir()
+    columns = list(zip(*rows))
+    for spec, values in zip(specs, columns):
+        write_column(tmp, spec, values)
+    return tmp
+
+
+def merge_part(directory, specs, parts):
+    '''(directory, rows) of one part holding the current rows of parts, a list of PartFiles oldest first'''
+    tmp = directory / f".tmp-{uuid.uuid4().hex}"
+    tmp.mkdir()
+    keys = np.concatenate([part.array("external_id") for part in parts])
+    # the last occurrence of every key wins, the survivors keep their order
+    _, last = np.unique(keys[::-1], return_index=True)
+    keep = np.sort(len(keys) - 1 - last)
+    for spec in specs:
+        name, kind = spec["name"], spec["kind"]
+        if kind == "dict":
+            # every part has its own dictionary, so strings are encoded again
+            values = []
+            for part in parts:
+                strings = part.dictionary(name).strings()
+                values.extend(strings[code] for code in part.array(name).tolist())
+            write_column(tmp, spec, [values[i] for i in keep.tolist()])
+            continue
+        np.save(tmp / f"{name}.npy", np.concatenate([part.array(name) for part in parts])[keep])
+        if kind == "int":
+            valid = np.concatenate([
+                part.optional(f"{name}.valid") if part.optional(f"{name}.valid") is not None else np.ones(part.rows, dtype=bool)
+                for part in parts
+            ])[keep]
+            if not valid.all():
+                np.save(tmp / f"{name}.valid.npy", valid)
+    return tmp, len(keep)
+
+
+@contextmanager
+def locked(root, name):
+    '''Serializes appends and rebuilds of one dataset across processes'''
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / f".{name}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def size_tier(rows):
+    '''0 below SNAPSHOT_COMPACT_MIN_ROWS * fanout rows, one more for every further factor of fanout'''
+    fanout = getattr(settings, "SNAPSHOT_COMPACT_FANOUT", 8)
+    smallest = getattr(settings, "SNAPSHOT_COMPACT_MIN_ROWS", 1000)
+    return int(math.log(rows / smallest, fanout)) if rows > smallest else 0
+
+
+class DatasetWriter:
+    '''Adds, merges and retires the parts of a dataset directory; callers hold the dataset's lock'''
+
+    def __init__(self, dataset, directory):
+        self.dataset = dataset
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.specs = dataset.specs()
+        self.manifest = read_manifest(self.directory) or {"dataset": dataset.name, "columns": self.specs, "parts": []}
+        self.manifest.setdefault("retired", [])
+
+    def write(self, rows):
+        '''A new part of rows, in place but not in the manifest until save()'''
+        return self._place(write_part(self.directory, self.specs, rows), len(rows))
+
+    def _place(self, tmp, rows, **extra):
+        # numbers are never reused, so a retired part's directory is never taken by a new one
+        listed = self.manifest["parts"] + self.manifest["retired"]
+        number = self.manifest.get("next_number") or max((part["number"] for part in listed), default=0) + 1
+        self.manifest["next_number"] = number + 1
+        name = f"part-{number:06}"
+        os.rename(tmp, self.directory / name)
+        return {"name": name, "number": number, "rows": rows, "written": datetime.datetime.now(datetime.timezone.utc).isoformat(), **extra}
+
+    def append(self, rows):
+        if not rows:
+            return None
+        part = self.write(rows)
+        self.manifest["parts"].append(part)
+        self.compact()
+        self.save()
+        return part["name"]
+
+    def compact(self):
+        '''Merge the last SNAPSHOT_COMPACT_FANOUT parts into one for as long as they share a size tier'''
+        fanout = getattr(settings, "SNAPSHOT_COMPACT_FANOUT", 8)
+        parts = self.manifest["parts"]
+        while fanout > 1 and len(parts) >= fanout and len({size_tier(part["rows"]) for part in parts[-fanout:]}) == 1:
+            tail = parts[-fanout:]
+            tmp, rows = merge_part(self.directory, self.specs, [PartFiles(self.directory / part["name"], part["rows"]) for part in tail])
+            # readers that already applied the replaced parts know the merge brings no new keys
+            parts[-fanout:] = [self._place(tmp, rows, replaces=[part["name"] for part in tail])]
+            self.retire(tail)
+
+    def retire(self, parts):
+        now = time.time()
+        self.manifest["retired"].extend({"name": part["name"], "number": part["number"], "retired": now} for part in parts)
+
+    def sweep(self):
+        '''Delete retired parts once readers had SNAPSHOT_RETIRE_SECONDS to move on, and what crashed writers left'''
+        keep_for = getattr(settings, "SNAPSHOT_RETIRE_SECONDS", 600)
+        now = time.time()
+        self.manifest["retired"] = [part for part in self.manifest["retired"] if now - part["retired"] < keep_for]
+        listed = {part["name"] for part in self.manifest["parts"] + self.manifest["retired"]}
+        for path in self.directory.iterdir():
+            if path.is_dir() and path.name not in listed:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def save(self):
+        self.sweep()
+        # the manifest is what readers see, replace it only after its parts are in place
+        write_json(self.directory / "manifest.json", self.manifest)
+
+
+def write_json(path, data):
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def read_manifest(directory):
+    try:
+        with open(Path(directory) / "manifest.json") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def dataset_rows(dataset, queryset):
+    return queryset.values_list(*dataset.columns)
+
+
+def append_records(model, external_ids):
+    '''Append the given rows of a snapshotted model as a new part, when snapshots are enabled'''
+    root = snapshot_root()
+    dataset = DATASETS_BY_MODEL.get(model)
+    if root is None or dataset is None:
+        return None
+    rows = list(dataset_rows(dataset, model.objects.filter(external_id__in=external_ids).order_by("id")))
+    with locked(root, dataset.name):
+        return DatasetWriter(dataset, root / dataset.name).append(rows)
+
+
+def build(name, batch_size=100000, root=None):
+    '''Rewrite a dataset from its table in id order, compacting away superseded rows and small parts
+
+    The new parts are written next to the old ones, which are retired when the new manifest
+    replaces the old, so readers that opened the old manifest keep reading them until they reopen.
+    '''
+    dataset = DATASETS[name]
+    root = Path(root) if root else snapshot_root()
+    if root is None:
+        raise ImproperlyConfigured("SNAPSHOT_DIR is not set")
+    rows = 0
+    # appends wait for the rebuild, so nothing ingested meanwhile is lost with the old parts
+    with locked(root, name):
+        writer = DatasetWriter(dataset, root / name)
+        parts = []
+        after_id = 0
+        while True:
+            page = list(dataset.model.objects.filter(id__gt=after_id).order_by("id").values_list("id", *dataset.columns)[:batch_size])
+            if not page:
+                break
+            parts.append(writer.write([row[1:] for row in page]))
+            rows += len(page)
+            after_id = page[-1][0]
+        writer.retire(writer.manifest["parts"])
+        writer.manifest.update(columns=writer.specs, parts=parts)
+        writer.save()
+    return rows
+
+
+# Reading
+
+class Dictionary:
+    '''A part's string dictionary, decoded lazily'''
+
+    def __init__(self, offsets, values):
+        self.offsets = offsets
+        self.values = values
+        self._strings = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def strings(self):
+        if self._strings is None:
+            data = self.values.tobytes()
+            offsets = self.offsets.tolist()
+            self._strings = [data[start:end].decode() for start, end in zip(offsets, offsets[1:])]
+        return self._strings
+
+    def codes(self, wanted):
+        '''Codes of the wanted strings that occur in this part'''
+        wanted = set(wanted)
+        return np.array([code for code, value in enumerate(self.strings()) if value in wanted], dtype=np.int32)
+
+
+class PartFiles:
+    '''The column files of a part, each memory mapped when first read
+
+    Parts never change, so one PartFiles is shared by every snapshot that lists the part.
+    '''
+
+    def __init__(self, path, rows):
+        self.path = path
+        self.rows = rows
+        self._arrays = {}
+        self._dictionaries = {}
+        self._sorted_keys = None
+
+    def optional(self, name):
+        '''A column file, None if the part doesn't have it'''
+        if name not in self._arrays:
+            path = self.path / f"{name}.npy"
+            self._arrays[name] = np.load(path, mmap_mode="r") if path.exists() else None
+        return self._arrays[name]
+
+    def array(self, name):
+        array = self.optional(name)
+        if array is None:
+            raise FileNotFoundError(f"{self.path / name}.npy")
+        return array
+
+    def dictionary(self, name):
+        if name not in self._dictionaries:
+            self._dictionaries[name] = Dictionary(self.array(f"{name}.offsets"), self.array(f"{name}.values"))
+        return self._dictionaries[name]
+
+    def find(self, keys):
+        '''Row numbers of the part's rows holding any of keys'''
+        if self._sorted_keys is None:
+            column = self.array("external_id")
+            order = np.argsort(column, kind="stable")
+            self._sorted_keys = (column[order], order)
+        sorted_keys, order = self._sorted_keys
+        starts = np.searchsorted(sorted_keys, keys, "left")
+        lengths = np.searchsorted(sorted_keys, keys, "right") - starts
+        # every run of equal keys, gathered without a python loop
+        begins = np.cumsum(lengths) - lengths
+        return order[np.repeat(starts - begins, lengths) + np.arange(int(lengths.sum()))]
+
+
+class Part:
+    '''A part as one snapshot sees it: its files, and which of its rows are still current'''
+
+    def __init__(self, files, specs, live=None):
+        self.files = files
+        self.path = files.path
+        self.specs = specs
+        self.rows = files.rows
+        # False for rows superseded by a newer part, None when every row is current
+        self.live = live
+
+    def column(self, name):
+        '''The stored array, memory mapped: codes, scaled integers, datetime64 or key bytes'''
+        return self.files.array(name)
+
+    def valid(self, name):
+        '''Null mask of an int column, None when it has no nulls'''
+        return self.files.optional(f"{name}.valid")
+
+    def dictionary(self, name):
+        return self.files.dictionary(name)
+
+    def isin(self, name, values):
+        '''Row mask for a dict or key column matching any of values'''
+        if self.specs[name]["kind"] == "key":
+            return np.isin(self.column(name), np.array([value.encode() for value in values], dtype=self.column(name).dtype))
+        return np.isin(self.column(name), self.dictionary(name).codes(values))
+
+    def mask(self):
+        return np.ones(self.rows, dtype=bool) if self.live is None else self.live.copy()
+
+    def supersede(self, rows):
+        '''Mark rows as replaced by a newer part; copies, other snapshots may share the old mask'''
+        if len(rows):
+            live = self.mask()
+            live[rows] = False
+            self.live = live
+
+
+class Snapshot:
+    '''Read side of a dataset: its parts, memory mapped, with superseded rows masked out
+
+    Reopened after an ingested page it reuses the previous snapshot's parts and masks, and only
+    looks up the new part's keys in the older parts.
+    '''
+
+    def __init__(self, directory, manifest, previous=None):
+        self.directory = Path(directory)
+        self.manifest = manifest
+        self.columns = {spec["name"]: spec for spec in manifest["columns"]}
+        seen = {part.path.name: part for part in previous.parts} if previous is not None else {}
+        self.parts = [
+            Part(seen[entry["name"]].files, self.columns, seen[entry["name"]].live) if entry["name"] in seen
+            else Part(PartFiles(self.directory / entry["name"], entry["rows"]), self.columns)
+            for entry in manifest["parts"]
+        ]
+        # parts whose keys the previous masks don't account for: new pages, and merges of parts it never saw
+        fresh = [
+            i for i, entry in enumerate(manifest["parts"])
+            if entry["name"] not in seen and not ("replaces" in entry and set(entry["replaces"]) <= seen.keys())
+        ]
+        if not seen or sum(self.parts[i].rows for i in fresh) * len(self.parts) > sum(part.rows for part in self.parts):
+            self._mark_superseded()
+        else:
+            for i in fresh:
+                keys = self.parts[i].column("external_id")
+                for part in self.parts[:i]:
+                    part.supersede(part.files.find(keys))
+
+    @property
+    def rows(self):
+        return sum(part.rows if part.live is None else int(part.live.sum()) for part in self.parts)
+
+    @property
+    def size(self):
+        '''Bytes on disk of the current parts'''
+        return sum(path.stat().st_size for part in self.parts for path in part.path.glob("*.npy"))
+
+    def _mark_superseded(self):
+        for part in self.parts:
+            part.live = None
+        if len(self.parts) < 2:
+            return
+        # keep the last occurrence of every key across all parts
+        keys = np.concatenate([part.column("external_id") for part in self.parts])
+        _, last = np.unique(keys[::-1], return_index=True)
+        live = np.zeros(len(keys), dtype=bool)
+        live[len(keys) - 1 - last] = True
+        start = 0
+        for part in self.parts:
+            part_live = live[start:start + part.rows]
+            part.live = None if part_live.all() else part_live
+            start += part.rows
+
+
+_open = {}
+
+
+def open_snapshot(name, root=None):
+    '''The current snapshot of a dataset, or None if it hasn't been written; reopened when it changes'''
+    root = Path(root) if root else snapshot_root()
+    if root is None:
+        return None
+    directory = root / name
+    try:
+        stat = (directory / "manifest.json").stat()
+    except FileNotFoundError:
+        return None
+    # the manifest is replaced, never edited, so a new inode means new parts
+    stamp = (stat.st_ino, stat.st_mtime_ns)
+    cached = _open.get(directory)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    snapshot = Snapshot(directory, read_manifest(directory), cached[1] if cached is not None else None)
+    _open[directory] = (stamp, snapshot)
+    return snapshot
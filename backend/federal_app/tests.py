@@ -0,0 +1,236 @@
+import io
+import tempfile
+from pathlib import Path
+from django.core.management import call_command
+from types import SimpleNamespace
+from unittest.mock import patch
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from core_app.pagination import KeysetPagination, encode_cursor
+from .industries import classify
+from .ingestion import SOURCES, default_transports, sync
+from .management.commands import sync_federal_data
+from .models import Bill, Candidate, Contribution, Organization, SyncCheckpoint
+from .signals import records_ingested
+from .snapshots import Snapshot, append_records, open_snapshot, read_manifest
+
+CASSETTE = Path(__file__).parent / "test_data" / "cassette.json"
+
+# Create your tests here.
+class IngestionTests(TestCase):
+    def setUp(self):
+        self.transports = default_transports(CASSETTE)
+
+    def sync(self, name, **kwargs):
+        source = SOURCES[name]
+        return sync(source, self.transports[source.api], **kwargs)
+
+    def test_command_syncs_every_source(self):
+        call_command("sync_federal_data", fixtures=str(CASSETTE), stdout=io.StringIO())
+        self.assertEqual(Candidate.objects.count(), 5)
+        self.assertEqual(Organization.objects.count(), 4)
+        self.assertEqual(Contribution.objects.count(), 5)
+        self.assertEqual(Bill.objects.count(), 4)
+
+    def test_loop_survives_a_failing_source(self):
+        def flaky(source, *args, **kwargs):
+            if source.name == "fec_candidates":
+                raise ConnectionError("upstream down")
+            return sync(source, *args, **kwargs)
+
+        class Stop(Exception):
+            pass
+        out = io.StringIO()
+        with patch.object(sync_federal_data, "sync", flaky), patch.object(sync_federal_data.time, "sleep", side_effect=Stop):
+            with self.assertLogs("publiceyeusa.ingestion") as logs, self.assertRaises(Stop):
+                call_command("sync_federal_data", "fec_candidates", "fec_committees", "--loop", fixtures=str(CASSETTE), stdout=out)
+        self.assertIn("upstream down", logs.output[0])
+        self.assertIn("fec_committees:", out.getvalue())
+        self.assertEqual(Organization.objects.count(), 4)
+
+    def test_interrupted_sync_resumes_from_checkpoint(self):
+        first = self.sync("fec_candidates", max_pages=1)
+        self.assertFalse(first.completed)
+        self.assertEqual(SyncCheckpoint.objects.get(source="fec_candidates").cursor, {"page": 2})
+        second = self.sync("fec_candidates")
+        self.assertTrue(second.completed)
+        self.assertEqual(second.pages, 1)
+        self.assertEqual(Candidate.objects.count(), 5)
+
+    def test_incremental_run_starts_after_watermark(self):
+        self.sync("fec_contributions")
+        self.assertEqual(SyncCheckpoint.objects.get(source="fec_contributions").watermark, "2024-01-10")
+        result = self.sync("fec_contributions")
+        self.assertEqual(result.records, 2)
+        self.assertEqual(Contribution.objects.count(), 6)
+        # re-sent row is updated in place
+        self.assertEqual(Contribution.objects.get(external_id="4000005").amount, 150)
+
+    def test_bills_upsert_and_signal(self):
+        received = []
+        handler = lambda sender, **kwargs: received.append(kwargs["external_ids"])
+        records_ingested.connect(handler)
+        self.addCleanup(records_ingested.disconnect, handler)
+        self.sync("congress_bills")
+        self.sync("congress_bills")
+        self.assertEqual(Bill.objects.get(external_id="118-hr-101").latest_action, "Passed House.")
+        self.assertEqual(received, [["118-hr-101", "118-hr-102"], ["118-hr-103", "118-hr-104"], ["118-hr-101"]])
+
+
+class KeysetListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # duplicate names make the id tiebreak matter
+        Candidate.objects.bulk_create(
+            Candidate(external_id=f"C{i:03}", name=f"Candidate {i % 4}", party="DEM") for i in range(10)
+        )
+        Bill.objects.bulk_create(
+            Bill(external_id=f"B{i}", congress=117 + i % 2, bill_type="hr", number=str(i)) for i in range(5)
+        )
+
+    def walk(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(response.data["results"])
+            url = response.data["next"] and f"{url.split('?')[0]}?limit=3&cursor={response.data['next']}"
+        return seen
+
+    def test_pages_cover_the_list_once_in_order(self):
+        seen = self.walk("/api/v1/federal/candidates/?limit=3")
+        expected = list(Candidate.objects.order_by("name", "id").values_list("id", flat=True))
+        self.assertEqual([row["id"] for row in seen], expected)
+
+    def test_descending_ordering(self):
+        seen = self.walk("/api/v1/federal/bills/?limit=3")
+        expected = list(Bill.objects.order_by("-congress", "-id").values_list("id", flat=True))
+        self.assertEqual([row["id"] for row in seen], expected)
+
+    def test_page_is_a_single_query(self):
+        response = self.client.get("/api/v1/federal/candidates/?limit=3")
+        with self.assertNumQueries(1) as queries:
+            self.client.get(f"/api/v1/federal/candidates/?limit=3&cursor={response.data['next']}")
+        # one row value comparison rather than an OR chain
+        self.assertIn('("federal_app_candidate"."name", "federal_app_candidate"."id") > (', queries[0]["sql"])
+
+    def test_mixed_directions(self):
+        view = SimpleNamespace(keyset_ordering=("-congress", "id"))
+        expected = list(Bill.objects.order_by("-congress", "id").values_list("id", flat=True))
+        seen, cursor = [], None
+        while True:
+            paginator = KeysetPagination()
+            query = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            with CaptureQueriesContext(connection) as queries:
+                seen.extend(bill.id for bill in paginator.paginate_queryset(Bill.objects.all(), Request(APIRequestFactory().get("/", query)), view))
+            if cursor:
+                self.assertIn('"federal_app_bill"."congress" <= ', queries[0]["sql"])
+            cursor = paginator.next_cursor
+            if not cursor:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_fields_projection(self):
+        response = self.client.get("/api/v1/federal/candidates/?fields=external_id,party&limit=2")
+        self.assertEqual(response.data["results"][0], {"external_id": "C000", "party": "DEM"})
+
+    def test_bad_params(self):
+        self.assertEqual(self.client.get("/api/v1/federal/candidates/?cursor=nope").status_code, 400)
+        # well formed, but not values of the ordering columns
+        self.assertEqual(self.client.get(f"/api/v1/federal/bills/?cursor={encode_cursor(['A', 'zz'])}").status_code, 400)
+        self.assertEqual(self.client.get(f"/api/v1/federal/bills/?cursor={encode_cursor([{}, 1])}").status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/federal/candidates/?fields=secret").status_code, 400)
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        override = override_settings(SNAPSHOT_DIR=self.dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.transports = default_transports(CASSETTE)
+
+    def sync(self, name):
+        source = SOURCES[name]
+        return sync(source, self.transports[source.api])
+
+    def current(self, snapshot):
+        # {external id: (state, amount in cents)} for the rows that aren't superseded
+        rows = {}
+        for part in snapshot.parts:
+            live = part.mask()
+            states = part.dictionary("contributor_state").strings()
+            for key, code, amount in zip(part.column("external_id")[live], part.column("contributor_state")[live], part.column("amount")[live]):
+                rows[key.decode()] = (states[code], int(amount))
+        return rows
+
+    def test_ingested_pages_are_appended_and_newest_row_wins(self):
+        self.sync("fec_contributions")
+        self.sync("fec_contributions")
+        snapshot = open_snapshot("contributions")
+        self.assertEqual(len(snapshot.parts), 3)
+        self.assertEqual(snapshot.rows, 6)
+        rows = self.current(snapshot)
+        self.assertEqual(rows["4000005"], ("CA", 15000))
+        self.assertEqual(rows["4000002"], ("NY", 100000))
+        self.assertEqual(sorted(snapshot.parts[0].dictionary("contributor_state").strings()), ["CA", "DC", "NY"])
+
+    def test_rebuild_compacts_into_one_part(self):
+        self.sync("fec_contributions")
+        self.sync("fec_contributions")
+        before = self.current(open_snapshot("contributions"))
+        out = io.StringIO()
+        call_command("snapshot_federal_data", "contributions", stdout=out)
+        self.assertIn("contributions: wrote 6 rows", out.getvalue())
+        snapshot = open_snapshot("contributions")
+        self.assertEqual(len(snapshot.parts), 1)
+        self.assertEqual(self.current(snapshot), before)
+        self.assertIsNone(snapshot.parts[0].valid("cycle"))
+
+    def test_appended_pages_are_merged_as_they_pile_up(self):
+        with self.settings(SNAPSHOT_COMPACT_FANOUT=2):
+            self.sync("fec_contributions")
+            old = open_snapshot("contributions")
+            before = self.current(old)
+            self.sync("fec_contributions")
+        snapshot = open_snapshot("contributions")
+        self.assertEqual(len(snapshot.parts), 1)
+        self.assertEqual(snapshot.rows, 6)
+        self.assertEqual(self.current(snapshot), self.current(Snapshot(snapshot.directory, snapshot.manifest)))
+        # replaced parts stay readable for snapshots opened before the merge
+        self.assertEqual(self.current(old), before)
+        self.assertEqual(len(read_manifest(snapshot.directory)["retired"]), 4)
+        with self.settings(SNAPSHOT_RETIRE_SECONDS=0):
+            append_records(Contribution, ["4000001"])
+        self.assertEqual(
+            sorted(path.name for path in snapshot.directory.iterdir() if path.is_dir()),
+            [part["name"] for part in read_manifest(snapshot.directory)["parts"]],
+        )
+
+    def test_reopening_after_a_page_matches_a_fresh_open(self):
+        self.sync("fec_contributions")
+        open_snapshot("contributions")
+        self.sync("fec_contributions")
+        snapshot = open_snapshot("contributions")
+        fresh = Snapshot(snapshot.directory, snapshot.manifest)
+        self.assertEqual([None if part.live is None else part.live.tolist() for part in snapshot.parts], [None if part.live is None else part.live.tolist() for part in fresh.parts])
+        self.assertEqual(self.current(snapshot)["4000005"], ("CA", 15000))
+
+
+class IndustryTests(SimpleTestCase):
+    def test_keywords_match_whole_words(self):
+        self.assertEqual(classify("ELECTRICIAN", "IBEW LOCAL 11"), "Construction")
+        self.assertEqual(classify("SOIL SCIENTIST", "USDA"), "Other")
+        self.assertEqual(classify("DEALER", "LAS VEGAS SANDS"), "Other")
+        self.assertEqual(classify("SCHOOL COUNSELOR", "LAUSD"), "Education")
+        self.assertEqual(classify("GENERAL COUNSEL", "ACME"), "Lawyers & Lobbyists")
+        self.assertEqual(classify("OIL & GAS LANDMAN", ""), "Energy")
+        # stems still match their longer forms
+        self.assertEqual(classify("SOFTWARE ENGINEERING MANAGER", ""), "Technology")
+        self.assertEqual(classify("RANCHER", ""), "Agriculture")
+        self.assertEqual(classify("INFORMATION REQUESTED", "HEALTHCARE PARTNERS"), "Health")
+        self.assertEqual(classify("", None), "Unknown")
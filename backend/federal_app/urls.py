@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import AllBills, AllCandidates, AllOrganizations
+
+# keyset paged lists of the ingested federal data
+urlpatterns = [
+    path("candidates/", AllCandidates.as_view(), name="all_candidates"),
+    path("organizations/", AllOrganizations.as_view(), name="all_organizations"),
+    path("bills/", AllBills.as_view(), name="all_bills"),
+]
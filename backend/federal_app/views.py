@@ -0,0 +1,43 @@
+from core_app.docs import openapi, swagger_auto_schema
+from core_app.pagination import KeysetListView
+from .models import Bill, Candidate, Organization
+from .serializers import BillSerializer, CandidateSerializer, OrganizationSerializer
+
+LIST_PARAMETERS = [
+    openapi.Parameter("cursor", openapi.IN_QUERY, type=openapi.TYPE_STRING, description="next from the previous page"),
+    openapi.Parameter("limit", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+    openapi.Parameter("fields", openapi.IN_QUERY, type=openapi.TYPE_STRING, description="comma separated fields to return"),
+]
+
+# Create your views here.
+class AllCandidates(KeysetListView):
+    '''Candidates by name'''
+    queryset = Candidate.objects.all()
+    serializer_class = CandidateSerializer
+    keyset_ordering = ("name", "id")
+
+    @swagger_auto_schema(operation_summary="List candidates", manual_parameters=LIST_PARAMETERS, responses={200: CandidateSerializer(many=True)})
+    def get(self, request):
+        return super().get(request)
+
+
+class AllOrganizations(KeysetListView):
+    '''Committees and other organizations by name'''
+    queryset = Organization.objects.all()
+    serializer_class = OrganizationSerializer
+    keyset_ordering = ("name", "id")
+
+    @swagger_auto_schema(operation_summary="List organizations", manual_parameters=LIST_PARAMETERS, responses={200: OrganizationSerializer(many=True)})
+    def get(self, request):
+        return super().get(request)
+
+
+class AllBills(KeysetListView):
+    '''Bills, newest congress first'''
+    queryset = Bill.objects.all()
+    serializer_class = BillSerializer
+    keyset_ordering = ("-congress", "-id")
+
+    @swagger_auto_schema(operation_summary="List bills", manual_parameters=LIST_PARAMETERS, responses={200: BillSerializer(many=True)})
+    def get(self, request):
+        return super().get(request)
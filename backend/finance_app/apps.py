@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class FinanceAppConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'finance_app'
+
+    def ready(self):
+        # refresh rollups as contributions are ingested
+        from . import signals
@@ -0,0 +1,44 @@
+import hashlib
+import uuid
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import caches
+
+VERSION_KEY = "finances:version"
+RESPONSE_KEY = "finances:{}:{}"
+
+
+def _cache():
+    return caches[getattr(settings, "FINANCE_CACHE_ALIAS", "default")]
+
+
+def rollup_version():
+    '''Moves on every rollup refresh, so cached responses never outlive the numbers they were built from'''
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    _cache().set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def response_key(request):
+    # the same parameters in any order share an entry
+    query = urlencode(sorted((key, value) for key, values in request.GET.lists() for value in values))
+    digest = hashlib.sha256(f"{request.path}?{query}".encode()).hexdigest()
+    return RESPONSE_KEY.format(rollup_version(), digest)
+
+
+def cached_body(request, build):
+    '''JSON bytes for this path and query string, built once per rollup version'''
+    cache = _cache()
+    key = response_key(request)
+    body = cache.get(key)
+    if body is None:
+        body = build()
+        cache.set(key, body, getattr(settings, "FINANCE_CACHE_TIMEOUT", 300))
+    return body
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from finance_app.rollups import rebuild, refresh_stale
+
+
+class Command(BaseCommand):
+    help = "Recompute finance rollups for contributions ingested since the last refresh"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="rebuild every rollup from the contributions table")
+        parser.add_argument("--reclassify", action="store_true", help="with --full, redo every contribution's industry first")
+
+    def handle(self, *args, **options):
+        if options["full"]:
+            rebuild(reclassify=options["reclassify"])
+            self.stdout.write("rebuilt all rollups")
+        else:
+            self.stdout.write(f"refreshed {refresh_stale()} groups")
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.3 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('key', models.CharField(max_length=200)),
+                ('cycle', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Rollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('key', models.CharField(max_length=200)),
+                ('cycle', models.PositiveIntegerField()),
+                ('total', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('contributions', models.PositiveBigIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dimension', 'cycle', '-total'], name='finance_app_dimensi_9f628a_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rollup',
+            constraint=models.UniqueConstraint(fields=('dimension', 'key', 'cycle'), name='finance_rollup_group'),
+        ),
+        migrations.AddConstraint(
+            model_name='stalegroup',
+            constraint=models.UniqueConstraint(fields=('dimension', 'key', 'cycle'), name='finance_stale_group'),
+        ),
+    ]
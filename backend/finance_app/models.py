@@ -0,0 +1,28 @@
+from django.db import models
+
+# Create your models here.
+# Totals of federal_app.Contribution per (dimension, key, cycle), kept current by rollups.refresh_stale.
+# cycle 0 holds receipts without a two-year period.
+
+class Rollup(models.Model):
+    dimension = models.CharField(max_length=20)
+    key = models.CharField(max_length=200)
+    cycle = models.PositiveIntegerField()
+    total = models.DecimalField(max_digits=16, decimal_places=2)
+    contributions = models.PositiveBigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["dimension", "key", "cycle"], name="finance_rollup_group")]
+        # top-N for a dimension and cycle is an index scan
+        indexes = [models.Index(fields=["dimension", "cycle", "-total"])]
+
+
+class StaleGroup(models.Model):
+    '''A rollup group whose contributions changed since it was last computed'''
+    dimension = models.CharField(max_length=20)
+    key = models.CharField(max_length=200)
+    cycle = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["dimension", "key", "cycle"], name="finance_stale_group")]
@@ -0,0 +1,205 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from federal_app.industries import classify
+from federal_app.models import Candidate, Contribution, Organization
+from .cache import bump_version
+from .models import Rollup, StaleGroup
+
+# dimension -> the Contribution column it groups by
+COLUMNS = {"committee": "committee_id", "industry": "industry", "state": "contributor_state"}
+# candidates are credited with the receipts of their committees (Organization.candidate_ids)
+DIMENSIONS = ("candidate", *COLUMNS)
+NAMES = {"candidate": Candidate, "committee": Organization}
+
+
+# Which groups an ingest touched
+
+def groups_for_contributions(external_ids):
+    '''The (dimension, key, cycle) groups the given contributions count towards'''
+    groups = set()
+    rows = Contribution.objects.filter(external_id__in=external_ids).values_list(*COLUMNS.values(), "cycle")
+    for *keys, cycle in rows:
+        for dimension, key in zip(COLUMNS, keys):
+            groups.add((dimension, key, cycle or 0))
+    return groups
+
+
+def committee_candidates(committee_ids=None):
+    '''committee id -> its candidate ids, for the given committees or all of them'''
+    organizations = Organization.objects.all()
+    if committee_ids is not None:
+        organizations = organizations.filter(external_id__in=committee_ids)
+    return {committee: candidates for committee, candidates in organizations.values_list("external_id", "candidate_ids") if candidates}
+
+
+def candidate_committees():
+    '''candidate id -> the committees whose receipts count towards it'''
+    committees = defaultdict(list)
+    for committee, candidates in committee_candidates().items():
+        for candidate in candidates:
+            committees[candidate].append(committee)
+    return committees
+
+
+def candidate_groups(committee_groups):
+    '''Candidate groups fed by the given (committee, cycle) groups'''
+    links = committee_candidates({key for key, _ in committee_groups})
+    return {("candidate", candidate, cycle) for key, cycle in committee_groups for candidate in links.get(key, ())}
+
+
+def groups_for_committees(external_ids):
+    '''Candidate groups to recompute after committees (and their candidate links) were ingested'''
+    committee_groups = set(Rollup.objects.filter(dimension="committee", key__in=external_ids).values_list("key", "cycle"))
+    return candidate_groups(committee_groups)
+
+
+def mark_stale(groups):
+    StaleGroup.objects.bulk_create(
+        [StaleGroup(dimension=dimension, key=key, cycle=cycle) for dimension, key, cycle in groups],
+        ignore_conflicts=True,
+        batch_size=1000,
+    )
+
+
+# Computing groups
+
+def column_totals(dimension, groups):
+    '''{(key, cycle): (total, contributions)} for groups of a column dimension, from the raw rows'''
+    column = COLUMNS[dimension]
+    keys_by_cycle = defaultdict(set)
+    for key, cycle in groups:
+        keys_by_cycle[cycle].add(key)
+    # one (column, cycle) index range per cycle
+    condition = Q()
+    for cycle, keys in keys_by_cycle.items():
+        condition |= Q(**{f"{column}__in": keys}) & (Q(cycle=cycle) if cycle else Q(cycle__isnull=True))
+    rows = Contribution.objects.filter(condition).values(column, "cycle").annotate(total=Sum("amount"), contributions=Count("id"))
+    return {(row[column], row["cycle"] or 0): (row["total"], row["contributions"]) for row in rows}
+
+
+def candidate_totals(groups, committees_by_candidate):
+    '''{(candidate, cycle): (total, contributions)} summed from the committee rollups'''
+    committees = {committee for key, _ in groups for committee in committees_by_candidate.get(key, ())}
+    cycles = {cycle for _, cycle in groups}
+    by_committee = {
+        (key, cycle): (total, contributions)
+        for key, cycle, total, contributions in Rollup.objects.filter(dimension="committee", key__in=committees, cycle__in=cycles)
+        .values_list("key", "cycle", "total", "contributions")
+    }
+    totals = {}
+    for key, cycle in groups:
+        parts = [by_committee[(committee, cycle)] for committee in committees_by_candidate.get(key, ()) if (committee, cycle) in by_committee]
+        if parts:
+            totals[(key, cycle)] = (sum(total for total, _ in parts), sum(count for _, count in parts))
+    return totals
+
+
+def save_groups(dimension, groups, totals):
+    '''Write computed totals and drop the groups that no longer have any contributions'''
+    Rollup.objects.bulk_create(
+        [
+            Rollup(dimension=dimension, key=key, cycle=cycle, total=total, contributions=contributions)
+            for (key, cycle), (total, contributions) in totals.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["dimension", "key", "cycle"],
+        update_fields=["total", "contributions", "updated_at"],
+        batch_size=1000,
+    )
+    empty = set(groups) - set(totals)
+    if empty:
+        condition = Q()
+        for key, cycle in empty:
+            condition |= Q(key=key, cycle=cycle)
+        Rollup.objects.filter(condition, dimension=dimension).delete()
+
+
+def refresh_stale(batch_size=500):
+    '''Recompute every stale group, returning how many were refreshed
+
+    Column dimensions go first since candidate totals are summed from the committee rollups.
+    Each batch is claimed by deleting its StaleGroup rows in the same transaction, so a group
+    marked again while it's being computed is picked up by the next refresh.
+    '''
+    refreshed = 0
+    committees_by_candidate = None
+    for dimension in (*COLUMNS, "candidate"):
+        while True:
+            stale = list(StaleGroup.objects.filter(dimension=dimension).values_list("id", "key", "cycle")[:batch_size])
+            if not stale:
+                break
+            groups = {(key, cycle) for _, key, cycle in stale}
+            with transaction.atomic():
+                StaleGroup.objects.filter(id__in=[id for id, _, _ in stale]).delete()
+                if dimension == "candidate":
+                    if committees_by_candidate is None:
+                        committees_by_candidate = candidate_committees()
+                    totals = candidate_totals(groups, committees_by_candidate)
+                else:
+                    totals = column_totals(dimension, groups)
+                save_groups(dimension, groups, totals)
+                if dimension == "committee":
+                    mark_stale(candidate_groups(groups))
+            refreshed += len(groups)
+    if refreshed:
+        bump_version()
+    return refreshed
+
+
+def backfill_industries(batch_size=5000, reclassify=False):
+    '''Classify contributions ingested before the industry column existed, or all of them with reclassify'''
+    last = 0
+    while True:
+        rows = Contribution.objects.filter(id__gt=last) if reclassify else Contribution.objects.filter(industry="")
+        rows = list(rows.order_by("id").values_list("id", "contributor_occupation", "contributor_employer", "industry")[:batch_size])
+        if not rows:
+            return
+        last = rows[-1][0]
+        changed = [Contribution(id=id, industry=classify(occupation, employer)) for id, occupation, employer, _ in rows]
+        Contribution.objects.bulk_update([new for new, row in zip(changed, rows) if new.industry != row[3]], ["industry"])
+
+
+def rebuild(reclassify=False):
+    '''Recompute every rollup from scratch, e.g. after a bulk load, or with reclassify after a change to the industry table'''
+    backfill_industries(reclassify=reclassify)
+    with transaction.atomic():
+        StaleGroup.objects.all().delete()
+        Rollup.objects.all().delete()
+        for dimension, column in COLUMNS.items():
+            rows = Contribution.objects.values(column, "cycle").annotate(total=Sum("amount"), contributions=Count("id"))
+            Rollup.objects.bulk_create(
+                (
+                    Rollup(dimension=dimension, key=row[column], cycle=row["cycle"] or 0, total=row["total"], contributions=row["contributions"])
+                    for row in rows.iterator()
+                ),
+                batch_size=1000,
+            )
+        committee_groups = set(Rollup.objects.filter(dimension="committee").values_list("key", "cycle"))
+        groups = {(key, cycle) for _, key, cycle in candidate_groups(committee_groups)}
+        save_groups("candidate", groups, candidate_totals(groups, candidate_committees()))
+    bump_version()
+
+
+# Reading
+
+def rollup_totals(dimension, cycle=None, keys=None, limit=20):
+    '''Largest groups of a dimension, for one cycle or summed over all of them'''
+    rows = Rollup.objects.filter(dimension=dimension)
+    if keys:
+        rows = rows.filter(key__in=keys)
+    if cycle is not None:
+        # served straight off the (dimension, cycle, -total) index
+        rows = rows.filter(cycle=cycle).values("key", "total", "contributions")
+    else:
+        rows = rows.values("key").annotate(total=Sum("total"), contributions=Sum("contributions"))
+    results = [
+        {"key": row["key"], "total": f"{row['total']:.2f}", "contributions": row["contributions"]}
+        for row in rows.order_by("-total", "key")[:limit]
+    ]
+    model = NAMES.get(dimension)
+    if model is not None:
+        names = dict(model.objects.filter(external_id__in=[row["key"] for row in results]).values_list("external_id", "name"))
+        for row in results:
+            row["name"] = names.get(row["key"], "")
+    return results
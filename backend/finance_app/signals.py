@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.dispatch import receiver
+from federal_app.models import Contribution, Organization
+from federal_app.signals import records_ingested
+from .rollups import groups_for_committees, groups_for_contributions, mark_stale, refresh_stale
+
+
+@receiver(records_ingested)
+def refresh_ingested_groups(sender, model, external_ids, **kwargs):
+    # only the groups this page touched are recomputed, not the whole table
+    if model is Contribution:
+        mark_stale(groups_for_contributions(external_ids))
+    elif model is Organization:
+        mark_stale(groups_for_committees(external_ids))
+    else:
+        return
+    # with FINANCE_REFRESH_ON_INGEST off, refresh_finance_rollups picks the stale groups up
+    if getattr(settings, "FINANCE_REFRESH_ON_INGEST", True):
+        refresh_stale()
@@ -0,0 +1,129 @@
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from federal_app.models import Contribution
+from federal_app.snapshots import open_snapshot
+from .rollups import candidate_committees
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - only the snapshot source needs numpy
+    np = None
+
+# ad-hoc slice grouping -> Contribution column
+GROUPS = {"committee": "committee_id", "industry": "industry", "state": "contributor_state", "cycle": "cycle", "month": "receipt_date"}
+# exact-match filters; candidate is expanded to that candidate's committees
+FILTERS = {"committee": "committee_id", "industry": "industry", "state": "contributor_state", "cycle": "cycle"}
+
+
+def slice_queryset(filters, candidate=None, min_date=None, max_date=None):
+    queryset = Contribution.objects.filter(**{FILTERS[name]: value for name, value in filters.items()})
+    if candidate is not None:
+        queryset = queryset.filter(committee_id__in=candidate_committees().get(candidate, []))
+    if min_date is not None:
+        queryset = queryset.filter(receipt_date__gte=min_date)
+    if max_date is not None:
+        queryset = queryset.filter(receipt_date__lte=max_date)
+    return queryset
+
+
+def database_aggregate(queryset, group_by):
+    '''{key: (total cents, contributions)} for every distinct key, grouped by the database'''
+    if group_by == "month":
+        key = TruncMonth(GROUPS[group_by])
+    elif group_by == "cycle":
+        key = Coalesce(GROUPS[group_by], Value(0))
+    else:
+        key = F(GROUPS[group_by])
+    rows = queryset.order_by().values(group_key=key).annotate(total=Sum("amount"), contributions=Count("id"))
+    groups = {}
+    for label, total, count in rows.values_list("group_key", "total", "contributions"):
+        if group_by == "month":
+            label = label.strftime("%Y-%m") if label else ""
+        groups[label] = (int(total.scaleb(2)), count)
+    return groups
+
+
+def group_sums(keys, cents):
+    '''(distinct keys, total cents, counts) with one sort over the whole column instead of a dict update per row'''
+    uniques, inverse = np.unique(keys, return_inverse=True)
+    # float64 sums of whole cents are exact well past any realistic total
+    totals = np.bincount(inverse, weights=cents, minlength=len(uniques))
+    counts = np.bincount(inverse, minlength=len(uniques))
+    return uniques, totals, counts
+
+
+def month_labels(months):
+    return ["" if np.isnat(month) else str(month) for month in months]
+
+
+def merge(groups, labels, totals, counts):
+    for label, total, count in zip(labels, totals.tolist(), counts.tolist()):
+        if count:
+            previous_total, previous_count = groups.get(label, (0, 0))
+            groups[label] = (previous_total + int(round(total)), previous_count + count)
+    return groups
+
+
+def snapshot_aggregate(snapshot, group_by, filters, candidate=None, min_date=None, max_date=None):
+    '''database_aggregate() over the memory mapped contributions snapshot, with no per-row python objects
+
+    Filters become boolean masks over each part's columns and string groups are summed by
+    dictionary code, so only the distinct keys are ever decoded.
+    '''
+    committees = candidate_committees().get(candidate, []) if candidate is not None else None
+    # amounts are stored scaled to the column's decimal places, slices add up cents
+    scale = 10 ** (2 - snapshot.columns["amount"]["scale"])
+    groups = {}
+    for part in snapshot.parts:
+        mask = part.mask()
+        for name, value in filters.items():
+            if name == "cycle":
+                # null cycles are stored as 0, like the database path coalesces them
+                mask &= part.column("cycle") == value
+            else:
+                mask &= part.isin(FILTERS[name], [value])
+        if committees is not None:
+            mask &= part.isin("committee_id", committees)
+        dates = part.column("receipt_date")
+        # NaT compares false, like NULL in the database filters
+        if min_date is not None:
+            mask &= dates >= np.datetime64(min_date, "D")
+        if max_date is not None:
+            mask &= dates <= np.datetime64(max_date, "D")
+        cents = part.column("amount")[mask] * scale
+        if group_by == "month":
+            uniques, totals, counts = group_sums(dates[mask].astype("datetime64[M]"), cents)
+            merge(groups, month_labels(uniques), totals, counts)
+        elif group_by == "cycle":
+            uniques, totals, counts = group_sums(part.column("cycle")[mask], cents)
+            merge(groups, uniques.tolist(), totals, counts)
+        else:
+            column = GROUPS[group_by]
+            dictionary = part.dictionary(column)
+            codes = part.column(column)[mask]
+            totals = np.bincount(codes, weights=cents, minlength=len(dictionary))
+            counts = np.bincount(codes, minlength=len(dictionary))
+            present = np.flatnonzero(counts)
+            strings = dictionary.strings()
+            merge(groups, [strings[code] for code in present.tolist()], totals[present], counts[present])
+    return groups
+
+
+def slice_totals(group_by, filters, candidate=None, min_date=None, max_date=None, limit=20):
+    '''Contribution totals for any filter combination the rollups don't cover, largest first'''
+    snapshot = open_snapshot("contributions") if getattr(settings, "FINANCE_SLICE_SOURCE", "database") == "snapshot" else None
+    if snapshot is not None:
+        groups = snapshot_aggregate(snapshot, group_by, filters, candidate, min_date, max_date)
+    else:
+        groups = database_aggregate(slice_queryset(filters, candidate, min_date, max_date), group_by)
+    ordered = sorted(groups.items(), key=lambda item: (-item[1][0], str(item[0])))
+    return {
+        "contributions": sum(count for _, count in groups.values()),
+        "total": f"{Decimal(sum(total for total, _ in groups.values())).scaleb(-2):.2f}",
+        "results": [
+            {"key": key, "total": f"{Decimal(total).scaleb(-2):.2f}", "contributions": count}
+            for key, (total, count) in ordered[:limit]
+        ],
+    }
@@ -0,0 +1,102 @@
+import io
+import tempfile
+from pathlib import Path
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from federal_app.ingestion import SOURCES, default_transports, sync
+from federal_app.models import Contribution, Organization
+from .models import Rollup, StaleGroup
+
+CASSETTE = Path(__file__).resolve().parent.parent / "federal_app" / "test_data" / "cassette.json"
+
+# Create your tests here.
+class RollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.transports = default_transports(CASSETTE)
+
+    def sync(self, name):
+        source = SOURCES[name]
+        return sync(source, self.transports[source.api])
+
+    def totals(self, dimension):
+        return {(key, cycle): (f"{total:.2f}", count) for key, cycle, total, count in Rollup.objects.filter(dimension=dimension).values_list("key", "cycle", "total", "contributions")}
+
+    def test_ingest_refreshes_touched_groups(self):
+        self.sync("fec_contributions")
+        self.assertEqual(self.totals("state"), {("CA", 2024): ("350.00", 2), ("NY", 2024): ("3800.00", 2), ("DC", 2024): ("5000.00", 1)})
+        self.assertEqual(self.totals("industry")[("Lawyers & Lobbyists", 2024)], ("3800.00", 2))
+        # the incremental run updates 4000005 in place and adds 4000006
+        self.sync("fec_contributions")
+        self.assertEqual(self.totals("state")[("CA", 2024)], ("900.00", 3))
+        self.assertEqual(self.totals("committee")[("C00000002", 2024)], ("1500.00", 2))
+        self.assertFalse(StaleGroup.objects.exists())
+
+    def test_candidates_are_credited_with_their_committees(self):
+        self.sync("fec_contributions")
+        Organization.objects.create(external_id="C00000001", name="Friends of One", candidate_ids=["P1"])
+        Organization.objects.create(external_id="C00000003", name="One Victory Fund", candidate_ids=["P1", "P2"])
+        call_command("refresh_finance_rollups", "--full", stdout=io.StringIO())
+        self.assertEqual(self.totals("candidate"), {("P1", 2024): ("3150.00", 3), ("P2", 2024): ("100.00", 1)})
+        # a rebuild gives the same rollups as the incremental path
+        incremental = self.totals("state")
+        call_command("refresh_finance_rollups", "--full", stdout=io.StringIO())
+        self.assertEqual(self.totals("state"), incremental)
+
+    def test_reclassify_redoes_industries(self):
+        self.sync("fec_contributions")
+        Contribution.objects.update(industry="Energy")
+        call_command("refresh_finance_rollups", "--full", "--reclassify", stdout=io.StringIO())
+        self.assertEqual(self.totals("industry")[("Lawyers & Lobbyists", 2024)], ("3800.00", 2))
+        self.assertNotIn(("Energy", 2024), self.totals("industry"))
+
+    def test_totals_endpoint_is_cached_until_refresh(self):
+        self.sync("fec_contributions")
+        response = self.client.get("/api/v1/finances/state/", {"cycle": 2024, "limit": 2})
+        self.assertEqual(response.json()["results"], [
+            {"key": "DC", "total": "5000.00", "contributions": 1},
+            {"key": "NY", "total": "3800.00", "contributions": 2},
+        ])
+        with self.assertNumQueries(0):
+            self.client.get("/api/v1/finances/state/", {"limit": 2, "cycle": 2024})
+        self.sync("fec_contributions")
+        response = self.client.get("/api/v1/finances/state/", {"cycle": 2024, "keys": "CA"})
+        self.assertEqual(response.json()["results"], [{"key": "CA", "total": "900.00", "contributions": 3}])
+        self.assertEqual(self.client.get("/api/v1/finances/party/").status_code, 404)
+        self.assertEqual(self.client.get("/api/v1/finances/state/", {"cycle": "x"}).status_code, 400)
+        # page sizes are clamped to 1..MAX_LIMIT
+        self.assertEqual(len(self.client.get("/api/v1/finances/state/", {"limit": -1}).json()["results"]), 1)
+        self.assertEqual(len(self.client.get("/api/v1/finances/slice/", {"group_by": "state", "limit": -1}).json()["results"]), 1)
+
+    def test_slice_is_grouped_by_the_database(self):
+        self.sync("fec_contributions")
+        self.sync("fec_contributions")
+        # one grouped query, however many contributions match
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/v1/finances/slice/", {"group_by": "state", "max_date": "2024-01-31"})
+        self.assertEqual(response.json()["total"], "9200.00")
+        month = self.client.get("/api/v1/finances/slice/", {"group_by": "month", "state": "CA"}).json()
+        self.assertEqual([(row["key"], row["total"]) for row in month["results"]], [("2024-02", "500.00"), ("2024-01", "400.00")])
+        cycle = self.client.get("/api/v1/finances/slice/", {"group_by": "cycle"}).json()
+        self.assertEqual([(row["key"], row["contributions"]) for row in cycle["results"]], [(2024, cycle["contributions"])])
+        self.assertEqual(self.client.get("/api/v1/finances/slice/", {"group_by": "party"}).status_code, 400)
+
+    def test_snapshot_slices_match_database(self):
+        self.sync("fec_contributions")
+        Organization.objects.create(external_id="C00000001", name="Friends of One", candidate_ids=["P1"])
+        queries = [
+            {"group_by": "state"},
+            {"group_by": "industry", "cycle": "2024", "min_date": "2024-01-06"},
+            {"group_by": "month", "candidate": "P1"},
+            {"group_by": "cycle", "state": "NY"},
+        ]
+        with tempfile.TemporaryDirectory() as directory, override_settings(SNAPSHOT_DIR=directory):
+            call_command("snapshot_federal_data", "contributions", stdout=io.StringIO())
+            # the second run appends a part that supersedes 4000005
+            self.sync("fec_contributions")
+            expected = [self.client.get("/api/v1/finances/slice/", query).json() for query in queries]
+            cache.clear()
+            with override_settings(FINANCE_SLICE_SOURCE="snapshot"):
+                for query, result in zip(queries, expected):
+                    self.assertEqual(self.client.get("/api/v1/finances/slice/", query).json(), result, query)
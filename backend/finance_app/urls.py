@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import Slice, Totals
+
+# contribution totals: precomputed per dimension, or ad-hoc slices
+urlpatterns = [
+    path("slice/", Slice.as_view(), name="finance_slice"),
+    path("<str:dimension>/", Totals.as_view(), name="finance_totals"),
+]
@@ -0,0 +1,94 @@
+from django.http import HttpResponse
+from django.utils.dateparse import parse_date
+from rest_framework.response import Response
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
+from rest_framework.views import APIView
+from core_app.docs import openapi, swagger_auto_schema
+from core_app.params import InvalidQuery, int_param, limit_param
+from core_app.renderers import dumps
+from .cache import cached_body
+from .rollups import DIMENSIONS, rollup_totals
+from .slices import FILTERS, GROUPS, slice_totals
+
+MAX_LIMIT = 100
+
+
+def date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise InvalidQuery(f"{name} must be a YYYY-MM-DD date.")
+    return parsed
+
+
+def json_body(request, build):
+    # the rollups only change on refresh, so responses are cached per query until then
+    try:
+        body = cached_body(request, lambda: dumps(build(request.query_params)))
+    except InvalidQuery as e:
+        return Response(str(e), status=HTTP_400_BAD_REQUEST)
+    return HttpResponse(body, content_type="application/json", status=HTTP_200_OK)
+
+
+# Create your views here.
+class Totals(APIView):
+    '''Precomputed contribution totals by candidate, committee, industry or state'''
+    @swagger_auto_schema(
+        operation_summary="Contribution totals for a dimension",
+        operation_description=f"Largest totals for one of {', '.join(DIMENSIONS)}, from rollups refreshed after every ingest. Without cycle the totals cover all cycles.",
+        manual_parameters=[
+            openapi.Parameter("cycle", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter("keys", openapi.IN_QUERY, type=openapi.TYPE_STRING, description="comma separated ids, e.g. committee ids or state codes"),
+            openapi.Parameter("limit", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: "{dimension, cycle, results: [{key, name?, total, contributions}]}"},
+    )
+    def get(self, request, dimension):
+        if dimension not in DIMENSIONS:
+            return Response(f"dimension must be one of {', '.join(DIMENSIONS)}.", status=HTTP_404_NOT_FOUND)
+
+        def build(params):
+            cycle = int_param(params, "cycle")
+            keys = [key for key in params.get("keys", "").split(",") if key]
+            limit = limit_param(params, 20, MAX_LIMIT)
+            return {"dimension": dimension, "cycle": cycle, "results": rollup_totals(dimension, cycle, keys, limit)}
+
+        return json_body(request, build)
+
+
+class Slice(APIView):
+    '''Ad-hoc contribution totals for filter combinations the rollups don't cover'''
+    @swagger_auto_schema(
+        operation_summary="Contribution totals for a slice",
+        operation_description="Filters contributions and groups them by committee, industry, state, cycle or month, summed by the database (or the columnar snapshot when FINANCE_SLICE_SOURCE is snapshot).",
+        manual_parameters=[
+            openapi.Parameter("group_by", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True, enum=list(GROUPS)),
+            openapi.Parameter("candidate", openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            *[openapi.Parameter(name, openapi.IN_QUERY, type=openapi.TYPE_STRING) for name in FILTERS],
+            openapi.Parameter("min_date", openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter("max_date", openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter("limit", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: "{group_by, contributions, total, results: [{key, total, contributions}]}"},
+    )
+    def get(self, request):
+        def build(params):
+            group_by = params.get("group_by")
+            if group_by not in GROUPS:
+                raise InvalidQuery(f"group_by must be one of {', '.join(GROUPS)}.")
+            filters = {name: params[name] for name in FILTERS if params.get(name)}
+            if "cycle" in filters:
+                filters["cycle"] = int_param(params, "cycle")
+            limit = limit_param(params, 20, MAX_LIMIT)
+            result = slice_totals(
+                group_by, filters, candidate=params.get("candidate") or None,
+                min_date=date_param(params, "min_date"), max_date=date_param(params, "max_date"), limit=limit,
+            )
+            return {"group_by": group_by, **result}
+
+        return json_body(request, build)
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class GraphAppConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'graph_app'
+
+    def ready(self):
+        # update the graph's edges as federal records are ingested
+        from . import signals
@@ -0,0 +1,209 @@
+import re
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, Sum
+from federal_app.models import Bill, Candidate, Contribution, Organization
+from .models import GraphEdge, GraphState
+
+# node types, each keyed "<type>:<id>":
+#   donor      contributor name and state as filed, "donor:SMITH, JOHN|CA"
+#   committee  FEC committee id
+#   candidate  FEC candidate id
+#   member     member of Congress by bioguide id, the id bills name their sponsor by
+#   bill       Bill.external_id
+NODE_TYPES = ("donor", "committee", "candidate", "member", "bill")
+# edge kinds, pointing the way money and support flow:
+#   contribution  donor -> committee, with the receipts' amount
+#   committee     committee -> candidate it is authorized by (Organization.candidate_ids)
+#   member        candidate -> the member of Congress they are, matched by name
+#   sponsor       member -> bill
+KINDS = ("contribution", "committee", "member", "sponsor")
+
+# "Rep. Pelosi, Nancy [D-CA-11]" -> PELOSI, NANCY in CA, the form FEC files candidate names in
+SPONSOR_NAME = re.compile(r"^(?:(?:Rep|Sen|Del|Resident Commissioner)\.?\s+)?(?P<name>[^\[]+?)\s*(?:\[[^\]]*?-(?P<state>[A-Z]{2})\b[^\]]*\])?$")
+
+
+def node(node_type, key):
+    return f"{node_type}:{key}"
+
+
+def donor_node(name, state):
+    return node("donor", f"{name}|{state}")
+
+
+def sponsor_key(sponsor_name):
+    '''(NAME, state or "") to match a bill sponsor against candidate names, None if it doesn't parse'''
+    match = SPONSOR_NAME.match(sponsor_name.strip())
+    if match is None:
+        return None
+    return match["name"].upper(), match["state"] or ""
+
+
+def existing_edges(kind, **filters):
+    '''{(source, target): (amount, contributions, active)} of the stored edges of a kind'''
+    rows = GraphEdge.objects.filter(kind=kind, **filters).values_list("source", "target", "amount", "contributions", "active")
+    return {(source, target): (amount, contributions, active) for source, target, amount, contributions, active in rows}
+
+
+# What each ingested page changes. Every builder returns (kind, existing, desired): the stored
+# edges in the scope the page could have changed, and what that scope should hold now.
+
+def contribution_edges(external_ids):
+    pairs = {
+        (name, state, committee)
+        for name, state, committee in Contribution.objects.filter(external_id__in=external_ids)
+        .values_list("contributor_name", "contributor_state", "committee_id")
+        if name and committee
+    }
+    scope = {(donor_node(name, state), node("committee", committee)) for name, state, committee in pairs}
+    rows = (
+        Contribution.objects.filter(committee_id__in={committee for _, _, committee in pairs}, contributor_name__in={name for name, _, _ in pairs})
+        .values("contributor_name", "contributor_state", "committee_id")
+        .annotate(amount=Sum("amount"), contributions=Count("id"))
+    )
+    desired = {}
+    for row in rows:
+        edge = (donor_node(row["contributor_name"], row["contributor_state"]), node("committee", row["committee_id"]))
+        if edge in scope:
+            desired[edge] = (row["amount"], row["contributions"])
+    existing = existing_edges("contribution", target__in={target for _, target in scope}, source__in={source for source, _ in scope})
+    return "contribution", {edge: value for edge, value in existing.items() if edge in scope}, desired
+
+
+def committee_edges(external_ids):
+    desired = {
+        (node("committee", committee), node("candidate", candidate)): (0, 0)
+        for committee, candidates in Organization.objects.filter(external_id__in=external_ids).values_list("external_id", "candidate_ids")
+        for candidate in candidates or ()
+    }
+    return "committee", existing_edges("committee", source__in=[node("committee", committee) for committee in external_ids]), desired
+
+
+def sponsor_edges(external_ids):
+    desired = {
+        (node("member", sponsor), node("bill", bill)): (0, 0)
+        for bill, sponsor in Bill.objects.filter(external_id__in=external_ids).values_list("external_id", "sponsor_id")
+        if sponsor
+    }
+    return "sponsor", existing_edges("sponsor", target__in=[node("bill", bill) for bill in external_ids]), desired
+
+
+def member_edges(external_ids=None):
+    '''Links members to candidates whose name (and state, when the sponsor name has one) matches exactly one of them
+
+    There is no id crosswalk between Congress and the FEC here, so ambiguous names stay unlinked.
+    Sponsors are few, so every call recomputes all of these links.
+    '''
+    sponsors = {}
+    for sponsor, name in Bill.objects.exclude(sponsor_id="").values_list("sponsor_id", "sponsor_name").distinct():
+        key = sponsor_key(name)
+        if key is not None:
+            sponsors[sponsor] = key
+    candidates = defaultdict(list)
+    for candidate, name, state in Candidate.objects.filter(name__in={name for name, _ in sponsors.values()}).values_list("external_id", "name", "state"):
+        candidates[name].append((candidate, state))
+    desired = {}
+    for sponsor, (name, state) in sponsors.items():
+        matches = {candidate for candidate, candidate_state in candidates[name] if not state or candidate_state == state}
+        if len(matches) == 1:
+            desired[(node("candidate", matches.pop()), node("member", sponsor))] = (0, 0)
+    return "member", existing_edges("member"), desired
+
+
+BUILDERS = {
+    Contribution: [contribution_edges],
+    Organization: [committee_edges],
+    Bill: [sponsor_edges, member_edges],
+    Candidate: [member_edges],
+}
+
+
+# Writing
+
+def locked_state():
+    GraphState.objects.get_or_create(pk=1)
+    return GraphState.objects.select_for_update().get(pk=1)
+
+
+def write(kind, existing, desired, revision):
+    '''Store the desired edges of a scope and deactivate the rest, touching only rows that change'''
+    changed = [
+        GraphEdge(source=source, target=target, kind=kind, amount=amount, contributions=contributions, active=True, revision=revision)
+        for (source, target), (amount, contributions) in desired.items()
+        if existing.get((source, target)) != (amount, contributions, True)
+    ]
+    changed += [
+        GraphEdge(source=source, target=target, kind=kind, amount=amount, contributions=contributions, active=False, revision=revision)
+        for (source, target), (amount, contributions, active) in existing.items()
+        if active and (source, target) not in desired
+    ]
+    GraphEdge.objects.bulk_create(
+        changed,
+        update_conflicts=True,
+        unique_fields=["source", "target", "kind"],
+        update_fields=["amount", "contributions", "active", "revision"],
+        batch_size=1000,
+    )
+    return len(changed)
+
+
+def refresh_edges(model, external_ids):
+    '''Recompute the edges the given records take part in, returning how many changed
+
+    The state row is held until commit, so writes get revisions in commit order and a worker
+    that has loaded revision r can catch up with just the rows above r.
+    '''
+    builders = BUILDERS.get(model)
+    if not builders or not external_ids:
+        return 0
+    with transaction.atomic():
+        state = locked_state()
+        revision = state.revision + 1
+        changed = sum(write(*build(external_ids), revision) for build in builders)
+        if changed:
+            state.revision = revision
+            state.save(update_fields=["revision"])
+    return changed
+
+
+def all_edges():
+    '''Every edge computed from the federal tables, as GraphEdge rows without a revision'''
+    rows = (
+        Contribution.objects.exclude(contributor_name="").exclude(committee_id="")
+        .values("contributor_name", "contributor_state", "committee_id")
+        .annotate(amount=Sum("amount"), contributions=Count("id"))
+    )
+    for row in rows.iterator():
+        yield GraphEdge(
+            source=donor_node(row["contributor_name"], row["contributor_state"]), target=node("committee", row["committee_id"]),
+            kind="contribution", amount=row["amount"], contributions=row["contributions"],
+        )
+    for committee, candidates in Organization.objects.values_list("external_id", "candidate_ids").iterator():
+        for candidate in candidates or ():
+            yield GraphEdge(source=node("committee", committee), target=node("candidate", candidate), kind="committee")
+    for bill, sponsor in Bill.objects.exclude(sponsor_id="").values_list("external_id", "sponsor_id").iterator():
+        yield GraphEdge(source=node("member", sponsor), target=node("bill", bill), kind="sponsor")
+    for source, target in member_edges()[2]:
+        yield GraphEdge(source=source, target=target, kind="member")
+
+
+def rebuild(batch_size=5000):
+    '''Recompute every edge from scratch, returning how many there are; workers reload in full'''
+    count = 0
+    with transaction.atomic():
+        state = locked_state()
+        revision = state.revision + 1
+        GraphEdge.objects.all().delete()
+        batch = []
+        for edge in all_edges():
+            edge.revision = revision
+            batch.append(edge)
+            if len(batch) == batch_size:
+                GraphEdge.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        GraphEdge.objects.bulk_create(batch)
+        count += len(batch)
+        state.revision = state.base_revision = revision
+        state.save(update_fields=["revision", "base_revision"])
+    return count
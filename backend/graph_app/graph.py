@@ -0,0 +1,295 @@
+import threading
+import time
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from .edges import KINDS, NODE_TYPES
+from .models import GraphEdge, GraphState
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - the graph needs numpy, the edges table doesn't
+    np = None
+
+CONTRIBUTION = KINDS.index("contribution")
+
+
+class GraphTooLarge(Exception):
+    pass
+
+
+def csr(heads, nodes):
+    '''(offsets, edge order) so the edges of node i are order[offsets[i]:offsets[i + 1]]'''
+    order = np.argsort(heads, kind="stable")
+    offsets = np.zeros(nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(heads, minlength=nodes), out=offsets[1:])
+    return offsets, order
+
+
+def slots(offsets, frontier, budget):
+    '''(head per slot, CSR slots) of every edge of the frontier nodes, gathered without a python loop'''
+    starts = offsets[frontier]
+    lengths = offsets[frontier + 1] - starts
+    total = int(lengths.sum())
+    if total > budget:
+        raise GraphTooLarge(f"The traversal would scan more than {budget} edges, ask for fewer hops.")
+    # slot j of node i's run sits at starts[i] + (j - where node i's run begins in the output)
+    begins = np.cumsum(lengths) - lengths
+    return np.repeat(frontier, lengths), np.repeat(starts - begins, lengths) + np.arange(total)
+
+
+class Graph:
+    '''CSR adjacency of the active edges at one revision, in both directions; never modified once built
+
+    Node keys live in a list and dict shared with the graphs built from this one, only ever
+    appended to, so a key is only a node of this graph when its id is below self.nodes.
+    '''
+
+    def __init__(self, keys, index, types, src, dst, kinds, cents, counts, revision):
+        self.keys = keys
+        self.index = index
+        self.nodes = len(keys)
+        # NODE_TYPES index of every node
+        self.types = types
+        self.src, self.dst, self.kinds, self.cents, self.counts = src, dst, kinds, cents, counts
+        self.revision = revision
+        self.out_offsets, self.out_edges = csr(src, self.nodes)
+        self.in_offsets, self.in_edges = csr(dst, self.nodes)
+        self.out_targets = dst[self.out_edges]
+        self.in_sources = src[self.in_edges]
+
+    @classmethod
+    def empty(cls):
+        return cls([], {}, *[np.zeros(0, dtype=np.int64) for _ in range(6)], 0)
+
+    @property
+    def edges(self):
+        return len(self.src)
+
+    def node_id(self, key):
+        i = self.index.get(key)
+        return i if i is not None and i < self.nodes else None
+
+    def degree(self, i):
+        return int(self.out_offsets[i + 1] - self.out_offsets[i] + self.in_offsets[i + 1] - self.in_offsets[i])
+
+    def changed(self, rows, revision):
+        '''A new graph with rows of (source, target, kind, amount, contributions, active) applied'''
+        keys, index = self.keys, self.index
+
+        def node_id(key):
+            i = index.get(key)
+            if i is None:
+                i = index[key] = len(keys)
+                keys.append(key)
+            return i
+
+        columns = ([], [], [], [], [], [])
+        for source, target, kind, amount, contributions, active in rows:
+            for column, value in zip(columns, (node_id(source), node_id(target), KINDS.index(kind), int(amount * 100), contributions, active)):
+                column.append(value)
+        types = np.concatenate([self.types, np.array([NODE_TYPES.index(key.partition(":")[0]) for key in keys[self.nodes:]], dtype=np.int64)])
+        if not columns[0]:
+            return Graph(keys, index, types, self.src, self.dst, self.kinds, self.cents, self.counts, revision)
+        src, dst, kinds, cents, counts = (
+            np.concatenate([old, np.array(new, dtype=np.int64)])
+            for old, new in zip((self.src, self.dst, self.kinds, self.cents, self.counts), columns)
+        )
+        active = np.concatenate([np.ones(self.edges, dtype=bool), np.array(columns[5], dtype=bool)])
+        # the last version of every (source, target, kind) wins, then removed edges are dropped
+        edge_keys = (src * len(keys) + dst) * len(KINDS) + kinds
+        _, last = np.unique(edge_keys[::-1], return_index=True)
+        keep = np.sort(len(edge_keys) - 1 - last)
+        keep = keep[active[keep]]
+        return Graph(keys, index, types, src[keep], dst[keep], kinds[keep], cents[keep], counts[keep], revision)
+
+    # Traversals. All of them work on sorted id arrays sized by what they reach, never by the graph.
+
+    def expand(self, frontier, direction, budget):
+        '''(heads, far ends, edge ids) of the frontier's edges, out, in or both ways'''
+        parts = []
+        if direction in ("out", "both"):
+            heads, found = slots(self.out_offsets, frontier, budget)
+            parts.append((heads, self.out_targets[found], self.out_edges[found]))
+            budget -= len(found)
+        if direction in ("in", "both"):
+            heads, found = slots(self.in_offsets, frontier, budget)
+            parts.append((heads, self.in_sources[found], self.in_edges[found]))
+        if len(parts) == 1:
+            return parts[0]
+        return tuple(np.concatenate(column) for column in zip(*parts))
+
+    def neighborhood(self, origin, hops, max_nodes, budget):
+        '''([(node, hops)], [edge ids between them], truncated) within hops of origin, either direction'''
+        layers = [np.array([origin], dtype=np.int64)]
+        visited = layers[0]
+        truncated = False
+        for _ in range(hops):
+            try:
+                _, far, _ = self.expand(layers[-1], "both", budget)
+            except GraphTooLarge:
+                truncated = True
+                break
+            new = np.setdiff1d(far, visited)
+            if len(new) > max_nodes - len(visited):
+                new = new[:max_nodes - len(visited)]
+                truncated = True
+            if not len(new):
+                break
+            layers.append(new)
+            visited = np.union1d(visited, new)
+            if truncated:
+                break
+        heads, far, edges = self.expand(visited, "out", np.inf)
+        nodes = [(i, hop) for hop, layer in enumerate(layers) for i in layer.tolist()]
+        return nodes, edges[np.isin(far, visited)].tolist(), truncated
+
+    def shortest_path(self, source, target, max_hops, budget):
+        '''Node ids of a shortest path either way along edges, None if there's none within max_hops
+
+        Breadth first from both ends, always growing the smaller frontier, so hubs are only
+        expanded when there is no way around them.
+        '''
+        if source == target:
+            return [source]
+        sides = [
+            {"layers": [np.array([origin], dtype=np.int64)], "parents": [np.array([-1], dtype=np.int64)], "visited": np.array([origin], dtype=np.int64)}
+            for origin in (source, target)
+        ]
+        for _ in range(max_hops):
+            grow = 0 if len(sides[0]["layers"][-1]) <= len(sides[1]["layers"][-1]) else 1
+            side, other = sides[grow], sides[1 - grow]
+            heads, far, _ = self.expand(side["layers"][-1], "both", budget)
+            fresh = ~np.isin(far, side["visited"])
+            new, first = np.unique(far[fresh], return_index=True)
+            if not len(new):
+                return None
+            side["layers"].append(new)
+            side["parents"].append(heads[fresh][first])
+            side["visited"] = np.union1d(side["visited"], new)
+            met = new[np.isin(new, other["visited"])]
+            if len(met):
+                # every meeting point is one hop deeper on this side, take the shallowest on the other
+                depth, meet = min((self._depth(other, i), i) for i in met.tolist())
+                path = self._trace(side, meet, len(side["layers"]) - 1)[::-1] + self._trace(other, meet, depth)[1:]
+                return path if grow == 0 else path[::-1]
+        return None
+
+    @staticmethod
+    def _depth(side, i):
+        return next(depth for depth, layer in enumerate(side["layers"]) if i in layer)
+
+    @staticmethod
+    def _trace(side, i, depth):
+        '''[i, its parent, ..., the side's origin]'''
+        path = [i]
+        while depth > 0:
+            layer = side["layers"][depth]
+            i = int(side["parents"][depth][np.searchsorted(layer, i)])
+            path.append(i)
+            depth -= 1
+        return path
+
+    def edge_between(self, u, v):
+        '''(edge id, True if it points u -> v) of an edge joining two adjacent nodes'''
+        for head, tail, forward in ((u, v, True), (v, u, False)):
+            start, end = self.out_offsets[head], self.out_offsets[head + 1]
+            found = np.flatnonzero(self.out_targets[start:end] == tail)
+            if len(found):
+                return int(self.out_edges[start + found[0]]), forward
+        return None, None
+
+    def connected_money(self, origin, hops, direction, budget):
+        '''(node ids, cents, hops, total cents) of the money connected to origin within hops
+
+        "in" follows edges backwards from origin: a bill's sponsor, their candidate, that
+        candidate's committees and those committees' donors. Each node is credited with the money
+        that reaches origin through it, donors with what they gave. "out" follows them forwards,
+        carrying a donor's money through committees and candidates on to the bills they sponsor.
+        Only edges from one hop's nodes to the next count, so every path is walked once.
+        '''
+        layers = [np.array([origin], dtype=np.int64)]
+        visited = layers[0]
+        steps = []
+        for _ in range(hops):
+            heads, far, edges = self.expand(layers[-1], direction, budget)
+            new = np.setdiff1d(far, visited)
+            if not len(new):
+                break
+            forward = np.isin(far, new)
+            steps.append((heads[forward], far[forward], edges[forward]))
+            layers.append(new)
+            visited = np.union1d(visited, new)
+        amounts = [np.zeros(len(layer)) for layer in layers]
+        order = range(len(steps)) if direction == "out" else reversed(range(len(steps)))
+        for hop in order:
+            heads, far, edges = steps[hop]
+            money = self.kinds[edges] == CONTRIBUTION
+            at_head = np.searchsorted(layers[hop], heads)
+            at_far = np.searchsorted(layers[hop + 1], far)
+            if direction == "out":
+                # a contribution starts a flow, any other edge passes on what reached its head
+                flow = np.where(money, self.cents[edges], amounts[hop][at_head])
+                amounts[hop + 1] += np.bincount(at_far, weights=flow, minlength=len(layers[hop + 1]))
+            else:
+                flow = np.where(money, self.cents[edges], amounts[hop + 1][at_far])
+                amounts[hop] += np.bincount(at_head, weights=flow, minlength=len(layers[hop]))
+                # donors are credited with what they gave
+                amounts[hop + 1] += np.bincount(at_far[money], weights=self.cents[edges][money], minlength=len(layers[hop + 1]))
+        if direction == "in":
+            total = int(round(amounts[0][0]))
+        else:
+            total = sum(int(self.cents[edges][self.kinds[edges] == CONTRIBUTION].sum()) for _, _, edges in steps)
+        nodes = np.concatenate(layers[1:]) if steps else np.zeros(0, dtype=np.int64)
+        cents = np.rint(np.concatenate(amounts[1:])).astype(np.int64) if steps else np.zeros(0, dtype=np.int64)
+        hops = np.repeat(np.arange(1, len(layers)), [len(layer) for layer in layers[1:]])
+        credited = cents != 0
+        return nodes[credited], cents[credited], hops[credited], total
+
+
+def load(revision):
+    '''The whole graph as of revision'''
+    rows = (
+        GraphEdge.objects.filter(active=True, revision__lte=revision)
+        .values_list("source", "target", "kind", "amount", "contributions", "active")
+        .iterator(chunk_size=10000)
+    )
+    return Graph.empty().changed(rows, revision)
+
+
+_graph = None
+_checked = 0.0
+_lock = threading.Lock()
+
+
+def current_graph():
+    '''This process's graph, caught up with the edges table at most every GRAPH_REFRESH_INTERVAL seconds
+
+    Catching up reads only the edges written since the revision held, and rebuilds the CSR
+    arrays from the old ones in memory.
+    '''
+    global _graph, _checked
+    if np is None:
+        raise ImproperlyConfigured("the relationship graph needs numpy")
+    interval = getattr(settings, "GRAPH_REFRESH_INTERVAL", 5)
+    if _graph is not None and time.monotonic() - _checked < interval:
+        return _graph
+    with _lock:
+        if _graph is not None and time.monotonic() - _checked < interval:
+            return _graph
+        revision, base = GraphState.objects.filter(pk=1).values_list("revision", "base_revision").first() or (0, 0)
+        if _graph is None or _graph.revision < base or _graph.revision > revision:
+            _graph = load(revision)
+        elif _graph.revision < revision:
+            rows = (
+                GraphEdge.objects.filter(revision__gt=_graph.revision, revision__lte=revision)
+                .values_list("source", "target", "kind", "amount", "contributions", "active")
+            )
+            _graph = _graph.changed(rows.iterator(chunk_size=10000), revision)
+        _checked = time.monotonic()
+    return _graph
+
+
+def forget_graph():
+    global _graph
+    with _lock:
+        _graph = None
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from graph_app.edges import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute every relationship graph edge from the federal tables, e.g. after a bulk load"
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"rebuilt {rebuild()} edges")
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.3 on 2026-10-17 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GraphState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('revision', models.PositiveBigIntegerField(default=0)),
+                ('base_revision', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GraphEdge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=250)),
+                ('target', models.CharField(max_length=250)),
+                ('kind', models.CharField(max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('contributions', models.PositiveBigIntegerField(default=0)),
+                ('active', models.BooleanField(default=True)),
+                ('revision', models.PositiveBigIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['revision'], name='graph_app_g_revisio_1076c7_idx'), models.Index(fields=['kind', 'target'], name='graph_app_g_kind_44ed13_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='graphedge',
+            constraint=models.UniqueConstraint(fields=('source', 'target', 'kind'), name='graph_edge'),
+        ),
+    ]
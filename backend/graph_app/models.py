@@ -0,0 +1,32 @@
+from django.db import models
+
+# Create your models here.
+# Edges of the relationship graph between federal_app rows, kept current by edges.refresh_edges.
+# Nodes are "<type>:<id>" strings (see edges.NODE_TYPES), edges point the way money and support flow.
+
+class GraphEdge(models.Model):
+    source = models.CharField(max_length=250)
+    target = models.CharField(max_length=250)
+    kind = models.CharField(max_length=20)
+    # contribution edges only: receipts from the donor to the committee
+    amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    contributions = models.PositiveBigIntegerField(default=0)
+    # edges are deactivated rather than deleted, so workers see removals in their next delta
+    active = models.BooleanField(default=True)
+    # GraphState.revision of the write that last changed the edge
+    revision = models.PositiveBigIntegerField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["source", "target", "kind"], name="graph_edge")]
+        indexes = [
+            # workers load the edges changed since the revision they hold
+            models.Index(fields=["revision"]),
+            models.Index(fields=["kind", "target"]),
+        ]
+
+
+class GraphState(models.Model):
+    '''Single row; locked by edge writers so revisions commit in order'''
+    revision = models.PositiveBigIntegerField(default=0)
+    # revision of the last full rebuild, workers holding anything older reload everything
+    base_revision = models.PositiveBigIntegerField(default=0)
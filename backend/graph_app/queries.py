@@ -0,0 +1,152 @@
+import hashlib
+import json
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import caches
+from federal_app.models import Bill, Candidate, Organization
+from .edges import KINDS, NODE_TYPES
+from .graph import current_graph, np
+
+RESULT_KEY = "graph:{}:{}:{}"
+
+
+class UnknownNode(Exception):
+    pass
+
+
+def _cache():
+    return caches[getattr(settings, "GRAPH_CACHE_ALIAS", "default")]
+
+
+def _budget():
+    return getattr(settings, "GRAPH_MAX_EDGES", 5000000)
+
+
+def money(cents):
+    return f"{Decimal(cents).scaleb(-2):.2f}"
+
+
+def node_names(keys):
+    '''key -> display name, one query per node type present'''
+    ids = {node_type: [] for node_type in NODE_TYPES}
+    for key in keys:
+        node_type, _, external_id = key.partition(":")
+        ids[node_type].append(external_id)
+    names = {}
+    if ids["candidate"]:
+        names.update((f"candidate:{key}", name) for key, name in Candidate.objects.filter(external_id__in=ids["candidate"]).values_list("external_id", "name"))
+    if ids["committee"]:
+        names.update((f"committee:{key}", name) for key, name in Organization.objects.filter(external_id__in=ids["committee"]).values_list("external_id", "name"))
+    if ids["bill"]:
+        names.update((f"bill:{key}", title) for key, title in Bill.objects.filter(external_id__in=ids["bill"]).values_list("external_id", "title"))
+    if ids["member"]:
+        names.update((f"member:{key}", name) for key, name in Bill.objects.filter(sponsor_id__in=ids["member"]).values_list("sponsor_id", "sponsor_name").distinct())
+    for external_id in ids["donor"]:
+        name, _, state = external_id.rpartition("|")
+        names[f"donor:{external_id}"] = f"{name} ({state})" if state else name
+    return names
+
+
+def describe(graph, nodes, names):
+    '''[(node id, extra fields)] -> response dicts'''
+    results = []
+    for i, extra in nodes:
+        key = graph.keys[i]
+        results.append({"id": key, "type": key.partition(":")[0], "name": names.get(key, ""), **extra})
+    return results
+
+
+def describe_edges(graph, edges):
+    results = []
+    for edge in edges:
+        kind = KINDS[graph.kinds[edge]]
+        described = {"source": graph.keys[graph.src[edge]], "target": graph.keys[graph.dst[edge]], "kind": kind}
+        if kind == "contribution":
+            described.update(amount=money(int(graph.cents[edge])), contributions=int(graph.counts[edge]))
+        results.append(described)
+    return results
+
+
+def resolve(graph, key):
+    i = graph.node_id(key)
+    if i is None:
+        raise UnknownNode(f"No graph node {key}.")
+    return i
+
+
+def cached(graph, query, params, nodes, build):
+    '''Results for hot nodes are kept per graph revision; the rest are cheaper to recompute than to fetch'''
+    if max(graph.degree(i) for i in nodes) < getattr(settings, "GRAPH_HOT_DEGREE", 200):
+        return build()
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    key = RESULT_KEY.format(graph.revision, query, digest)
+    cache = _cache()
+    result = cache.get(key)
+    if result is None:
+        result = build()
+        cache.set(key, result, getattr(settings, "GRAPH_CACHE_TIMEOUT", 300))
+    return result
+
+
+def neighborhood(key, hops):
+    '''Nodes within hops of key and the edges between them'''
+    graph = current_graph()
+    origin = resolve(graph, key)
+
+    def build():
+        max_nodes = getattr(settings, "GRAPH_MAX_NODES", 2000)
+        nodes, edges, truncated = graph.neighborhood(origin, hops, max_nodes, _budget())
+        names = node_names(graph.keys[i] for i, _ in nodes)
+        return {
+            "node": key,
+            "hops": hops,
+            "truncated": truncated,
+            "nodes": describe(graph, [(i, {"hops": hop}) for i, hop in nodes], names),
+            "edges": describe_edges(graph, edges),
+        }
+
+    return cached(graph, "neighborhood", [key, hops], [origin], build)
+
+
+def shortest_path(source_key, target_key, max_hops):
+    graph = current_graph()
+    source, target = resolve(graph, source_key), resolve(graph, target_key)
+
+    def build():
+        path = graph.shortest_path(source, target, max_hops, _budget())
+        if path is None:
+            return {"source": source_key, "target": target_key, "path": None, "edges": []}
+        edges = [graph.edge_between(u, v)[0] for u, v in zip(path, path[1:])]
+        return {
+            "source": source_key,
+            "target": target_key,
+            "path": describe(graph, [(i, {}) for i in path], node_names(graph.keys[i] for i in path)),
+            "edges": describe_edges(graph, edges),
+        }
+
+    return cached(graph, "path", [source_key, target_key, max_hops], [source, target], build)
+
+
+def connected_money(key, hops, direction, node_type=None, limit=20):
+    '''Who funds key (direction "in") or what key's money reaches ("out"), largest amounts first'''
+    graph = current_graph()
+    origin = resolve(graph, key)
+
+    def build():
+        nodes, cents, depths, total = graph.connected_money(origin, hops, direction, _budget())
+        if node_type is not None:
+            wanted = graph.types[nodes] == NODE_TYPES.index(node_type)
+            nodes, cents, depths = nodes[wanted], cents[wanted], depths[wanted]
+        # rank in numpy, only the rows returned become python objects
+        top = np.lexsort((nodes, -cents))[:limit]
+        ranked = sorted(zip(nodes[top].tolist(), cents[top].tolist(), depths[top].tolist()), key=lambda item: (-item[1], graph.keys[item[0]]))
+        names = node_names(graph.keys[i] for i, _, _ in ranked)
+        return {
+            "node": key,
+            "direction": direction,
+            "hops": hops,
+            "total": money(total),
+            "results": describe(graph, [(i, {"hops": hop, "amount": money(amount)}) for i, amount, hop in ranked], names),
+        }
+
+    return cached(graph, "money", [key, hops, direction, node_type, limit], [origin], build)
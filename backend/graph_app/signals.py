@@ -0,0 +1,10 @@
+from django.dispatch import receiver
+from federal_app.signals import records_ingested
+from .edges import refresh_edges
+
+
+@receiver(records_ingested)
+def refresh_ingested_edges(sender, model, external_ids, **kwargs):
+    # only the edges of this page's records are recomputed; serving processes pick the
+    # changed rows up as a delta on their next refresh
+    refresh_edges(model, external_ids)
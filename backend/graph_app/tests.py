@@ -0,0 +1,99 @@
+import io
+from pathlib import Path
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from federal_app.ingestion import SOURCES, default_transports, sync
+from .graph import current_graph, forget_graph
+from .models import GraphEdge
+
+CASSETTE = Path(__file__).resolve().parent.parent / "federal_app" / "test_data" / "cassette.json"
+
+
+# Create your tests here.
+@override_settings(GRAPH_REFRESH_INTERVAL=0)
+class GraphTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        forget_graph()
+        self.transports = default_transports(CASSETTE)
+
+    def sync(self, *names):
+        for name in names:
+            source = SOURCES[name]
+            sync(source, self.transports[source.api])
+
+    def money(self, node, **params):
+        return self.client.get("/api/v1/graph/money/", {"node": node, **params}).json()
+
+    def edges(self):
+        graph = current_graph()
+        return {
+            (graph.keys[src], graph.keys[dst], kind, cents)
+            for src, dst, kind, cents in zip(graph.src.tolist(), graph.dst.tolist(), graph.kinds.tolist(), graph.cents.tolist())
+        }
+
+    def test_connected_money_follows_ingests(self):
+        self.sync("fec_candidates", "fec_committees", "congress_bills", "fec_contributions")
+        body = self.money("bill:118-hr-101", type="donor")
+        self.assertEqual(body["total"], "3050.00")
+        self.assertEqual([(row["id"], row["amount"], row["hops"]) for row in body["results"]], [
+            ("donor:LEE, ANN|NY", "2800.00", 4),
+            ("donor:SMITH, JOHN|CA", "250.00", 4),
+        ])
+        self.assertEqual(body["results"][0]["name"], "LEE, ANN (NY)")
+        # the incremental run raises 4000005 to 150.00 and adds 4000006, seen as a delta
+        revision = current_graph().revision
+        self.sync("fec_contributions")
+        self.assertGreater(current_graph().revision, revision)
+        self.assertEqual(self.money("bill:118-hr-103")["total"], "150.00")
+        body = self.money("donor:SMITH, JOHN|CA", direction="out", type="bill")
+        self.assertEqual(body["total"], "900.00")
+        self.assertEqual({row["id"]: row["amount"] for row in body["results"]}, {
+            "bill:118-hr-102": "500.00", "bill:118-hr-101": "250.00", "bill:118-hr-103": "150.00",
+        })
+
+    def test_incremental_edges_match_a_rebuild(self):
+        # bills before candidates, so the member links are only made once the candidates arrive
+        self.sync("congress_bills", "fec_contributions", "fec_committees", "fec_candidates", "fec_contributions", "congress_bills")
+        incremental = self.edges()
+        self.assertIn(("candidate:H4CA00001", "member:D000001", 2, 0), incremental)
+        call_command("rebuild_graph", stdout=io.StringIO())
+        self.assertEqual(self.edges(), incremental)
+        self.assertEqual(GraphEdge.objects.filter(active=True).count(), len(incremental))
+
+    def test_path_and_neighborhood(self):
+        self.sync("fec_candidates", "fec_committees", "congress_bills", "fec_contributions")
+        body = self.client.get("/api/v1/graph/path/", {"source": "bill:118-hr-101", "target": "donor:SMITH, JOHN|CA"}).json()
+        self.assertEqual([node["id"] for node in body["path"]], [
+            "bill:118-hr-101", "member:D000001", "candidate:H4CA00001", "committee:C00000001", "donor:SMITH, JOHN|CA",
+        ])
+        self.assertEqual(body["path"][2]["name"], "DOE, JANE 1")
+        self.assertEqual(body["edges"][-1], {
+            "source": "donor:SMITH, JOHN|CA", "target": "committee:C00000001", "kind": "contribution", "amount": "250.00", "contributions": 1,
+        })
+        body = self.client.get("/api/v1/graph/path/", {"source": "bill:118-hr-101", "target": "committee:C00009999"}).json()
+        self.assertIsNone(body["path"])
+
+        body = self.client.get("/api/v1/graph/neighborhood/", {"node": "committee:C00000001"}).json()
+        self.assertEqual(sorted((node["id"], node["hops"]) for node in body["nodes"]), [
+            ("candidate:H4CA00001", 1), ("committee:C00000001", 0), ("donor:LEE, ANN|NY", 1), ("donor:SMITH, JOHN|CA", 1),
+        ])
+        self.assertEqual(len(body["edges"]), 3)
+        with self.settings(GRAPH_MAX_NODES=2):
+            self.assertTrue(self.client.get("/api/v1/graph/neighborhood/", {"node": "committee:C00000001"}).json()["truncated"])
+
+    def test_hot_node_results_are_cached(self):
+        self.sync("fec_committees", "fec_contributions")
+        with self.settings(GRAPH_HOT_DEGREE=3, GRAPH_REFRESH_INTERVAL=60):
+            self.money("committee:C00000001")
+            with self.assertNumQueries(0):
+                self.money("committee:C00000001")
+
+    def test_bad_queries(self):
+        self.sync("fec_committees", "fec_contributions")
+        self.assertEqual(self.client.get("/api/v1/graph/money/", {"node": "candidate:nobody"}).status_code, 404)
+        self.assertEqual(self.client.get("/api/v1/graph/money/").status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/graph/neighborhood/", {"node": "committee:C00000001", "hops": 9}).status_code, 400)
+        with self.settings(GRAPH_MAX_EDGES=0):
+            self.assertEqual(self.client.get("/api/v1/graph/money/", {"node": "committee:C00000001"}).status_code, 400)
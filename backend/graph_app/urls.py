@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import ConnectedMoney, Neighborhood, ShortestPath
+
+# traversals of the candidate / committee / donor / bill graph
+urlpatterns = [
+    path("neighborhood/", Neighborhood.as_view(), name="graph_neighborhood"),
+    path("path/", ShortestPath.as_view(), name="graph_path"),
+    path("money/", ConnectedMoney.as_view(), name="graph_money"),
+]
@@ -0,0 +1,103 @@
+from django.http import HttpResponse
+from rest_framework.response import Response
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
+from rest_framework.views import APIView
+from core_app.docs import openapi, swagger_auto_schema
+from core_app.params import InvalidQuery, int_param, limit_param
+from core_app.renderers import dumps
+from .edges import NODE_TYPES
+from .graph import GraphTooLarge
+from .queries import UnknownNode, connected_money, neighborhood, shortest_path
+
+MAX_HOPS = {"neighborhood": 3, "path": 8, "money": 5}
+MAX_LIMIT = 100
+NODE_DESCRIPTION = "candidate:<FEC id>, committee:<FEC id>, bill:<congress>-<type>-<number>, member:<bioguide id> or donor:<NAME>|<state>"
+
+
+def node_param(params, name):
+    value = params.get(name)
+    if not value:
+        raise InvalidQuery(f"{name} is required, e.g. {NODE_DESCRIPTION}.")
+    return value
+
+
+def json_response(build, params):
+    try:
+        result = build(params)
+    except (InvalidQuery, GraphTooLarge) as e:
+        return Response(str(e), status=HTTP_400_BAD_REQUEST)
+    except UnknownNode as e:
+        return Response(str(e), status=HTTP_404_NOT_FOUND)
+    return HttpResponse(dumps(result), content_type="application/json", status=HTTP_200_OK)
+
+
+# Create your views here.
+class Neighborhood(APIView):
+    '''Everything within a few hops of a node, in either direction'''
+    @swagger_auto_schema(
+        operation_summary="Neighborhood of a graph node",
+        operation_description=f"Nodes within hops of node ({NODE_DESCRIPTION}) and the edges between them. Large neighborhoods are cut off and marked truncated.",
+        manual_parameters=[
+            openapi.Parameter("node", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter("hops", openapi.IN_QUERY, type=openapi.TYPE_INTEGER, maximum=MAX_HOPS["neighborhood"]),
+        ],
+        responses={200: "{node, hops, truncated, nodes: [{id, type, name, hops}], edges: [{source, target, kind, amount?, contributions?}]}"},
+    )
+    def get(self, request):
+        return json_response(
+            lambda params: neighborhood(node_param(params, "node"), int_param(params, "hops", 1, MAX_HOPS["neighborhood"])),
+            request.query_params,
+        )
+
+
+class ShortestPath(APIView):
+    '''How two nodes are connected, fewest hops first'''
+    @swagger_auto_schema(
+        operation_summary="Shortest path between two graph nodes",
+        operation_description="A shortest chain of edges, followed either way, joining source to target; path is null when none is within max_hops.",
+        manual_parameters=[
+            openapi.Parameter("source", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter("target", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter("max_hops", openapi.IN_QUERY, type=openapi.TYPE_INTEGER, maximum=MAX_HOPS["path"]),
+        ],
+        responses={200: "{source, target, path: [{id, type, name}] | null, edges: [{source, target, kind, amount?, contributions?}]}"},
+    )
+    def get(self, request):
+        return json_response(
+            lambda params: shortest_path(node_param(params, "source"), node_param(params, "target"), int_param(params, "max_hops", 6, MAX_HOPS["path"])),
+            request.query_params,
+        )
+
+
+class ConnectedMoney(APIView):
+    '''Who funds a node, or where a node's money goes'''
+    @swagger_auto_schema(
+        operation_summary="Money connected to a graph node",
+        operation_description=(
+            "direction=in follows money and support backwards, e.g. from a bill to its sponsor, their candidate committees "
+            "and those committees' donors; direction=out follows a donor's money forwards. Results are the nodes it passes "
+            "through with the amount that flows through each, largest first."
+        ),
+        manual_parameters=[
+            openapi.Parameter("node", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter("direction", openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=["in", "out"]),
+            openapi.Parameter("hops", openapi.IN_QUERY, type=openapi.TYPE_INTEGER, maximum=MAX_HOPS["money"]),
+            openapi.Parameter("type", openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(NODE_TYPES)),
+            openapi.Parameter("limit", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: "{node, direction, hops, total, results: [{id, type, name, hops, amount}]}"},
+    )
+    def get(self, request):
+        def build(params):
+            direction = params.get("direction", "in")
+            if direction not in ("in", "out"):
+                raise InvalidQuery("direction must be in or out.")
+            node_type = params.get("type") or None
+            if node_type is not None and node_type not in NODE_TYPES:
+                raise InvalidQuery(f"type must be one of {', '.join(NODE_TYPES)}.")
+            return connected_money(
+                node_param(params, "node"), int_param(params, "hops", 4, MAX_HOPS["money"]), direction,
+                node_type, limit_param(params, 20, MAX_LIMIT),
+            )
+
+        return json_response(build, request.query_params)
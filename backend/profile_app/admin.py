@@ -1,5 +1,13 @@
 from django.contrib import admin
 from .models import Profile
+from .loaders import profile_queryset
 
 # Register your models here.
-admin.site.register([Profile])
\ No newline at end of file
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = ["id", "user", "display_name"]
+
+    def get_queryset(self, request):
+        # avoid a user and affiliation query per row
+        return profile_queryset()
+
+admin.site.register(Profile, ProfileAdmin)
@@ -0,0 +1,60 @@
+from django.db import transaction
+from affiliation_app.cache import get_catalog
+from .models import Profile
+
+ProfileAffiliation = Profile.affiliations.through
+
+
+class InvalidAffiliations(Exception):
+    def __init__(self, ids):
+        self.ids = ids
+        super().__init__(f"Invalid affiliation ids: {ids}")
+
+
+def clean_affiliation_ids(ids):
+    '''Check ids against the cached catalog and return them deduplicated'''
+    catalog = get_catalog()["by_id"]
+    cleaned, invalid = [], []
+    for value in ids:
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            invalid.append(value)
+            continue
+        if value not in catalog:
+            invalid.append(value)
+        elif value not in cleaned:
+            cleaned.append(value)
+    if invalid:
+        raise InvalidAffiliations(invalid)
+    return cleaned
+
+
+def current_affiliation_ids(profile):
+    # uses the prefetch from load_profile when it's there
+    return {affiliation.id for affiliation in profile.affiliations.all()}
+
+
+def sync_affiliations(profile, ids):
+    '''Replace the profile's affiliations with ids using one bulk delete and one bulk insert
+
+    Returns the serialized affiliations the profile now has, read from the catalog.
+    '''
+    ids = clean_affiliation_ids(ids)
+    current = current_affiliation_ids(profile)
+    wanted = set(ids)
+    to_remove = current - wanted
+    to_add = wanted - current
+    # joins the caller's transaction without an extra savepoint
+    with transaction.atomic(savepoint=False):
+        if to_remove:
+            ProfileAffiliation.objects.filter(profile_id=profile.id, affiliation_id__in=to_remove).delete()
+        if to_add:
+            ProfileAffiliation.objects.bulk_create(
+                [ProfileAffiliation(profile_id=profile.id, affiliation_id=affiliation_id) for affiliation_id in sorted(to_add)],
+                ignore_conflicts=True,
+            )
+    # anything prefetched for this profile is stale now
+    getattr(profile, "_prefetched_objects_cache", {}).pop("affiliations", None)
+    catalog = get_catalog()["by_id"]
+    return [catalog[affiliation_id] for affiliation_id in sorted(wanted)]
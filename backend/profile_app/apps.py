@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ProfileAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'profile_app'
+
+
+    def ready(self):
+        # connect bootstrap document builds on login and the watchlist change feed
+        from . import signals
@@ -0,0 +1,21 @@
+from rest_framework.exceptions import NotFound
+from user_app.async_views import AsyncTokenReq, api_error, json_response
+from .loaders import aload_display_name, aload_profile_row
+
+# Async versions of CurrentUserProfile and DisplayName, same bodies byte for byte
+
+
+class AsyncCurrentUserProfile(AsyncTokenReq):
+    async def get(self, request):
+        user_profile = await aload_profile_row(request.user)
+        if user_profile is None:
+            return api_error(NotFound("No Profile matches the given query."))
+        return json_response(user_profile)
+
+
+class AsyncDisplayName(AsyncTokenReq):
+    async def get(self, request):
+        display_name = await aload_display_name(request.user)
+        if display_name is None:
+            return api_error(NotFound("No Profile matches the given query."))
+        return json_response(display_name)
@@ -0,0 +1,74 @@
+import uuid
+from django.conf import settings
+from affiliation_app.cache import (
+    delete_many_alongside, get_catalog, get_many_with_version, set_alongside, set_many_alongside,
+)
+from core_app.renderers import dumps
+from .loaders import profile_rows
+from .models import Profile
+
+BOOTSTRAP_KEY = "bootstrap:user:{}"
+GENERATION_KEY = "bootstrap:user:{}:generation"
+
+
+def bootstrap_key(user_pk):
+    return BOOTSTRAP_KEY.format(user_pk)
+
+
+def generation_key(user_pk):
+    return GENERATION_KEY.format(user_pk)
+
+
+def bootstrap_state(user_pk):
+    '''(catalog version, user generation, stored document) in one cache round trip'''
+    version, values = get_many_with_version([bootstrap_key(user_pk), generation_key(user_pk)])
+    return version, values.get(generation_key(user_pk)), values.get(bootstrap_key(user_pk))
+
+
+def build_bootstrap(user, version=None, generation=None):
+    '''Render the user's part of the bootstrap document and store it next to the catalog version
+
+    The user part embeds affiliation categories, so it is tagged with the catalog version it was
+    built against and rebuilt when the catalog moves on. It is also tagged with the user's
+    generation as read before the build: a build that raced an invalidation stores a document
+    get_bootstrap won't serve, instead of one that is stale until it expires.
+    '''
+    if version is None:
+        version, generation, _ = bootstrap_state(user.pk)
+    rows = profile_rows(Profile.objects.filter(user_id=user.pk))
+    profile = rows[0] if rows else None
+    # same bodies as Info, CurrentUserProfile and DisplayName, minus the affiliation catalog
+    part = dumps({
+        "user": user.email,
+        "profile": profile,
+        "display_name": {"display_name": profile["display_name"]} if profile else None,
+    })
+    document = {"version": version, "generation": generation, "part": part}
+    set_alongside(bootstrap_key(user.pk), document, getattr(settings, "BOOTSTRAP_CACHE_TIMEOUT", 3600))
+    return document
+
+
+def get_bootstrap(user):
+    '''The whole bootstrap body; warm, this is one cache read and no queries'''
+    version, generation, document = bootstrap_state(user.pk)
+    if document is None or document["version"] != version or document["generation"] != generation:
+        document = build_bootstrap(user, version, generation)
+    catalog = get_catalog(version)
+    # splice the shared catalog body into the per-user document instead of storing it per user
+    return document["part"][:-1] + b',"affiliations":' + catalog["body"] + b"}"
+
+
+def invalidate_bootstrap(user_pk):
+    invalidate_bootstraps([user_pk])
+
+
+def invalidate_bootstraps(user_pks):
+    '''Drop the users' documents and move them to a fresh generation, in two cache calls
+
+    Also for writes that skip model signals. The generation outlives any document stored by a
+    build that started before it moved on.
+    '''
+    user_pks = list(user_pks)
+    timeout = getattr(settings, "BOOTSTRAP_CACHE_TIMEOUT", 3600)
+    set_many_alongside({generation_key(user_pk): uuid.uuid4().hex for user_pk in user_pks}, timeout * 2)
+    delete_many_alongside([bootstrap_key(user_pk) for user_pk in user_pks])
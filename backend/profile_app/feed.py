@@ -0,0 +1,160 @@
+from django.conf import settings
+from django.db.models import Count, Exists, Max, OuterRef, Q
+from federal_app.models import Bill, Candidate
+from .models import Change, FeedEntry, Profile, WatchedState
+
+# followable entity type -> (model, Profile watchlist field, fields a change is reported for, name field)
+WATCHED = {
+    "candidate": (Candidate, "followed_candidates", ("name", "party", "office", "state", "district", "election_years"), "name"),
+    "bill": (Bill, "followed_bills", ("title", "sponsor_name", "latest_action", "latest_action_date"), "title"),
+}
+TYPES_BY_MODEL = {model: entity_type for entity_type, (model, *_) in WATCHED.items()}
+
+
+def _links(entity_type):
+    '''The watchlist's through table and its column for the entity'''
+    _, field, _, _ = WATCHED[entity_type]
+    return getattr(Profile, field).through, entity_type
+
+
+def watched_data(entity_type, rows):
+    '''{external id: reported fields as JSON values} for rows of .values("external_id", *fields)'''
+    fields = WATCHED[entity_type][2]
+    return {
+        row["external_id"]: {name: row[name].isoformat() if hasattr(row[name], "isoformat") else row[name] for name in fields}
+        for row in rows
+    }
+
+
+def baseline(entity_type, external_ids):
+    '''Remember the current fields of newly followed entities, so the next ingest can tell what changed
+
+    Overwrites whatever was stored: it may date from before the entity was last unfollowed.
+    '''
+    model, _, fields, _ = WATCHED[entity_type]
+    data = watched_data(entity_type, model.objects.filter(external_id__in=external_ids).values("external_id", *fields))
+    WatchedState.objects.bulk_create(
+        [WatchedState(entity_type=entity_type, entity_id=entity_id, data=values) for entity_id, values in data.items()],
+        update_conflicts=True,
+        unique_fields=["entity_type", "entity_id"],
+        update_fields=["data"],
+    )
+
+
+def follow(profile, entity_type, pk, entity_id):
+    '''Add an entity to the watchlist; its feed starts with the changes logged from now on'''
+    since = Change.objects.aggregate(newest=Max("id"))["newest"] or 0
+    getattr(profile, WATCHED[entity_type][1]).add(pk, through_defaults={"since": since})
+    baseline(entity_type, [entity_id])
+
+
+def follower_counts(entity_type, external_ids):
+    through, column = _links(entity_type)
+    rows = through.objects.filter(**{f"{column}__external_id__in": external_ids}).values(f"{column}__external_id").annotate(followers=Count("id"))
+    return {row[f"{column}__external_id"]: row["followers"] for row in rows}
+
+
+def record_changes(model, external_ids):
+    '''Log what an ingested page changed about followed entities; returns the changes to fan out on write
+
+    Only followed entities are compared, against the fields seen at the last ingest or follow.
+    '''
+    entity_type = TYPES_BY_MODEL.get(model)
+    if entity_type is None:
+        return []
+    followers = follower_counts(entity_type, external_ids)
+    if not followers:
+        return []
+    _, _, fields, name_field = WATCHED[entity_type]
+    current = watched_data(entity_type, model.objects.filter(external_id__in=followers).values("external_id", *fields))
+    seen = dict(WatchedState.objects.filter(entity_type=entity_type, entity_id__in=current).values_list("entity_id", "data"))
+    limit = getattr(settings, "FEED_FANOUT_MAX_FOLLOWERS", 1000)
+    changes = []
+    for entity_id, data in current.items():
+        before = seen.get(entity_id)
+        if before is None or before == data:
+            continue
+        changed = {name: [before.get(name), value] for name, value in data.items() if before.get(name) != value}
+        changes.append(Change(
+            entity_type=entity_type, entity_id=entity_id, data={"name": data[name_field], "changed": changed},
+            fan_out_on_read=followers[entity_id] >= limit,
+        ))
+    WatchedState.objects.bulk_create(
+        [WatchedState(entity_type=entity_type, entity_id=entity_id, data=data) for entity_id, data in current.items()],
+        update_conflicts=True,
+        unique_fields=["entity_type", "entity_id"],
+        update_fields=["data"],
+    )
+    Change.objects.bulk_create(changes)
+    return [change for change in changes if not change.fan_out_on_read]
+
+
+def fan_out(change_ids, batch_size=1000):
+    '''Copy changes into their followers' feeds, one followers query per entity type'''
+    changes = list(Change.objects.filter(id__in=change_ids, fan_out_on_read=False).values_list("id", "entity_type", "entity_id"))
+    written = 0
+    for entity_type in WATCHED:
+        by_entity = {}
+        for change_id, change_type, entity_id in changes:
+            if change_type == entity_type:
+                by_entity.setdefault(entity_id, []).append(change_id)
+        if not by_entity:
+            continue
+        through, column = _links(entity_type)
+        follows = through.objects.filter(**{f"{column}__external_id__in": by_entity}).values_list("profile_id", f"{column}__external_id", "since")
+        # a follow made after the change was logged doesn't get it
+        entries = [
+            FeedEntry(profile_id=profile_id, change_id=change_id)
+            for profile_id, entity_id, since in follows
+            for change_id in by_entity[entity_id]
+            if change_id > since
+        ]
+        FeedEntry.objects.bulk_create(entries, ignore_conflicts=True, batch_size=batch_size)
+        written += len(entries)
+    return written
+
+
+FEED_FIELDS = ("id", "entity_type", "entity_id", "data", "created_at")
+
+
+def feed_item(values):
+    change_id, entity_type, entity_id, data, created_at = values
+    return {"id": change_id, "type": entity_type, "entity": entity_id, **data, "created_at": created_at}
+
+
+def feed_page(user, before=None, limit=20):
+    '''(items, more) newest first: the user's fanned out entries merged with heavy followees' changes
+
+    Two queries however many entities are followed, each reading at most limit + 1 rows.
+    '''
+    entries = FeedEntry.objects.filter(profile__user_id=user.pk)
+    if before is not None:
+        entries = entries.filter(change_id__lt=before)
+    pushed = list(entries.order_by("-change_id").values_list(*(f"change__{name}" for name in FEED_FIELDS))[:limit + 1])
+    followed = Q()
+    for entity_type, (model, _, _, _) in WATCHED.items():
+        through, column = _links(entity_type)
+        # only changes logged after this user followed the entity
+        since = through.objects.filter(profile__user_id=user.pk, **{f"{column}__external_id": OuterRef("entity_id")}, since__lt=OuterRef("id"))
+        followed |= Q(
+            Exists(since),
+            entity_type=entity_type,
+            entity_id__in=model.objects.filter(followers__user_id=user.pk).values("external_id"),
+        )
+    pulled = Change.objects.filter(followed, fan_out_on_read=True)
+    if before is not None:
+        pulled = pulled.filter(id__lt=before)
+    pulled = list(pulled.order_by("-id").values_list(*FEED_FIELDS)[:limit + 1])
+    merged = sorted(pushed + pulled, key=lambda row: -row[0])
+    return [feed_item(row) for row in merged[:limit]], len(merged) > limit
+
+
+def unfollowed(user, entity_type, entity_id):
+    '''Drop an entity's entries from a feed once the user stops following it
+
+    The entity's last seen fields go too when nobody follows it any more, so a later
+    follow starts from a fresh baseline.
+    '''
+    FeedEntry.objects.filter(profile__user_id=user.pk, change__entity_type=entity_type, change__entity_id=entity_id).delete()
+    if not follower_counts(entity_type, [entity_id]):
+        WatchedState.objects.filter(entity_type=entity_type, entity_id=entity_id).delete()
@@ -0,0 +1,98 @@
+from django.db.models import Prefetch
+from django.http import Http404
+from affiliation_app.models import Affiliation
+from affiliation_app.serializers import AffiliationSerializer
+from core_app.fastpath import avalues_row, values_fields, values_row
+from .models import Profile
+from .serializers import DisplayNameSerializer, ProfileSerializer
+
+# ProfileSerializer fields that profile_rows fills in from the join table
+NESTED = ("affiliations",)
+
+
+def profile_queryset():
+    '''Profiles with everything ProfileSerializer reads: one query for profiles, one for all their affiliations'''
+    return Profile.objects.select_related("user").prefetch_related(
+        Prefetch("affiliations", queryset=Affiliation.objects.order_by("id"))
+    )
+
+
+def load_profile(user):
+    '''The user's profile in two queries, or 404'''
+    profile = profile_queryset().filter(user_id=user.pk).first()
+    if profile is None:
+        raise Http404("No Profile matches the given query.")
+    return profile
+
+
+def load_profiles(user_ids):
+    '''Profiles for many users in the same two queries, in user_ids order'''
+    profiles = {profile.user_id: profile for profile in profile_queryset().filter(user_id__in=user_ids)}
+    return [profiles[user_id] for user_id in user_ids if user_id in profiles]
+
+
+def load_display_name(user):
+    '''Just the display name column in one query as DisplayNameSerializer data, or 404'''
+    row = values_row(Profile.objects.filter(user_id=user.pk), DisplayNameSerializer)
+    if row is None:
+        raise Http404("No Profile matches the given query.")
+    return row
+
+
+def profile_queries(queryset):
+    '''The two .values() queries behind profile_rows: the profiles, then (profile id, *affiliation values)'''
+    profiles = queryset.values(*values_fields(ProfileSerializer, nested=NESTED))
+    # the nested affiliations come off the join table, in the same id order profile_queryset prefetches
+    links = Profile.affiliations.through.objects.filter(profile__in=queryset.values("id")).order_by("affiliation_id")
+    return profiles, links.values_list("profile_id", *(f"affiliation__{name}" for name in values_fields(AffiliationSerializer)))
+
+
+def nest_affiliations(profiles, links):
+    '''Attach each profile's affiliations, as AffiliationSerializer data, to its row'''
+    fields = values_fields(AffiliationSerializer)
+    by_id = {}
+    for row in profiles:
+        row["affiliations"] = []
+        by_id[row["id"]] = row
+    for profile_id, *values in links:
+        by_id[profile_id]["affiliations"].append(dict(zip(fields, values)))
+    return profiles
+
+
+def profile_rows(queryset):
+    '''ProfileSerializer output for queryset built from .values(): one query for profiles, one for their affiliations'''
+    profiles, links = profile_queries(queryset)
+    profiles = list(profiles)
+    if not profiles:
+        return profiles
+    return nest_affiliations(profiles, links)
+
+
+def load_profile_row(user):
+    '''The user's serialized profile as plain data in two queries, or 404'''
+    rows = profile_rows(Profile.objects.filter(user_id=user.pk))
+    if not rows:
+        raise Http404("No Profile matches the given query.")
+    return rows[0]
+
+
+# async counterparts for the async views, same queries and same shapes
+
+
+async def aload_display_name(user):
+    '''load_display_name for async views, None instead of a 404'''
+    return await avalues_row(Profile.objects.filter(user_id=user.pk), DisplayNameSerializer)
+
+
+async def aprofile_rows(queryset):
+    profiles, links = profile_queries(queryset)
+    profiles = [row async for row in profiles]
+    if not profiles:
+        return profiles
+    return nest_affiliations(profiles, [link async for link in links])
+
+
+async def aload_profile_row(user):
+    '''load_profile_row for async views, None instead of a 404'''
+    rows = await aprofile_rows(Profile.objects.filter(user_id=user.pk))
+    return rows[0] if rows else None
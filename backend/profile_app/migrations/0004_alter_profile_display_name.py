@@ -0,0 +1,19 @@
+# Generated by Django 5.0.3 on 2026-10-17 17:34
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profile_app', '0003_alter_profile_affiliations'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='display_name',
+            field=models.CharField(blank=True, max_length=50, null=True, validators=[django.core.validators.MinLengthValidator(3), django.core.validators.MaxLengthValidator(50)]),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.3 on 2026-10-17 18:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('federal_app', '0003_contribution_industry'),
+        ('profile_app', '0004_alter_profile_display_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WatchedState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(max_length=10)),
+                ('entity_id', models.CharField(max_length=30)),
+                ('data', models.JSONField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='followed_bills',
+            field=models.ManyToManyField(blank=True, related_name='followers', to='federal_app.bill'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='followed_candidates',
+            field=models.ManyToManyField(blank=True, related_name='followers', to='federal_app.candidate'),
+        ),
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(max_length=10)),
+                ('entity_id', models.CharField(max_length=30)),
+                ('data', models.JSONField()),
+                ('fan_out_on_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('fan_out_on_read', True)), fields=['entity_type', 'entity_id', '-id'], name='change_read_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('change', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='profile_app.change')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to='profile_app.profile')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='watchedstate',
+            constraint=models.UniqueConstraint(fields=('entity_type', 'entity_id'), name='watched_state'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('profile', 'change'), name='feed_entry'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def through_model(name, entity):
+    # the tables makemigrations created for the plain ManyToManyFields, now as models
+    return migrations.CreateModel(
+        name=name,
+        fields=[
+            ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='profile_app.profile')),
+            (entity, models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=f'federal_app.{entity}')),
+        ],
+        options={
+            'db_table': f'profile_app_profile_followed_{entity}s',
+            'unique_together': {('profile', entity)},
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('federal_app', '0003_contribution_industry'),
+        ('profile_app', '0005_watchedstate_profile_followed_bills_and_more'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                through_model('FollowedCandidate', 'candidate'),
+                through_model('FollowedBill', 'bill'),
+                migrations.AlterField(
+                    model_name='profile',
+                    name='followed_candidates',
+                    field=models.ManyToManyField(blank=True, related_name='followers', through='profile_app.FollowedCandidate', to='federal_app.candidate'),
+                ),
+                migrations.AlterField(
+                    model_name='profile',
+                    name='followed_bills',
+                    field=models.ManyToManyField(blank=True, related_name='followers', through='profile_app.FollowedBill', to='federal_app.bill'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='followedcandidate',
+            name='since',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='followedbill',
+            name='since',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
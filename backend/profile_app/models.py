@@ -1,10 +1,74 @@
 from django.db import models
 from django.core import validators as v
+from django.db.models import Q
 from user_app.models import User
 from affiliation_app.models import Affiliation
+from federal_app.models import Bill, Candidate
 
 # Create your models here.
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='user_profile')
-    display_name = models.CharField(validators=[v.MinLengthValidator(3), v.MaxLengthValidator(50)], null=True, blank=True)
-    affiliations = models.ManyToManyField(Affiliation, related_name='affiliations', blank=True)
\ No newline at end of file
+    display_name = models.CharField(max_length=50, validators=[v.MinLengthValidator(3), v.MaxLengthValidator(50)], null=True, blank=True)
+    affiliations = models.ManyToManyField(Affiliation, related_name='affiliations', blank=True)
+    # watchlist: ingested changes to these show up in the profile's feed
+    followed_candidates = models.ManyToManyField(Candidate, through='FollowedCandidate', related_name='followers', blank=True)
+    followed_bills = models.ManyToManyField(Bill, through='FollowedBill', related_name='followers', blank=True)
+
+
+# Watchlist rows. since is the newest Change id when the follow was made, so a feed
+# never shows changes logged before the user followed the entity.
+class FollowedCandidate(models.Model):
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
+    candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE)
+    since = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'profile_app_profile_followed_candidates'
+        unique_together = [('profile', 'candidate')]
+
+
+class FollowedBill(models.Model):
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
+    bill = models.ForeignKey(Bill, on_delete=models.CASCADE)
+    since = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'profile_app_profile_followed_bills'
+        unique_together = [('profile', 'bill')]
+
+
+class Change(models.Model):
+    '''A followed candidate or bill that changed in an ingest'''
+    entity_type = models.CharField(max_length=10)
+    entity_id = models.CharField(max_length=30)
+    # {"name": ..., "changed": {field: [old, new]}}
+    data = models.JSONField()
+    # set for entities with too many followers to copy into every feed; their followers'
+    # feeds read these rows directly instead
+    fan_out_on_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["entity_type", "entity_id", "-id"], condition=Q(fan_out_on_read=True), name="change_read_idx"),
+        ]
+
+
+class FeedEntry(models.Model):
+    '''A change copied into a follower's feed when it was ingested'''
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='feed')
+    change = models.ForeignKey(Change, on_delete=models.CASCADE)
+
+    class Meta:
+        # a feed page is a backwards range scan of this index
+        constraints = [models.UniqueConstraint(fields=["profile", "change"], name="feed_entry")]
+
+
+class WatchedState(models.Model):
+    '''Last seen fields of a followed entity, to tell what an ingest changed'''
+    entity_type = models.CharField(max_length=10)
+    entity_id = models.CharField(max_length=30)
+    data = models.JSONField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["entity_type", "entity_id"], name="watched_state")]
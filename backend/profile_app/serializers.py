@@ -1,15 +1,16 @@
 from rest_framework import serializers
+from core_app.instrumentation import TimedSerializerMixin
 from .models import Profile
 from affiliation_app.serializers import AffiliationSerializer
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     affiliations = AffiliationSerializer(many=True)
 
     class Meta: 
         model = Profile
         fields = ['id', 'display_name', 'affiliations']
 
-class DisplayNameSerializer(serializers.ModelSerializer):
+class DisplayNameSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Profile
         fields = ['display_name']
\ No newline at end of file
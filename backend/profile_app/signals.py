@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from core_app.caching import process_local
+from federal_app.signals import records_ingested
+from .bootstrap import build_bootstrap, invalidate_bootstrap
+from .feed import record_changes
+from .models import Profile
+from .tasks import build_bootstrap_task, fan_out_task
+
+
+@receiver(user_logged_in)
+def build_bootstrap_on_login(sender, user, **kwargs):
+    # the app fetches the bootstrap right after login, so have it ready. A task worker builds it
+    # when the document's cache is shared; a worker's copy in a process-local cache would never
+    # be seen, so then it's built here. Repeated logins before the task runs share one row.
+    if process_local(getattr(settings, "AFFILIATION_CACHE_ALIAS", "default")):
+        build_bootstrap(user)
+    else:
+        build_bootstrap_task.enqueue_with(args=[user.pk], unique_key=f"bootstrap:{user.pk}")
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(m2m_changed, sender=Profile.affiliations.through)
+def invalidate_bootstrap_on_profile_change(sender, instance, **kwargs):
+    # any write path (views, admin, shell) drops the cached document once its transaction commits,
+    # so the rebuild sees the affiliations saved alongside the profile. Bulk writes call
+    # invalidate_bootstraps themselves.
+    if isinstance(instance, Profile):
+        user_pk = instance.user_id
+        transaction.on_commit(lambda: invalidate_bootstrap(user_pk))
+
+
+@receiver(records_ingested)
+def feed_ingested_changes(sender, model, external_ids, **kwargs):
+    # the change log is written with the page, copying it into followers' feeds is left to a worker
+    changes = record_changes(model, external_ids)
+    if changes:
+        fan_out_task.enqueue([change.id for change in changes])
@@ -0,0 +1,17 @@
+from task_app.queue import task
+from user_app.models import User
+from .bootstrap import build_bootstrap
+from .feed import fan_out
+
+
+@task(name="profile.build_bootstrap", priority=10, max_attempts=3)
+def build_bootstrap_task(user_id):
+    user = User.objects.filter(pk=user_id).first()
+    if user is not None:
+        build_bootstrap(user)
+
+
+@task(name="profile.fan_out_changes")
+def fan_out_task(change_ids):
+    # feed rows are unique per (profile, change), so a retried batch doesn't duplicate entries
+    fan_out(change_ids)
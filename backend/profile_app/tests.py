@@ -1,3 +1,264 @@
+from pathlib import Path
+from unittest.mock import patch
 from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from affiliation_app.cache import bump_version, delete_alongside, get_with_version
+from affiliation_app.models import Affiliation
+from federal_app.ingestion import SOURCES, default_transports, sync
+from user_app.authentication import token_cache
+from user_app.models import User
+from rest_framework.renderers import JSONRenderer
+from task_app.models import Task
+from task_app.queue import Worker
+from . import bootstrap, signals
+from .bootstrap import bootstrap_key, bootstrap_state, build_bootstrap, invalidate_bootstrap
+from .loaders import load_profiles, profile_rows
+from .serializers import ProfileSerializer
+from .feed import fan_out
+from .models import Change, FeedEntry, Profile, WatchedState
+
+CASSETTE = Path(__file__).resolve().parent.parent / "federal_app" / "test_data" / "cassette.json"
 
 # Create your tests here.
+class ProfileQueryCountTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.affiliations = [Affiliation.objects.create(category=f"Party {i}") for i in range(5)]
+        self.user = self.make_user("a@a.com")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        # warm the token cache so counts only cover the view
+        self.client.get("/api/v1/users/")
+
+    def make_user(self, email):
+        user = User.objects.create_user(username=email, email=email, password="pass12345!")
+        profile = Profile.objects.create(user=user, display_name="someone")
+        profile.affiliations.set(self.affiliations)
+        return user
+
+    def test_current_user_profile(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/v1/profile/")
+        self.assertEqual(len(response.data["affiliations"]), 5)
+
+    def test_display_name(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/v1/profile/display_name/")
+        self.assertEqual(response.data, {"display_name": "someone"})
+
+    def test_load_profiles_is_constant(self):
+        users = [self.make_user(f"{i}@a.com") for i in range(10)]
+        with self.assertNumQueries(2):
+            profiles = load_profiles([user.pk for user in users])
+            self.assertEqual(sum(len(profile.affiliations.all()) for profile in profiles), 50)
+
+    def test_profile_rows_match_serializer(self):
+        self.make_user("b@a.com").user_profile.affiliations.clear()
+        profiles = Profile.objects.order_by("id")
+        expected = JSONRenderer().render(ProfileSerializer(load_profiles(list(profiles.values_list("user_id", flat=True))), many=True).data)
+        with self.assertNumQueries(2):
+            rows = profile_rows(profiles)
+        self.assertEqual(JSONRenderer().render(rows), expected)
+        self.assertEqual(self.client.get("/api/v1/profile/").content, JSONRenderer().render(rows[0]))
+
+    def test_edit_profile(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            new = Affiliation.objects.create(category="New")
+        # warm the affiliation catalog
+        self.client.get("/api/v1/affiliations/")
+        ids = [affiliation.id for affiliation in self.affiliations[3:]] + [new.id]
+        # profile, prefetch, update, one delete, one insert, plus the savepoint pair TestCase adds around atomic()
+        with self.assertNumQueries(7):
+            response = self.client.put("/api/v1/profile/edit_profile/", {"display_name": "renamed", "affiliations": ids}, format="json")
+        self.assertEqual(response.data["display_name"], "renamed")
+        self.assertEqual([row["id"] for row in response.data["affiliations"]], ids)
+        self.assertEqual(response.data, self.client.get("/api/v1/profile/").data)
+
+    def test_edit_profile_rejects_unknown_affiliations(self):
+        response = self.client.put("/api/v1/profile/edit_profile/", {"affiliations": [self.affiliations[0].id, 999]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(self.client.get("/api/v1/profile/").data["affiliations"]), 5)
+
+
+class SessionBootstrapTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        bump_version()
+        self.affiliation = Affiliation.objects.create(category="Green Party")
+        self.user = User.objects.create_user(username="boot@a.com", email="boot@a.com", password="pass12345!")
+        Profile.objects.create(user=self.user, display_name="booter").affiliations.add(self.affiliation)
+        self.client = APIClient()
+        response = self.client.post("/api/v1/users/login/", {"email": "boot@a.com", "password": "pass12345!"}, format="json")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.data['token']}")
+
+    def test_matches_individual_endpoints(self):
+        body = self.client.get("/api/v1/profile/bootstrap/").json()
+        self.assertEqual(body, {
+            "user": self.client.get("/api/v1/users/").json(),
+            "profile": self.client.get("/api/v1/profile/").json(),
+            "display_name": self.client.get("/api/v1/profile/display_name/").json(),
+            "affiliations": self.client.get("/api/v1/affiliations/").json(),
+        })
+
+    def test_warm_start_has_no_queries(self):
+        # one read builds the document, if the login task hasn't, and warms the token and catalog memos
+        self.client.get("/api/v1/profile/bootstrap/")
+        with self.assertNumQueries(0):
+            self.client.get("/api/v1/profile/bootstrap/")
+
+    def test_login_builds_bootstrap(self):
+        delete_alongside(bootstrap_key(self.user.pk))
+        self.client.post("/api/v1/users/login/", {"email": "boot@a.com", "password": "pass12345!"}, format="json")
+        self.assertIsNotNone(get_with_version(bootstrap_key(self.user.pk))[1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_login_queues_bootstrap_build_with_a_shared_cache(self):
+        delete_alongside(bootstrap_key(self.user.pk))
+        with patch.object(signals, "process_local", return_value=False):
+            self.client.post("/api/v1/users/login/", {"email": "boot@a.com", "password": "pass12345!"}, format="json")
+            self.client.post("/api/v1/users/login/", {"email": "boot@a.com", "password": "pass12345!"}, format="json")
+        # both logins share one queued build, and the login itself didn't build
+        self.assertEqual(Task.objects.filter(name="profile.build_bootstrap", status=Task.QUEUED).count(), 1)
+        self.assertIsNone(get_with_version(bootstrap_key(self.user.pk))[1])
+        self.assertEqual(Worker().run(burst=True), 1)
+        self.assertIsNotNone(get_with_version(bootstrap_key(self.user.pk))[1])
+
+    def test_edit_and_catalog_changes_invalidate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put("/api/v1/profile/edit_profile/", {"display_name": "renamed"}, format="json")
+        self.assertEqual(self.client.get("/api/v1/profile/bootstrap/").json()["display_name"], {"display_name": "renamed"})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.affiliation.category = "Greens"
+            self.affiliation.save()
+        body = self.client.get("/api/v1/profile/bootstrap/").json()
+        self.assertEqual(body["profile"]["affiliations"], [{"id": self.affiliation.id, "category": "Greens"}])
+        self.assertEqual(body["affiliations"], [{"id": self.affiliation.id, "category": "Greens"}])
+
+    def test_build_racing_an_invalidation_is_not_served(self):
+        version, generation, _ = bootstrap_state(self.user.pk)
+        stale = profile_rows(Profile.objects.filter(user=self.user))
+        # a write commits and invalidates while a request is still building from what it read before
+        Profile.objects.filter(user=self.user).update(display_name="committed")
+        invalidate_bootstrap(self.user.pk)
+        with patch.object(bootstrap, "profile_rows", return_value=stale):
+            build_bootstrap(self.user, version, generation)
+        self.assertEqual(self.client.get("/api/v1/profile/bootstrap/").json()["display_name"], {"display_name": "committed"})
+
+    def test_profile_writes_outside_the_api_invalidate(self):
+        self.client.get("/api/v1/profile/bootstrap/")
+        profile = Profile.objects.get(user=self.user)
+        # as the admin saves: the profile, then its affiliations
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.display_name = "admin set"
+            profile.save()
+        self.assertEqual(self.client.get("/api/v1/profile/bootstrap/").json()["display_name"], {"display_name": "admin set"})
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.affiliations.clear()
+        self.assertEqual(self.client.get("/api/v1/profile/bootstrap/").json()["profile"]["affiliations"], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.delete()
+        self.assertIsNone(self.client.get("/api/v1/profile/bootstrap/").json()["profile"])
+
+
+class WatchlistFeedTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.transports = default_transports(CASSETTE)
+        self.sync("fec_candidates", "congress_bills")
+        self.user = User.objects.create_user(username="watch@a.com", email="watch@a.com", password="pass12345!")
+        Profile.objects.create(user=self.user, display_name="watcher")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+
+    def sync(self, *names):
+        for name in names:
+            source = SOURCES[name]
+            sync(source, self.transports[source.api])
+
+    def follow(self, entity_type, entity_id):
+        return self.client.post("/api/v1/profile/watchlist/", {"type": entity_type, "id": entity_id}, format="json")
+
+    def feed(self, **params):
+        return self.client.get("/api/v1/profile/feed/", params).json()
+
+    def test_watchlist(self):
+        self.assertEqual(self.follow("bill", "118-hr-101").status_code, 201)
+        self.assertEqual(self.follow("bill", "118-hr-101").status_code, 201)
+        self.assertEqual(self.follow("candidate", "H4CA00001").status_code, 201)
+        self.assertEqual(self.follow("candidate", "H0NOBODY").status_code, 404)
+        self.assertEqual(self.follow("senator", "H4CA00001").status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/profile/watchlist/").json(), {
+            "candidates": [{"id": "H4CA00001", "name": "DOE, JANE 1"}],
+            "bills": [{"id": "118-hr-101", "name": "Widget Transparency Act 1"}],
+        })
+
+    def test_ingested_changes_fan_out_to_followers(self):
+        self.follow("bill", "118-hr-101")
+        self.follow("bill", "118-hr-102")
+        # the incremental run moves 118-hr-101 on, nothing else changes
+        self.sync("fec_candidates", "congress_bills")
+        self.assertEqual(Worker().run(burst=True), 1)
+        self.assertEqual(FeedEntry.objects.count(), 1)
+        [item] = self.feed()["results"]
+        self.assertEqual((item["type"], item["entity"], item["name"]), ("bill", "118-hr-101", "Widget Transparency Act 1"))
+        self.assertEqual(item["changed"], {
+            "latest_action": ["Referred to committee.", "Passed House."],
+            "latest_action_date": ["2024-01-02", "2024-02-01"],
+        })
+        self.client.delete("/api/v1/profile/watchlist/", {"type": "bill", "id": "118-hr-101"}, format="json")
+        self.assertEqual(self.feed()["results"], [])
+        self.assertEqual(self.client.get("/api/v1/profile/watchlist/").json()["bills"], [{"id": "118-hr-102", "name": "Clean Water Funding Act 2"}])
+
+    def test_heavy_followees_are_read_not_fanned_out(self):
+        self.follow("bill", "118-hr-101")
+        with self.settings(FEED_FANOUT_MAX_FOLLOWERS=1):
+            self.sync("congress_bills")
+        self.assertEqual(Worker().run(burst=True), 0)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertTrue(Change.objects.get().fan_out_on_read)
+        self.assertEqual([item["entity"] for item in self.feed()["results"]], ["118-hr-101"])
+
+    def test_feeds_start_at_the_follow(self):
+        def change(entity_id, on_read):
+            return Change.objects.create(entity_type="bill", entity_id=entity_id, data={"name": "x", "changed": {}}, fan_out_on_read=on_read)
+        earlier = [change("118-hr-103", True).id, change("118-hr-104", False).id]
+        self.follow("bill", "118-hr-103")
+        self.follow("bill", "118-hr-104")
+        self.assertEqual(fan_out(earlier), 0)
+        self.assertEqual(self.feed()["results"], [])
+        later = change("118-hr-103", True)
+        self.assertEqual([item["id"] for item in self.feed()["results"]], [later.id])
+        # the last follower leaving drops the entity's baseline, the next follow takes a fresh one
+        self.assertTrue(WatchedState.objects.filter(entity_id="118-hr-103").exists())
+        self.client.delete("/api/v1/profile/watchlist/", {"type": "bill", "id": "118-hr-103"}, format="json")
+        self.assertFalse(WatchedState.objects.filter(entity_id="118-hr-103").exists())
+        WatchedState.objects.filter(entity_id="118-hr-104").update(data={})
+        self.follow("bill", "118-hr-104")
+        self.assertEqual(WatchedState.objects.get(entity_id="118-hr-104").data["title"], "Clean Water Funding Act 4")
+
+    def test_pages_have_bounded_queries(self):
+        for bill in ("118-hr-101", "118-hr-102", "118-hr-103", "118-hr-104"):
+            self.follow("bill", bill)
+        self.follow("candidate", "H4CA00001")
+        Change.objects.bulk_create([Change(entity_type="bill", entity_id="118-hr-102", data={"name": "x", "changed": {}}, fan_out_on_read=True)] * 3)
+        FeedEntry.objects.bulk_create([
+            FeedEntry(profile=self.user.user_profile, change=Change.objects.create(entity_type="bill", entity_id="118-hr-101", data={"name": "y", "changed": {}}))
+            for _ in range(3)
+        ])
+        self.client.get("/api/v1/users/")
+        # two queries whatever is followed, plus none for the authenticated user once the token is cached
+        with self.assertNumQueries(2):
+            body = self.feed(limit=4)
+        self.assertEqual(len(body["results"]), 4)
+        seen = [item["id"] for item in body["results"]]
+        while body["next"]:
+            body = self.feed(limit=4, cursor=body["next"])
+            seen += [item["id"] for item in body["results"]]
+        self.assertEqual(seen, sorted(Change.objects.values_list("id", flat=True), reverse=True))
+        self.assertEqual(self.client.get("/api/v1/profile/feed/", {"cursor": "junk"}).status_code, 400)
+        # the same limit handling as the other list endpoints
+        response = self.client.get("/api/v1/profile/feed/", {"limit": "many"})
+        self.assertEqual((response.status_code, response.json()), (400, "limit must be a number."))
+        self.assertEqual(len(self.feed(limit=-1)["results"]), 1)
@@ -1,9 +1,25 @@
+from django.conf import settings
 from django.urls import path
-from .views import CurrentUserProfile,  DisplayName, EditUserProfile
+from . import views
+from .views import CurrentUserProfile,  DisplayName, EditUserProfile, Feed, SessionBootstrap, Watchlist
+
+# (route, DRF view) replaced by an async view
+replaced = []
+
+# under ASGI the read endpoints use the async views
+if settings.ASYNC_READ_VIEWS:
+    from .async_views import AsyncCurrentUserProfile as CurrentUserProfile, AsyncDisplayName as DisplayName
+    replaced += [("", views.CurrentUserProfile), ("display_name/", views.DisplayName)]
 
 # profile app urls 
 urlpatterns = [
      path("", CurrentUserProfile.as_view(), name="user_profile"),
      path("edit_profile/", EditUserProfile.as_view(), name="edit_profile"),
      path("display_name/", DisplayName.as_view(), name="display_name"),
-]
\ No newline at end of file
+     path("bootstrap/", SessionBootstrap.as_view(), name="session_bootstrap"),
+     path("watchlist/", Watchlist.as_view(), name="watchlist"),
+     path("feed/", Feed.as_view(), name="feed"),
+]
+
+# kept after the async routes so the schema still documents them (see user_app.urls)
+urlpatterns += [path(route, view.as_view()) for route, view in replaced]
@@ -1,37 +1,46 @@
-from django.shortcuts import render
 from user_app.views import TokenReq
-import requests
-from requests_oauthlib import OAuth1
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
+from django.db import transaction
 from rest_framework.status import (
     HTTP_200_OK,
     HTTP_201_CREATED,
+    HTTP_204_NO_CONTENT,
     HTTP_400_BAD_REQUEST,
+    HTTP_404_NOT_FOUND,
 )
 from rest_framework.views import APIView
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from core_app.docs import openapi, swagger_auto_schema
 from .serializers import Profile, ProfileSerializer, DisplayNameSerializer
-from user_app.serializers import User
+from .loaders import load_profile, load_profile_row, load_display_name
+from core_app.renderers import with_fast_json
+from rest_framework.settings import api_settings
+from .affiliations import InvalidAffiliations, clean_affiliation_ids, sync_affiliations
+from .bootstrap import get_bootstrap
+from .feed import WATCHED, feed_page, follow, unfollowed
+from django.http import HttpResponse
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import ValidationError
+from core_app.pagination import decode_cursor, encode_cursor
+from core_app.params import InvalidQuery, limit_param
 
 # Create your views here.
 class CurrentUserProfile(TokenReq):
     '''Access user profile for currently logged in user'''
+    renderer_classes = with_fast_json(api_settings.DEFAULT_RENDERER_CLASSES)
+
     @swagger_auto_schema(
         operation_summary="Get current user's profile",
         operation_description="Retrieve the profile data of the currently authenticated user.",
         responses={200: ProfileSerializer()},
     )
     def get(self, request):
-        # get user profile 
-        user_profile = get_object_or_404(Profile, user=request.user)
-        # serialize user profile
-        ser_profile = ProfileSerializer(user_profile)
+        # read the profile and its affiliations as plain rows, same shape as ProfileSerializer
+        user_profile = load_profile_row(request.user)
         # return serialized user profile data
-        return Response(ser_profile.data, status=HTTP_200_OK)
+        return Response(user_profile, status=HTTP_200_OK)
 
-class EditUserProfile(APIView):
+class EditUserProfile(TokenReq):
     @swagger_auto_schema(
         operation_summary="Edit user profile",
         operation_description="Update the profile data of the currently authenticated user.",
@@ -39,8 +48,8 @@ class EditUserProfile(APIView):
         responses={200: ProfileSerializer()},
     )
     def put(self, request): 
-        user = get_object_or_404(User, email=request.user)
-        user_profile = get_object_or_404(Profile, user=user)
+        # request.user is already resolved by the authenticator
+        user_profile = load_profile(request.user)
         data = request.data.copy()
         
         # Get the affiliations from the data and remove it from the data body
@@ -48,12 +57,27 @@ class EditUserProfile(APIView):
             
         edit_profile = ProfileSerializer(instance=user_profile, data=data, partial=True)
         if edit_profile.is_valid():
-            # Save the user profile first
-            updated_profile = edit_profile.save()
-            
-            # Update the affiliations
-            if affliliation_ids:
-                updated_profile.affiliations.set(affliliation_ids)
+            # check the affiliation ids against the catalog before writing anything
+            try:
+                if affliliation_ids:
+                    affliliation_ids = clean_affiliation_ids(affliliation_ids)
+            except InvalidAffiliations as e:
+                return Response({"affiliations": [str(e)]}, status=HTTP_400_BAD_REQUEST)
+
+            with transaction.atomic():
+                # Save the user profile first
+                # post_save drops the cached bootstrap document once the edit is committed
+                updated_profile = edit_profile.save()
+                
+                # Update the affiliations by applying only the add/remove delta
+                if affliliation_ids:
+                    affiliations = sync_affiliations(updated_profile, affliliation_ids)
+                    # build the response from the catalog instead of re-serializing the profile
+                    return Response({
+                        "id": updated_profile.id,
+                        "display_name": updated_profile.display_name,
+                        "affiliations": affiliations,
+                    }, status=HTTP_200_OK)
             return Response(edit_profile.data, status=HTTP_200_OK)
         
         return Response(edit_profile.errors, status=HTTP_400_BAD_REQUEST)
@@ -64,8 +88,115 @@ class EditUserProfile(APIView):
         responses={200: DisplayNameSerializer()},
     )
 class DisplayName(TokenReq):
+    renderer_classes = with_fast_json(api_settings.DEFAULT_RENDERER_CLASSES)
+
     # if authenticated get user info and return it with status 200
     def get(self, request):
-        profile = get_object_or_404(Profile, user=request.user)
-        display_name = DisplayNameSerializer(profile)
-        return Response(display_name.data, status=HTTP_200_OK)
\ No newline at end of file
+        # one column straight from .values(), same shape as DisplayNameSerializer
+        display_name = load_display_name(request.user)
+        return Response(display_name, status=HTTP_200_OK)
+
+class SessionBootstrap(TokenReq):
+    '''Everything the app needs after login in one response, cached per user'''
+    @swagger_auto_schema(
+        operation_summary="Get session bootstrap",
+        operation_description="The bodies of users/, profile/, profile/display_name/ and affiliations/ in one document. Built on login and cached until the profile or the affiliation catalog changes.",
+        responses={200: "{user, profile, display_name, affiliations}"},
+    )
+    def get(self, request):
+        return HttpResponse(get_bootstrap(request.user), content_type="application/json", status=HTTP_200_OK)
+
+
+WATCH_BODY = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    required=["type", "id"],
+    properties={
+        "type": openapi.Schema(type=openapi.TYPE_STRING, enum=list(WATCHED)),
+        "id": openapi.Schema(type=openapi.TYPE_STRING, description="FEC candidate id or bill id, e.g. 118-hr-1"),
+    },
+)
+
+
+def watched_entity(request):
+    '''(entity type, external id, the entity's pk or None) named by the request body'''
+    entity_type, entity_id = request.data.get("type"), request.data.get("id")
+    if entity_type not in WATCHED:
+        raise ValidationError({"type": f"Must be one of {', '.join(WATCHED)}."})
+    if not entity_id:
+        raise ValidationError({"id": "This field is required."})
+    model = WATCHED[entity_type][0]
+    return entity_type, str(entity_id), model.objects.filter(external_id=entity_id).values_list("id", flat=True).first()
+
+
+def own_profile(user):
+    '''Just the profile row, the watchlists are queried through it'''
+    return get_object_or_404(Profile.objects.only("id", "user_id"), user_id=user.pk)
+
+
+class Watchlist(TokenReq):
+    '''Candidates and bills the user follows'''
+    @swagger_auto_schema(
+        operation_summary="Get watchlist",
+        operation_description="The candidates and bills the current user follows.",
+        responses={200: "{candidates: [{id, name}], bills: [{id, name}]}"},
+    )
+    def get(self, request):
+        profile = own_profile(request.user)
+        body = {}
+        for entity_type, (_, field, _, name_field) in WATCHED.items():
+            rows = getattr(profile, field).order_by("external_id").values_list("external_id", name_field)
+            body[f"{entity_type}s"] = [{"id": entity_id, "name": name} for entity_id, name in rows]
+        return Response(body, status=HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_summary="Follow a candidate or bill",
+        operation_description="Changes to it in later ingests show up in the feed.",
+        request_body=WATCH_BODY,
+        responses={201: "Followed.", 404: "No such candidate or bill."},
+    )
+    def post(self, request):
+        entity_type, entity_id, pk = watched_entity(request)
+        if pk is None:
+            return Response(f"No {entity_type} {entity_id}.", status=HTTP_404_NOT_FOUND)
+        follow(own_profile(request.user), entity_type, pk, entity_id)
+        return Response({"type": entity_type, "id": entity_id}, status=HTTP_201_CREATED)
+
+    @swagger_auto_schema(
+        operation_summary="Unfollow a candidate or bill",
+        request_body=WATCH_BODY,
+        responses={204: "Unfollowed."},
+    )
+    def delete(self, request):
+        entity_type, entity_id, pk = watched_entity(request)
+        if pk is not None:
+            with transaction.atomic():
+                getattr(own_profile(request.user), WATCHED[entity_type][1]).remove(pk)
+                unfollowed(request.user, entity_type, entity_id)
+        return Response(status=HTTP_204_NO_CONTENT)
+
+
+class Feed(TokenReq):
+    '''What changed about the followed candidates and bills, newest first'''
+    @swagger_auto_schema(
+        operation_summary="Get change feed",
+        operation_description="Changes ingested for the candidates and bills on the watchlist, newest first.",
+        manual_parameters=[
+            openapi.Parameter("cursor", openapi.IN_QUERY, type=openapi.TYPE_STRING, description="next from the previous page"),
+            openapi.Parameter("limit", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: "{next, results: [{id, type, entity, name, changed: {field: [old, new]}, created_at}]}"},
+    )
+    def get(self, request):
+        before = None
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 1 or not isinstance(values[0], int):
+                raise ValidationError({"cursor": "Invalid cursor."})
+            before = values[0]
+        try:
+            limit = limit_param(request.query_params, getattr(settings, "FEED_PAGE_SIZE", 20), getattr(settings, "FEED_MAX_PAGE_SIZE", 100))
+        except InvalidQuery as e:
+            return Response(str(e), status=HTTP_400_BAD_REQUEST)
+        items, more = feed_page(request.user, before, limit)
+        return Response({"next": encode_cursor([items[-1]["id"]]) if more else None, "results": items}, status=HTTP_200_OK)
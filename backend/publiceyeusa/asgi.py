@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'publiceyeusa.settings')
+# serve register/login from the async views that hash passwords on a bounded pool
+os.environ.setdefault('ASYNC_AUTH_VIEWS', 'True')
+# and the hot read endpoints from async views that use the async ORM
+os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -48,9 +49,16 @@ INSTALLED_APPS = [
     'user_app',
     'profile_app',
     'affiliation_app',
+    'core_app',
+    'federal_app',
+    'search_app',
+    'finance_app',
+    'task_app',
+    'graph_app',
 ]
 
 MIDDLEWARE = [
+    'core_app.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -80,6 +88,7 @@ CORS_ALLOW_HEADERS = [
 CORS_EXPOSE_HEADERS = [
     'content-type',
     'authorization',
+    'server-timing',
 ]
 
 CORS_ALLOW_METHODS = [
@@ -114,16 +123,38 @@ WSGI_APPLICATION = 'publiceyeusa.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.getenv("DATABASE"),
-        'USER': os.getenv("DB_USER"),
-        'PASSWORD': os.getenv("DB_PASSWORD") or '',
-        'HOST': 'localhost',
-        'PORT': 5433,
+# DB_ENGINE=sqlite runs everything (tests, benchmarks) without a PostgreSQL server
+# DB_POOL picks how PostgreSQL connections are reused:
+#   none       - a new connection per request (Django default)
+#   persistent - keep each worker thread's connection open for DB_CONN_MAX_AGE seconds, health checked before reuse
+# Django 5.0 has no built-in connection pool, that arrives with 5.1 (DATABASES OPTIONS "pool").
+DB_ENGINE = os.getenv("DB_ENGINE", "postgresql")
+DB_POOL = os.getenv("DB_POOL", "none")
+
+if DB_ENGINE == "sqlite":
+    DATABASES = {
+        'default': {
+            # stock sqlite3 backend apart from unbounded CharFields (publiceyeusa/sqlite3)
+            'ENGINE': 'publiceyeusa.sqlite3',
+            'NAME': os.getenv("SQLITE_PATH") or BASE_DIR / 'db.sqlite3',
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv("DATABASE"),
+            'USER': os.getenv("DB_USER"),
+            'PASSWORD': os.getenv("DB_PASSWORD") or '',
+            'HOST': os.getenv("DB_HOST", 'localhost'),
+            'PORT': int(os.getenv("DB_PORT", 5433)),
+        }
+    }
+    if DB_POOL == "persistent":
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv("DB_CONN_MAX_AGE", 600))
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    elif DB_POOL != "none":
+        raise ImproperlyConfigured(f"Unknown DB_POOL {DB_POOL!r}, expected none or persistent.")
 
 
 # Password validation
@@ -144,12 +175,168 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv("CACHE_BACKEND", 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv("CACHE_LOCATION", ''),
+    }
+}
+# server worker processes (gunicorn and uvicorn read WEB_CONCURRENCY too); with more than one,
+# AFFILIATION_CACHE_ALIAS and TOKEN_CACHE_ALIAS must not be LocMem (check --deploy reports it)
+WEB_WORKERS = int(os.getenv("WEB_CONCURRENCY", 1))
+
+# Password hashing pool used by the async sign-up and login views
+# asgi.py turns the async views on by default
+ASYNC_AUTH_VIEWS = os.getenv("ASYNC_AUTH_VIEWS", "False") == "True"
+HASHING_POOL_WORKERS = int(os.getenv("HASHING_POOL_WORKERS", 4))
+HASHING_POOL_QUEUE = int(os.getenv("HASHING_POOL_QUEUE", 32))
+# users/, profile/, profile/display_name/ and affiliations/ served by async views (also on by default in asgi.py)
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "False") == "True"
+
+# Request instrumentation
+# PERF_SAMPLE_RATE of requests feed api/v1/metrics/ (0 turns it off); sampled responses to staff, or to
+# anyone under DEBUG, get a Server-Timing header
+# requests slower than PERF_SLOW_REQUEST_MS are logged to publiceyeusa.slow_requests with their SQL,
+# sampled or not (every request is timed while it is set)
+PERF_SAMPLE_RATE = float(os.getenv("PERF_SAMPLE_RATE", 0.1))
+PERF_SLOW_REQUEST_MS = int(os.getenv("PERF_SLOW_REQUEST_MS", 0)) or None
+
+# Outbound HTTP client for third-party APIs (core_app.http_client)
+# rate limits are (requests per second, burst) per host, "*" applies to any other host
+OUTBOUND_RATE_LIMITS = {
+    'api.open.fec.gov': (float(os.getenv("FEC_RATE_LIMIT", 0.25)), 10),
+    'api.congress.gov': (float(os.getenv("CONGRESS_RATE_LIMIT", 1.3)), 10),
+}
+OUTBOUND_POOL_SIZE = int(os.getenv("OUTBOUND_POOL_SIZE", 10))
+OUTBOUND_CACHE_ALIAS = os.getenv("OUTBOUND_CACHE_ALIAS", 'default')
+# how long a cached response is kept for revalidation once its max-age has passed
+OUTBOUND_CACHE_TIMEOUT = int(os.getenv("OUTBOUND_CACHE_TIMEOUT", 86400))
+# longest a host is paused for after a 429 or an exhausted X-RateLimit quota, in seconds
+OUTBOUND_MAX_PAUSE = int(os.getenv("OUTBOUND_MAX_PAUSE", 300))
+
+# Federal data ingestion (manage.py sync_federal_data)
+FEC_API_URL = os.getenv("FEC_API_URL", 'https://api.open.fec.gov/v1')
+FEC_API_KEY = os.getenv("FEC_API_KEY")
+FEC_CYCLE = int(os.getenv("FEC_CYCLE", 2024))
+CONGRESS_API_URL = os.getenv("CONGRESS_API_URL", 'https://api.congress.gov/v3')
+CONGRESS_API_KEY = os.getenv("CONGRESS_API_KEY")
+# Columnar snapshots of the federal tables (federal_app.snapshots), written under SNAPSHOT_DIR
+# as pages are ingested and rebuilt with manage.py snapshot_federal_data. Unset turns them off.
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR")
+# appended pages are merged whenever the last FANOUT parts share a size tier (rows / MIN_ROWS, in
+# powers of FANOUT); replaced parts are deleted RETIRE_SECONDS later, once readers have reopened
+SNAPSHOT_COMPACT_FANOUT = int(os.getenv("SNAPSHOT_COMPACT_FANOUT", 8))
+SNAPSHOT_COMPACT_MIN_ROWS = int(os.getenv("SNAPSHOT_COMPACT_MIN_ROWS", 1000))
+SNAPSHOT_RETIRE_SECONDS = int(os.getenv("SNAPSHOT_RETIRE_SECONDS", 600))
+
+# Search backend: postgres (tsvector + trigram indexes), memory (in-process inverted index)
+# or auto to pick postgres whenever the database is PostgreSQL
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", 'auto')
+# processes that don't ingest check the sync checkpoints this often for rows to add to the memory index
+SEARCH_INDEX_REFRESH_INTERVAL = int(os.getenv("SEARCH_INDEX_REFRESH_INTERVAL", 30))
+
+# Finance rollups (finance_app): stale groups are recomputed after each ingested page unless
+# FINANCE_REFRESH_ON_INGEST is off, then manage.py refresh_finance_rollups does it.
+# api/v1/finances/ responses are cached per query until the next refresh.
+FINANCE_REFRESH_ON_INGEST = os.getenv("FINANCE_REFRESH_ON_INGEST", "True") == "True"
+FINANCE_CACHE_ALIAS = os.getenv("FINANCE_CACHE_ALIAS", 'default')
+FINANCE_CACHE_TIMEOUT = int(os.getenv("FINANCE_CACHE_TIMEOUT", 300))
+# slices are grouped by the "database" or summed from the memory mapped "snapshot" of contributions (needs SNAPSHOT_DIR)
+FINANCE_SLICE_SOURCE = os.getenv("FINANCE_SLICE_SOURCE", 'database')
+
+# Background tasks (task_app): queued in the database and run by manage.py run_tasks workers.
+# Failed tasks retry after TASK_BACKOFF_BASE * 2**(attempt - 1) seconds, at most TASK_BACKOFF_MAX;
+# workers refresh the lock of running tasks every TASK_HEARTBEAT_INTERVAL seconds, and tasks whose
+# lock is older than TASK_LOCK_TIMEOUT are taken to have lost their worker and are requeued. Every
+# TASK_HOUSEKEEPING_INTERVAL seconds workers requeue those and purge finished rows.
+TASK_WORKER_CONCURRENCY = int(os.getenv("TASK_WORKER_CONCURRENCY", 4))
+TASK_POLL_INTERVAL = float(os.getenv("TASK_POLL_INTERVAL", 1.0))
+TASK_LOCK_TIMEOUT = int(os.getenv("TASK_LOCK_TIMEOUT", 600))
+TASK_HEARTBEAT_INTERVAL = int(os.getenv("TASK_HEARTBEAT_INTERVAL", 60))
+TASK_HOUSEKEEPING_INTERVAL = int(os.getenv("TASK_HOUSEKEEPING_INTERVAL", 60))
+TASK_BACKOFF_BASE = float(os.getenv("TASK_BACKOFF_BASE", 5))
+TASK_BACKOFF_MAX = float(os.getenv("TASK_BACKOFF_MAX", 3600))
+TASK_KEEP_FINISHED_DAYS = int(os.getenv("TASK_KEEP_FINISHED_DAYS", 7))
+
+# Relationship graph (graph_app): edges are updated after each ingested page, rebuilt with
+# manage.py rebuild_graph. Every process holds the graph in memory and applies the edges changed
+# since its revision at most every GRAPH_REFRESH_INTERVAL seconds.
+GRAPH_REFRESH_INTERVAL = float(os.getenv("GRAPH_REFRESH_INTERVAL", 5))
+# neighborhoods are cut off at GRAPH_MAX_NODES nodes, traversals scanning more edges are refused
+GRAPH_MAX_NODES = int(os.getenv("GRAPH_MAX_NODES", 2000))
+GRAPH_MAX_EDGES = int(os.getenv("GRAPH_MAX_EDGES", 5000000))
+# results for nodes with at least GRAPH_HOT_DEGREE edges are cached until the graph changes
+GRAPH_HOT_DEGREE = int(os.getenv("GRAPH_HOT_DEGREE", 200))
+GRAPH_CACHE_ALIAS = os.getenv("GRAPH_CACHE_ALIAS", 'default')
+GRAPH_CACHE_TIMEOUT = int(os.getenv("GRAPH_CACHE_TIMEOUT", 300))
+
+# Watchlist change feed (profile/feed/): changes to followed candidates and bills are copied into
+# each follower's feed by a task worker, except for entities with FEED_FANOUT_MAX_FOLLOWERS or
+# more followers, which feeds read from the change log instead.
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv("FEED_FANOUT_MAX_FOLLOWERS", 1000))
+FEED_PAGE_SIZE = int(os.getenv("FEED_PAGE_SIZE", 20))
+FEED_MAX_PAGE_SIZE = int(os.getenv("FEED_MAX_PAGE_SIZE", 100))
+
+# Throttling for the sign-up and login views
+# counters live in THROTTLE_STORE: "cache" (THROTTLE_CACHE_ALIAS, point it at Redis to share limits
+# across workers) or "memory" (per process). Rates are "<count>/<s|min|hour|day>", empty disables one.
+# With the LocMem default each of WEB_WORKERS keeps its own counters, so a client gets the full rate
+# from every worker; startup logs a warning when that's the case.
+THROTTLE_STORE = os.getenv("THROTTLE_STORE", 'cache')
+THROTTLE_CACHE_ALIAS = os.getenv("THROTTLE_CACHE_ALIAS", 'default')
+THROTTLE_RATES = {
+    scope: os.getenv(f"THROTTLE_{scope.upper()}", default)
+    for scope, default in {
+        "login_ip": "20/min",
+        "login_account": "10/min",
+        "login_endpoint": "600/min",
+        "register_ip": "10/hour",
+        "register_endpoint": "120/min",
+    }.items()
+}
+
+# Batch endpoint: most sub-requests a single api/v1/batch/ call may carry
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", 20))
+
+# OpenAPI schema
+# with SCHEMA_CACHE on the schema is generated once per CODE_VERSION (or source hash) into SCHEMA_CACHE_DIR,
+# by `manage.py build_schema` or on first request, and served pre-serialized with an ETag
+SCHEMA_CACHE = os.getenv("SCHEMA_CACHE", "True") == "True"
+SCHEMA_CACHE_DIR = os.getenv("SCHEMA_CACHE_DIR") or BASE_DIR / '.schema_cache'
+SCHEMA_MAX_AGE = int(os.getenv("SCHEMA_MAX_AGE", 3600))
+CODE_VERSION = os.getenv("CODE_VERSION")
+
+SWAGGER_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+
+REDOC_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+
+# Affiliation catalog cache
+AFFILIATION_CACHE_ALIAS = os.getenv("AFFILIATION_CACHE_ALIAS", 'default')
+AFFILIATION_CATALOG_MAX_AGE = int(os.getenv("AFFILIATION_CATALOG_MAX_AGE", 60))
+
+# Per-user session bootstrap documents, stored in the affiliation cache next to the catalog version
+BOOTSTRAP_CACHE_TIMEOUT = int(os.getenv("BOOTSTRAP_CACHE_TIMEOUT", 3600))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
-    ]
+        'user_app.authentication.CachedTokenAuthentication',
+    ],
+    # reverse proxies in front of the app; client addresses (per-IP throttles) come from
+    # X-Forwarded-For only when this is set, otherwise from REMOTE_ADDR so clients can't pick their own
+    'NUM_PROXIES': int(os.getenv("NUM_PROXIES", 0)),
 }
 
+# Token authentication cache
+# warm tokens are served from an in-process LRU, optionally backed by a shared Django cache alias
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", 300))
+TOKEN_CACHE_LOCAL_TTL = int(os.getenv("TOKEN_CACHE_LOCAL_TTL", 30))
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", 1024))
+TOKEN_CACHE_ALIAS = os.getenv("TOKEN_CACHE_ALIAS")
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -0,0 +1,36 @@
+"""
+Settings profile for API-only workers.
+
+    DJANGO_SETTINGS_MODULE=publiceyeusa.settings_api gunicorn publiceyeusa.wsgi
+
+Same configuration as publiceyeusa.settings, minus what a token-authenticated JSON API
+never uses: the admin, sessions, messages, static files, the browsable API and the
+swagger/redoc schema (drf_yasg). Run the admin and schema from a worker on the full settings.
+`python -m benchmarks.startup` compares cold start under both.
+"""
+from .settings import *  # noqa: F401,F403
+
+API_ONLY_EXCLUDED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'drf_yasg',
+]
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in API_ONLY_EXCLUDED_APPS]
+
+API_ONLY_EXCLUDED_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in API_ONLY_EXCLUDED_MIDDLEWARE]
+
+# nothing renders templates, and without staticfiles the browsable API couldn't either
+TEMPLATES = []
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+}
@@ -0,0 +1,10 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    '''Django's SQLite backend, creating CharFields as plain varchar
+
+    SQLite never enforces a varchar length, but the stock backend writes varchar(None) for
+    a CharField without max_length, which profile_app's initial migration still has.
+    '''
+    data_types = {**base.DatabaseWrapper.data_types, 'CharField': 'varchar'}
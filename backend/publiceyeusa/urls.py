@@ -14,31 +14,65 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
-from django.urls import path, include, re_path
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
+from django.conf import settings
+from django.urls import path, include
+from core_app.views import Batch
+
+
+def api_info():
+    from drf_yasg import openapi
+    return openapi.Info(
         title="PublicEyeUSA API",
         default_version='v1',
         description="API Schema for the PublicEyeUSA API",
         terms_of_service="https://www.google.com/policies/terms/",
         contact=openapi.Contact(email="shawnmariesmith@icloud.com"),
         license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+    )
+
+
+def schema_urls():
+    '''Swagger/redoc routes, only built where drf_yasg is installed (not on API-only workers)'''
+    from rest_framework import permissions
+    from drf_yasg.views import get_schema_view
+    from core_app.schema import CachedSchemaView, schema_ui
+
+    info = api_info()
+    schema_view = get_schema_view(
+        info,
+        public=True,
+        permission_classes=(permissions.AllowAny,),
+    )
+
+    if settings.SCHEMA_CACHE:
+        # schema is built once per code version and served pre-serialized
+        return [
+            path('swagger<format>/', CachedSchemaView.as_view(info=info), name='schema-json'),
+            path('swagger/', schema_ui(schema_view.with_ui('swagger', cache_timeout=0), info), name='schema-swagger-ui'),
+            path('redoc/', schema_ui(schema_view.with_ui('redoc', cache_timeout=0), info), name='schema-redoc'),
+        ]
+    return [
+        path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
+        path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+        path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    ]
+
 
 urlpatterns = [
-    path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
-    path('admin/', admin.site.urls),
     path('api/v1/users/', include("user_app.urls")),
     path('api/v1/profile/', include("profile_app.urls")),
     path('api/v1/affiliations/', include("affiliation_app.urls")),
+    path('api/v1/metrics/', include("core_app.urls")),
+    path('api/v1/search/', include("search_app.urls")),
+    path('api/v1/federal/', include("federal_app.urls")),
+    path('api/v1/finances/', include("finance_app.urls")),
+    path('api/v1/graph/', include("graph_app.urls")),
+    path('api/v1/batch/', Batch.as_view(), name='batch'),
 ]
+
+if "drf_yasg" in settings.INSTALLED_APPS:
+    urlpatterns = schema_urls() + urlpatterns
+
+if "django.contrib.admin" in settings.INSTALLED_APPS:
+    from django.contrib import admin
+    urlpatterns.append(path('admin/', admin.site.urls))
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SearchAppConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search_app'
+
+    def ready(self):
+        # keep the in-memory index in step with ingestion
+        from . import signals
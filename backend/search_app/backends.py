@@ -0,0 +1,266 @@
+import bisect
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+from federal_app.models import Bill, Candidate, Organization, SyncCheckpoint
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# prefix terms expanded per query term, keeps one-letter typeahead from unioning the whole index
+MAX_PREFIX_EXPANSION = 200
+# rows synced this long before a refresh are read again by the next one, in case their page
+# committed after a later page had already been seen
+REFRESH_OVERLAP = timedelta(minutes=5)
+# a token starting a word, or the whole word, of the lowercased text; words are TOKEN_RE runs
+WORD_START = "(^|[^a-z0-9]){}"
+WORD = "(^|[^a-z0-9]){}([^a-z0-9]|$)"
+
+
+def candidate_detail(row):
+    return " ".join(part for part in (row["party"], row["office"], row["state"]) if part)
+
+
+def organization_detail(row):
+    return " ".join(part for part in (row["committee_type"], row["state"]) if part)
+
+
+def bill_detail(row):
+    return f"{row['bill_type'].upper()} {row['number']} ({row['congress']}th Congress)"
+
+
+# what each searchable type indexes and returns
+ENTITIES = {
+    "candidate": {
+        "model": Candidate,
+        "name": "name",
+        "text": ["name", "party", "state"],
+        "fields": ["external_id", "name", "party", "office", "state"],
+        "detail": candidate_detail,
+    },
+    "organization": {
+        "model": Organization,
+        "name": "name",
+        "text": ["name", "committee_type", "state"],
+        "fields": ["external_id", "name", "committee_type", "state"],
+        "detail": organization_detail,
+    },
+    "bill": {
+        "model": Bill,
+        "name": "title",
+        "text": ["title", "bill_type", "number", "sponsor_name"],
+        "fields": ["external_id", "title", "bill_type", "number", "congress", "sponsor_name"],
+        "detail": bill_detail,
+    },
+}
+MODEL_TYPES = {entity["model"]: kind for kind, entity in ENTITIES.items()}
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def to_result(kind, row, score):
+    entity = ENTITIES[kind]
+    return {
+        "type": kind,
+        "id": row["external_id"],
+        "name": row[entity["name"]],
+        "detail": entity["detail"](row),
+        "score": round(float(score), 4),
+    }
+
+
+def sort_results(results):
+    # best first, ties by name, as MemoryIndex orders its hits
+    results.sort(key=lambda result: (-result["score"], str(result["name"])))
+
+
+class PostgresSearch:
+    '''Full text over the generated tsvector columns, typeahead over the trigram indexed search_text
+
+    Typeahead matches the way MemoryIndex does: every query token has to start a word of the
+    indexed text, and scores 2 when it is the whole word and 1 when it is a prefix.
+    '''
+
+    def search(self, query, types, limit, typeahead=False):
+        results = []
+        tokens = tokenize(query)
+        if typeahead and not tokens:
+            return []
+        with connection.cursor() as cursor:
+            for kind in types:
+                entity = ENTITIES[kind]
+                table = entity["model"]._meta.db_table
+                columns = ", ".join(entity["fields"])
+                name = entity["name"]
+                if typeahead:
+                    # tokens are [a-z0-9]+, nothing in them needs escaping in a regex
+                    score = " + ".join("CASE WHEN search_text ~ %s THEN 2 ELSE 1 END" for _ in tokens)
+                    where = " AND ".join("search_text ~ %s" for _ in tokens)
+                    cursor.execute(
+                        f"SELECT {columns}, ({score})::float / {2 * len(tokens)} AS score FROM {table} "
+                        f"WHERE {where} ORDER BY score DESC, {name} LIMIT %s",
+                        [*(WORD.format(token) for token in tokens), *(WORD_START.format(token) for token in tokens), limit],
+                    )
+                else:
+                    cursor.execute(
+                        f"SELECT {columns}, ts_rank(search_vector, q) AS score "
+                        f"FROM {table}, websearch_to_tsquery('english', %s) q "
+                        f"WHERE search_vector @@ q ORDER BY score DESC, {name} LIMIT %s",
+                        [query, limit],
+                    )
+                names = [col[0] for col in cursor.description]
+                for values in cursor.fetchall():
+                    row = dict(zip(names, values))
+                    results.append(to_result(kind, row, row["score"]))
+        sort_results(results)
+        return results[:limit]
+
+
+class MemoryIndex:
+    '''Pure Python inverted index, built from the tables on first use and kept current
+
+    The ingesting process updates it page by page. Every other process checks the sync
+    checkpoints at most every SEARCH_INDEX_REFRESH_INTERVAL seconds, and when a sync has moved
+    on re-indexes the rows synced since its last look.
+    '''
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.built = False
+        self.postings = defaultdict(set)
+        self.docs = {}
+        self.terms = []
+        self.terms_dirty = False
+        # latest checkpoint update seen, and when rows were last read
+        self.watermark = None
+        self.read_at = None
+        self.checked = 0.0
+
+    def build(self):
+        with self.lock:
+            self.watermark = self._watermark()
+            self.read_at = timezone.now()
+            self.postings.clear()
+            self.docs.clear()
+            for kind, entity in ENTITIES.items():
+                for row in entity["model"].objects.values(*entity["fields"]).iterator(chunk_size=2000):
+                    self._add(kind, row)
+            self.terms_dirty = True
+            self.built = True
+            self.checked = time.monotonic()
+
+    def ensure_built(self):
+        if not self.built:
+            self.build()
+        else:
+            self.refresh()
+
+    @staticmethod
+    def _watermark():
+        return SyncCheckpoint.objects.aggregate(latest=Max("updated_at"))["latest"]
+
+    def refresh(self):
+        '''Re-index rows other processes synced since the last look, once a checkpoint shows they did'''
+        if time.monotonic() - self.checked < getattr(settings, "SEARCH_INDEX_REFRESH_INTERVAL", 30):
+            return
+        with self.lock:
+            self.checked = time.monotonic()
+            watermark = self._watermark()
+            if watermark == self.watermark:
+                return
+            since, self.read_at = self.read_at - REFRESH_OVERLAP, timezone.now()
+            for kind, entity in ENTITIES.items():
+                for row in entity["model"].objects.filter(synced_at__gte=since).values(*entity["fields"]).iterator(chunk_size=2000):
+                    self._add(kind, row)
+            self.watermark = watermark
+
+    def _add(self, kind, row):
+        key = (kind, row["external_id"])
+        entity = ENTITIES[kind]
+        tokens = set()
+        for field in entity["text"]:
+            tokens.update(tokenize(str(row.get(field) or "")))
+        self._remove(key)
+        self.docs[key] = (row, tokens)
+        for token in tokens:
+            if token not in self.postings:
+                self.terms_dirty = True
+            self.postings[token].add(key)
+
+    def _remove(self, key):
+        doc = self.docs.pop(key, None)
+        if doc is None:
+            return
+        for token in doc[1]:
+            keys = self.postings.get(token)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[token]
+                    self.terms_dirty = True
+
+    def update(self, kind, external_ids):
+        '''Re-index just these rows, dropping any that no longer exist'''
+        if not self.built:
+            return
+        entity = ENTITIES[kind]
+        rows = entity["model"].objects.filter(external_id__in=external_ids).values(*entity["fields"])
+        with self.lock:
+            found = set()
+            for row in rows:
+                self._add(kind, row)
+                found.add(row["external_id"])
+            for external_id in set(external_ids) - found:
+                self._remove((kind, external_id))
+
+    def _expand(self, term):
+        if self.terms_dirty:
+            self.terms = sorted(self.postings)
+            self.terms_dirty = False
+        start = bisect.bisect_left(self.terms, term)
+        matches = []
+        for candidate in self.terms[start:start + MAX_PREFIX_EXPANSION]:
+            if not candidate.startswith(term):
+                break
+            matches.append(candidate)
+        return matches
+
+    def search(self, query, types, limit, typeahead=False):
+        self.ensure_built()
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self.lock:
+            scores = None
+            for term in terms:
+                # exact matches score higher than prefix matches
+                term_scores = {key: 2 for key in self.postings.get(term, ())}
+                if typeahead:
+                    for expanded in self._expand(term):
+                        for key in self.postings[expanded]:
+                            term_scores.setdefault(key, 1)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {key: score + term_scores[key] for key, score in scores.items() if key in term_scores}
+                if not scores:
+                    return []
+            hits = [(score, key) for key, score in scores.items() if key[0] in types]
+            hits.sort(key=lambda hit: (-hit[0], str(self.docs[hit[1]][0][ENTITIES[hit[1][0]]["name"]])))
+            return [to_result(kind, self.docs[(kind, external_id)][0], score / (2 * len(terms))) for score, (kind, external_id) in hits[:limit]]
+
+
+memory_index = MemoryIndex()
+
+
+def get_backend():
+    backend = getattr(settings, "SEARCH_BACKEND", "auto")
+    if backend == "postgres" or (backend == "auto" and connection.vendor == "postgresql"):
+        return PostgresSearch()
+    return memory_index
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+# (table, tsvector expression, trigram column)
+TABLES = [
+    ("federal_app_candidate", "coalesce(name, '') || ' ' || coalesce(party, '') || ' ' || coalesce(state, '')", "name"),
+    ("federal_app_organization", "coalesce(name, '') || ' ' || coalesce(committee_type, '') || ' ' || coalesce(state, '')", "name"),
+    ("federal_app_bill", "coalesce(title, '') || ' ' || bill_type || ' ' || number || ' ' || coalesce(sponsor_name, '')", "title"),
+]
+
+
+def create_indexes(apps, schema_editor):
+    # generated columns keep the vectors current on every upsert, so ingestion needs no extra work
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, expression, column in TABLES:
+        schema_editor.execute(
+            f"ALTER TABLE {table} ADD COLUMN search_vector tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('english', {expression})) STORED"
+        )
+        schema_editor.execute(f"CREATE INDEX {table}_search_gin ON {table} USING gin (search_vector)")
+        schema_editor.execute(f"CREATE INDEX {table}_{column}_trgm ON {table} USING gin ({column} gin_trgm_ops)")
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, expression, column in TABLES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_{column}_trgm")
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_search_gin")
+        schema_editor.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('federal_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# (table, text the memory index tokenizes, trigram column replaced)
+TABLES = [
+    ("federal_app_candidate", "coalesce(name, '') || ' ' || coalesce(party, '') || ' ' || coalesce(state, '')", "name"),
+    ("federal_app_organization", "coalesce(name, '') || ' ' || coalesce(committee_type, '') || ' ' || coalesce(state, '')", "name"),
+    ("federal_app_bill", "coalesce(title, '') || ' ' || bill_type || ' ' || number || ' ' || coalesce(sponsor_name, '')", "title"),
+]
+
+
+def create_search_text(apps, schema_editor):
+    # typeahead matches word prefixes across the same fields the memory index tokenizes
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, expression, column in TABLES:
+        schema_editor.execute(
+            f"ALTER TABLE {table} ADD COLUMN search_text text "
+            f"GENERATED ALWAYS AS (lower({expression})) STORED"
+        )
+        schema_editor.execute(f"CREATE INDEX {table}_search_text_trgm ON {table} USING gin (search_text gin_trgm_ops)")
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_{column}_trgm")
+
+
+def drop_search_text(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, expression, column in TABLES:
+        schema_editor.execute(f"CREATE INDEX {table}_{column}_trgm ON {table} USING gin ({column} gin_trgm_ops)")
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_search_text_trgm")
+        schema_editor.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_text")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0001_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_text, drop_search_text),
+    ]
@@ -0,0 +1,5 @@
+from django.db import models
+
+# Create your models here.
+# Search has no tables of its own. On PostgreSQL migration 0001 adds generated tsvector columns
+# plus GIN and trigram indexes to the federal_app tables; other databases use the in-memory index.
@@ -0,0 +1,11 @@
+from django.dispatch import receiver
+from federal_app.signals import records_ingested
+from .backends import MODEL_TYPES, memory_index
+
+
+@receiver(records_ingested)
+def index_ingested_records(sender, model, external_ids, **kwargs):
+    # PostgreSQL keeps its generated search columns current by itself
+    kind = MODEL_TYPES.get(model)
+    if kind is not None:
+        memory_index.update(kind, external_ids)
@@ -0,0 +1,51 @@
+from pathlib import Path
+from django.test import TestCase
+from federal_app.ingestion import SOURCES, default_transports, sync
+from django.utils import timezone
+from federal_app.models import Organization, SyncCheckpoint
+from federal_app.signals import records_ingested
+from .backends import memory_index
+
+CASSETTE = Path(__file__).resolve().parent.parent / "federal_app" / "test_data" / "cassette.json"
+
+# Create your tests here.
+class MemorySearchTests(TestCase):
+    def setUp(self):
+        memory_index.built = False
+        transports = default_transports(CASSETTE)
+        for name in ("fec_committees", "congress_bills"):
+            sync(SOURCES[name], transports[SOURCES[name].api])
+
+    def search(self, **params):
+        return self.client.get("/api/v1/search/", params).json()["results"]
+
+    def test_full_text(self):
+        results = self.search(q="widget")
+        self.assertEqual({result["type"] for result in results}, {"bill", "organization"})
+        self.assertEqual(self.search(q="widget makers", type="organization")[0]["id"], "C00009999")
+
+    def test_typeahead_matches_prefixes(self):
+        self.assertEqual(self.search(q="wid mak", mode="typeahead")[0]["name"], "WIDGET MAKERS PAC")
+        self.assertEqual(self.search(q="wid mak"), [])
+
+    def test_ingest_updates_index(self):
+        self.search(q="widget")
+        Organization.objects.filter(external_id="C00009999").update(name="GADGET MAKERS PAC")
+        records_ingested.send(sender=None, source="fec_committees", model=Organization, external_ids=["C00009999"])
+        self.assertEqual(self.search(q="gadget")[0]["id"], "C00009999")
+        self.assertEqual(self.search(q="widget", type="organization"), [])
+
+    def test_rows_synced_by_other_processes_are_picked_up(self):
+        self.search(q="widget")
+        # another process's ingest: the rows and checkpoint change but this process gets no signal
+        Organization.objects.filter(external_id="C00009999").update(name="GADGET MAKERS PAC", synced_at=timezone.now())
+        SyncCheckpoint.objects.filter(source="fec_committees").update(updated_at=timezone.now())
+        self.assertEqual(self.search(q="gadget"), [])
+        with self.settings(SEARCH_INDEX_REFRESH_INTERVAL=0):
+            self.assertEqual(self.search(q="gadget")[0]["id"], "C00009999")
+
+    def test_bad_params(self):
+        self.assertEqual(self.client.get("/api/v1/search/").status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/search/", {"q": "x", "type": "senator"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/search/", {"q": "widget", "limit": "x"}).status_code, 400)
+        self.assertEqual(len(self.search(q="widget", limit=-3)), 1)
@@ -0,0 +1,38 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+from core_app.docs import openapi, swagger_auto_schema
+from core_app.params import InvalidQuery, limit_param
+from .backends import ENTITIES, get_backend
+
+MAX_LIMIT = 50
+
+# Create your views here.
+class Search(APIView):
+    '''Search candidates, organizations and bills'''
+    @swagger_auto_schema(
+        operation_summary="Search federal data",
+        operation_description="Full text search over candidates, organizations and bills. mode=typeahead matches name prefixes for autocomplete.",
+        manual_parameters=[
+            openapi.Parameter("q", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter("type", openapi.IN_QUERY, type=openapi.TYPE_STRING, description="comma separated: candidate, organization, bill"),
+            openapi.Parameter("mode", openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=["full", "typeahead"]),
+            openapi.Parameter("limit", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: "Ranked results."},
+    )
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response("q is required.", status=HTTP_400_BAD_REQUEST)
+        types = request.query_params.get("type")
+        types = types.split(",") if types else list(ENTITIES)
+        if set(types) - set(ENTITIES):
+            return Response(f"type must be one of {', '.join(ENTITIES)}.", status=HTTP_400_BAD_REQUEST)
+        try:
+            limit = limit_param(request.query_params, 20, MAX_LIMIT)
+        except InvalidQuery as e:
+            return Response(str(e), status=HTTP_400_BAD_REQUEST)
+        typeahead = request.query_params.get("mode") == "typeahead"
+        results = get_backend().search(query, types, limit, typeahead=typeahead)
+        return Response({"query": query, "results": results}, status=HTTP_200_OK)
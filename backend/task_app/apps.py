@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class TaskAppConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'task_app'
+
+    def ready(self):
+        # register the @task functions in every app's tasks module
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules("tasks")
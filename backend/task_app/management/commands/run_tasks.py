@@ -0,0 +1,22 @@
+import signal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from task_app.queue import Worker
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks; start as many of these as the work needs, they share the queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queues", default="default", help="comma separated queues to take tasks from")
+        parser.add_argument("--concurrency", type=int, default=getattr(settings, "TASK_WORKER_CONCURRENCY", 4), help="tasks run at once by this worker")
+        parser.add_argument("--burst", action="store_true", help="exit once no task is due instead of polling")
+
+    def handle(self, *args, **options):
+        worker = Worker(queues=options["queues"].split(","), concurrency=options["concurrency"])
+        if not options["burst"]:
+            # finish the tasks in hand on shutdown, anything killed mid-run is requeued after TASK_LOCK_TIMEOUT
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: worker.stop())
+        ran = worker.run(burst=options["burst"])
+        self.stdout.write(f"ran {ran} tasks")
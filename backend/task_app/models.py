@@ -0,0 +1,45 @@
+from django.db import models
+from django.db.models import Q
+
+# Create your models here.
+
+class Task(models.Model):
+    '''A queued call of a registered task, claimed by run_tasks workers with SELECT ... FOR UPDATE SKIP LOCKED'''
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    name = models.CharField(max_length=200)
+    queue = models.CharField(max_length=50, default="default")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    # higher runs first
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    run_at = models.DateTimeField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    # at most one queued task per key, later enqueues of the same key are dropped
+    unique_key = models.CharField(max_length=200, null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["unique_key"], condition=Q(status="queued"), name="task_unique_queued_key"),
+        ]
+        indexes = [
+            # the claim query: due tasks of a queue, best priority first
+            models.Index(fields=["queue", "-priority", "run_at", "id"], condition=Q(status="queued"), name="task_claim_idx"),
+            models.Index(fields=["status", "locked_at"], name="task_status_locked_idx"),
+        ]
+
+
+class TaskLimit(models.Model):
+    '''Locked while claiming tasks of a name with a concurrency limit, so workers can't overshoot it together'''
+    name = models.CharField(max_length=200, unique=True)
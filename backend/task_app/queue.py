@@ -0,0 +1,323 @@
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from .models import Task, TaskLimit
+
+logger = logging.getLogger("publiceyeusa.tasks")
+
+# task name -> TaskFunction, filled by @task as apps' tasks modules are imported
+registry = {}
+
+
+class TaskFunction:
+    '''A function registered with @task; call it directly or enqueue it for a worker'''
+
+    def __init__(self, func, name, queue, priority, max_attempts, concurrency):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, **kwargs):
+        return enqueue(self, args, kwargs)
+
+    def enqueue_with(self, args=(), kwargs=None, **options):
+        return enqueue(self, args, kwargs, **options)
+
+
+def task(name=None, queue="default", priority=0, max_attempts=5, concurrency=None):
+    '''Register a function as a background task
+
+    concurrency caps how many of it run at once across all workers, None is unlimited.
+    Arguments must be JSON serializable, they are stored with the queued row.
+    '''
+    def register(func):
+        function = TaskFunction(func, name or f"{func.__module__}.{func.__qualname__}", queue, priority, max_attempts, concurrency)
+        registry[function.name] = function
+        return function
+    return register
+
+
+def enqueue(function, args=(), kwargs=None, priority=None, delay=0, unique_key=None):
+    '''Queue a call, in the caller's transaction so it only becomes visible if that commits
+
+    With a unique_key the call is dropped while another with the same key is still queued,
+    and None is returned instead of the Task.
+    '''
+    row = Task(
+        name=function.name,
+        queue=function.queue,
+        args=list(args),
+        kwargs=kwargs or {},
+        priority=function.priority if priority is None else priority,
+        max_attempts=function.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        unique_key=unique_key,
+    )
+    if unique_key is None:
+        row.save()
+        return row
+    Task.objects.bulk_create([row], ignore_conflicts=True)
+    return None
+
+
+def backoff(attempts):
+    '''Seconds before retry number attempts: exponential, capped, with jitter so failures don't retry in lockstep'''
+    base = getattr(settings, "TASK_BACKOFF_BASE", 5)
+    delay = min(getattr(settings, "TASK_BACKOFF_MAX", 3600), base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1)
+
+
+def limit_of(name):
+    function = registry.get(name)
+    return function.concurrency if function is not None else None
+
+
+def saturated_names():
+    '''Limited task names already running at their limit, left out of the claim query'''
+    limited = {name: function.concurrency for name, function in registry.items() if function.concurrency}
+    if not limited:
+        return []
+    running = Task.objects.filter(status=Task.RUNNING, name__in=limited).values("name").annotate(running=Count("id"))
+    return [row["name"] for row in running if row["running"] >= limited[row["name"]]]
+
+
+def within_limits(candidates):
+    '''Drop candidates that would take a task name past its concurrency limit'''
+    limited = sorted({row.name for row in candidates if limit_of(row.name)})
+    if not limited:
+        return candidates
+    TaskLimit.objects.bulk_create([TaskLimit(name=name) for name in limited], ignore_conflicts=True)
+    # claimers of the same names queue up here; locking in name order rules out deadlocks
+    list(TaskLimit.objects.select_for_update().filter(name__in=limited).order_by("name"))
+    running = dict(
+        Task.objects.filter(status=Task.RUNNING, name__in=limited).values("name").annotate(running=Count("id")).values_list("name", "running")
+    )
+    kept = []
+    for row in candidates:
+        limit = limit_of(row.name)
+        if limit:
+            if running.get(row.name, 0) >= limit:
+                continue
+            running[row.name] = running.get(row.name, 0) + 1
+        kept.append(row)
+    return kept
+
+
+def claim(worker_id, queues, count):
+    '''Mark up to count due tasks as running for this worker
+
+    SKIP LOCKED lets concurrent workers pass over rows another worker is claiming instead of
+    waiting on them, so every worker gets a different batch.
+    '''
+    now = timezone.now()
+    with transaction.atomic():
+        candidates = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(status=Task.QUEUED, queue__in=queues, run_at__lte=now)
+            .exclude(name__in=saturated_names())
+            .order_by("-priority", "run_at", "id")[:count]
+        )
+        claimed = within_limits(candidates)
+        if claimed:
+            Task.objects.filter(id__in=[row.id for row in claimed]).update(
+                status=Task.RUNNING, locked_by=worker_id, locked_at=now, attempts=F("attempts") + 1
+            )
+    for row in claimed:
+        row.status, row.locked_by, row.locked_at, row.attempts = Task.RUNNING, worker_id, now, row.attempts + 1
+    return claimed
+
+
+def finish(row, **fields):
+    '''Move a claimed task on; a keyed task whose retry collides with a newer queued one is superseded by it'''
+    fields.update(locked_by="", locked_at=None)
+    try:
+        with transaction.atomic():
+            Task.objects.filter(id=row.id).update(**fields)
+    except IntegrityError:
+        Task.objects.filter(id=row.id).update(
+            status=Task.FAILED, finished_at=timezone.now(), locked_by="", locked_at=None,
+            last_error=f"{fields.get('last_error', '')}\nsuperseded by a newer queued task",
+        )
+
+
+def run_task(row):
+    '''Run a claimed task and record the outcome: done, queued again after a backoff, or failed'''
+    function = registry.get(row.name)
+    try:
+        if function is None:
+            raise LookupError(f"No task registered as {row.name}")
+        function.func(*row.args, **row.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if function is None or row.attempts >= row.max_attempts:
+            logger.error("task %s (%s) failed for good after %d attempts\n%s", row.id, row.name, row.attempts, error)
+            finish(row, status=Task.FAILED, finished_at=timezone.now(), last_error=error)
+        else:
+            logger.warning("task %s (%s) failed, attempt %d of %d\n%s", row.id, row.name, row.attempts, row.max_attempts, error)
+            finish(row, status=Task.QUEUED, run_at=timezone.now() + timedelta(seconds=backoff(row.attempts)), last_error=error)
+        return False
+    finish(row, status=Task.DONE, finished_at=timezone.now(), last_error="")
+    return True
+
+
+def requeue_stale(timeout):
+    '''Recover tasks whose worker died mid-run, counting the lost run as an attempt'''
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = list(Task.objects.filter(status=Task.RUNNING, locked_at__lt=cutoff))
+    for row in stale:
+        error = f"worker {row.locked_by} stopped responding"
+        if row.attempts >= row.max_attempts:
+            finish(row, status=Task.FAILED, finished_at=timezone.now(), last_error=error)
+        else:
+            finish(row, status=Task.QUEUED, run_at=timezone.now(), last_error=error)
+    return len(stale)
+
+
+def purge_finished(days):
+    cutoff = timezone.now() - timedelta(days=days)
+    return Task.objects.filter(status__in=[Task.DONE, Task.FAILED], finished_at__lt=cutoff).delete()[0]
+
+
+def heartbeat(worker_id, task_ids):
+    '''Refresh the lock of tasks this worker is still running, so requeue_stale leaves them alone'''
+    if not task_ids:
+        return 0
+    return Task.objects.filter(id__in=task_ids, status=Task.RUNNING, locked_by=worker_id).update(locked_at=timezone.now())
+
+
+class Worker:
+    '''Claims and runs tasks from the database; with concurrency above 1 they run on a thread pool
+
+    A heartbeat thread refreshes locked_at of the running tasks every TASK_HEARTBEAT_INTERVAL
+    seconds, so only tasks of a worker that died go stale, however long they run.
+    '''
+
+    def __init__(self, queues=("default",), concurrency=1, poll_interval=None, worker_id=None):
+        self.queues = list(queues)
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval if poll_interval is not None else getattr(settings, "TASK_POLL_INTERVAL", 1.0)
+        self.id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+        self._active = set()
+        self._running = set()
+        self._finished = 0
+        self._lock = threading.Lock()
+        self._last_housekeeping = None
+
+    def housekeeping(self):
+        requeued = requeue_stale(getattr(settings, "TASK_LOCK_TIMEOUT", 600))
+        if requeued:
+            logger.warning("requeued %d tasks from lost workers", requeued)
+        purge_finished(getattr(settings, "TASK_KEEP_FINISHED_DAYS", 7))
+
+    def housekeeping_due(self):
+        '''Run housekeeping when TASK_HOUSEKEEPING_INTERVAL seconds have passed since the last time'''
+        interval = getattr(settings, "TASK_HOUSEKEEPING_INTERVAL", 60)
+        if self._last_housekeeping is None or time.monotonic() - self._last_housekeeping >= interval:
+            self.housekeeping()
+            self._last_housekeeping = time.monotonic()
+
+    def beat(self):
+        with self._lock:
+            running = list(self._running)
+        heartbeat(self.id, running)
+
+    def _beat_until(self, done):
+        interval = getattr(settings, "TASK_HEARTBEAT_INTERVAL", 60)
+        while not done.wait(interval):
+            try:
+                self.beat()
+            except Exception:
+                logger.exception("task heartbeat failed")
+            finally:
+                close_old_connections()
+
+    def execute(self, row):
+        close_old_connections()
+        with self._lock:
+            self._running.add(row.id)
+        try:
+            return run_task(row)
+        finally:
+            with self._lock:
+                self._running.discard(row.id)
+            # worker threads hold their own connections, give them back like a request would
+            close_old_connections()
+
+    def run_inline(self, burst):
+        ran = 0
+        while not self.stopping.is_set():
+            self.housekeeping_due()
+            claimed = claim(self.id, self.queues, 1)
+            if not claimed:
+                if burst:
+                    break
+                self.stopping.wait(self.poll_interval)
+                continue
+            self.execute(claimed[0])
+            ran += 1
+        return ran
+
+    def run(self, burst=False):
+        '''Work until stop() is called, or with burst until nothing is due; returns how many tasks ran'''
+        done = threading.Event()
+        beating = threading.Thread(target=self._beat_until, args=(done,), name="task-heartbeat", daemon=True)
+        beating.start()
+        try:
+            if self.concurrency == 1:
+                return self.run_inline(burst)
+            return self.run_pool(burst)
+        finally:
+            done.set()
+            beating.join()
+
+    def run_pool(self, burst):
+        self._finished = 0
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="task") as pool:
+            while not self.stopping.is_set():
+                self.housekeeping_due()
+                with self._lock:
+                    free = self.concurrency - len(self._active)
+                claimed = claim(self.id, self.queues, free) if free else []
+                for row in claimed:
+                    future = pool.submit(self.execute, row)
+                    with self._lock:
+                        self._active.add(future)
+                    future.add_done_callback(self._done)
+                if not claimed:
+                    with self._lock:
+                        idle = not self._active
+                    if burst and idle:
+                        break
+                    self.stopping.wait(self.poll_interval)
+        # leaving the pool waited for every submitted task, so this counts all that finished
+        return self._finished
+
+    def _done(self, future):
+        error = future.exception()
+        if error is not None:
+            logger.error("task worker thread failed", exc_info=error)
+        with self._lock:
+            self._active.discard(future)
+            if error is None:
+                self._finished += 1
+
+    def stop(self):
+        self.stopping.set()
@@ -0,0 +1,123 @@
+from concurrent.futures import Future
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase
+from django.utils import timezone
+from .models import Task
+from .queue import Worker, claim, heartbeat, requeue_stale, task
+
+calls = []
+
+
+@task(name="tests.record")
+def record(value):
+    calls.append(value)
+
+
+@task(name="tests.flaky", max_attempts=2)
+def flaky():
+    calls.append("flaky")
+    raise RuntimeError("upstream down")
+
+
+@task(name="tests.limited", concurrency=1)
+def limited():
+    calls.append("limited")
+
+
+@task(name="tests.strand")
+def strand(task_id):
+    # leave another task behind the way a dead worker would
+    Task.objects.filter(id=task_id).update(status=Task.RUNNING, locked_by="gone", locked_at=timezone.now() - timedelta(hours=1))
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_runs_by_priority(self):
+        record.enqueue("low")
+        record.enqueue_with(args=["high"], priority=5)
+        record.enqueue_with(args=["later"], delay=60)
+        self.assertEqual(Worker().run(burst=True), 2)
+        self.assertEqual(calls, ["high", "low"])
+        self.assertEqual(Task.objects.filter(status=Task.DONE).count(), 2)
+        self.assertEqual(Task.objects.get(status=Task.QUEUED).args, ["later"])
+
+    def test_unique_key_dedupes_queued_calls(self):
+        record.enqueue_with(args=["a"], unique_key="k")
+        record.enqueue_with(args=["b"], unique_key="k")
+        Worker().run(burst=True)
+        self.assertEqual(calls, ["a"])
+        # once the first has run the key is free again
+        record.enqueue_with(args=["c"], unique_key="k")
+        self.assertEqual(Task.objects.filter(status=Task.QUEUED).count(), 1)
+
+    def test_failures_retry_with_backoff_then_fail(self):
+        row = flaky.enqueue()
+        with self.assertLogs("publiceyeusa.tasks", "WARNING"):
+            Worker().run(burst=True)
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (Task.QUEUED, 1))
+        self.assertGreater(row.run_at, timezone.now())
+        self.assertIn("upstream down", row.last_error)
+        Task.objects.filter(id=row.id).update(run_at=timezone.now())
+        with self.assertLogs("publiceyeusa.tasks", "ERROR"):
+            Worker().run(burst=True)
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (Task.FAILED, 2))
+        self.assertEqual(calls, ["flaky", "flaky"])
+
+    def test_concurrency_limit(self):
+        limited.enqueue()
+        limited.enqueue()
+        record.enqueue("other")
+        claimed = claim("w1", ["default"], 10)
+        self.assertEqual(sorted(row.name for row in claimed), ["tests.limited", "tests.record"])
+        # the second waits for the running one, whichever worker asks
+        self.assertEqual(claim("w2", ["default"], 10), [])
+
+    def test_lost_worker_tasks_are_requeued(self):
+        row = record.enqueue("again")
+        claim("w1", ["default"], 1)
+        Task.objects.filter(id=row.id).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(600), 1)
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts, row.locked_by), (Task.QUEUED, 1, ""))
+
+    def test_command(self):
+        record.enqueue("cmd")
+        out = StringIO()
+        call_command("run_tasks", "--burst", "--concurrency=1", stdout=out)
+        self.assertEqual(calls, ["cmd"])
+        self.assertIn("ran 1 tasks", out.getvalue())
+
+    def test_heartbeat_keeps_long_tasks_locked(self):
+        row = record.enqueue("slow")
+        claim("w1", ["default"], 1)
+        Task.objects.filter(id=row.id).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(heartbeat("w2", [row.id]), 0)
+        self.assertEqual(heartbeat("w1", [row.id]), 1)
+        self.assertEqual(requeue_stale(600), 0)
+
+    def test_single_threaded_workers_keep_housekeeping(self):
+        stranded = record.enqueue("rescued")
+        strand.enqueue_with(args=[stranded.id], priority=5)
+        with self.settings(TASK_HOUSEKEEPING_INTERVAL=0), self.assertLogs("publiceyeusa.tasks", "WARNING"):
+            self.assertEqual(Worker().run(burst=True), 2)
+        self.assertEqual(calls, ["rescued"])
+
+
+    def test_pool_counts_finished_tasks(self):
+        # run_pool returns what _done counted; a thread that died mid-task isn't a task that ran
+        worker = Worker(concurrency=2)
+        ran, died = Future(), Future()
+        ran.set_result(True)
+        died.set_exception(OperationalError("database table is locked"))
+        worker._active.update([ran, died])
+        worker._done(ran)
+        with self.assertLogs("publiceyeusa.tasks", "ERROR"):
+            worker._done(died)
+        self.assertEqual((worker._finished, worker._active), (1, set()))
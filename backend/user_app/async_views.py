@@ -0,0 +1,153 @@
+import json
+from asgiref.sync import sync_to_async
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_404_NOT_FOUND,
+    HTTP_429_TOO_MANY_REQUESTS,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
+from core_app.instrumentation import registry
+from core_app.renderers import dumps
+from core_app.throttling import AUTH_THROTTLES, throttle_wait
+from .authentication import aauthenticate
+from .hashing import PoolSaturated, hashing_pool
+from .sessions import asession_login
+from .models import User
+
+# Async versions of Register, Admin and Login. They answer exactly like the DRF views
+# but run password hashing on hashing_pool, so a login burst can't starve other endpoints.
+# AsyncTokenReq and AsyncInfo are the read side: token auth and the ORM without a thread per request.
+
+
+def overloaded():
+    registry.count_event("shed", "hashing_pool")
+    return JsonResponse("Too many sign-in requests, try again shortly.", safe=False, status=HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
+
+
+async def throttled(request, view, data):
+    # same limits and 429 body as the DRF views; the store may be a network cache so keep it off the loop
+    wait = await sync_to_async(throttle_wait, thread_sensitive=False)(view.throttle_classes, request, view, data)
+    if wait is None:
+        return None
+    return JsonResponse({"detail": f"Request was throttled. Expected available in {wait} seconds."}, status=HTTP_429_TOO_MANY_REQUESTS, headers={"Retry-After": str(wait)})
+
+
+def json_response(data, status=HTTP_200_OK, headers=None):
+    # the same bytes DRF's JSONRenderer would produce for the sync view
+    return HttpResponse(dumps(data), content_type="application/json", status=status, headers=headers)
+
+
+def api_error(exc):
+    '''An APIException as DRF's exception handler would render it'''
+    headers = {"WWW-Authenticate": "Token"} if isinstance(exc, (AuthenticationFailed, NotAuthenticated)) else None
+    return json_response({"detail": exc.detail}, status=exc.status_code, headers=headers)
+
+
+def read_json(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def acreate_user_or_return_exception(request, data, is_staff=False):
+    data = dict(data)
+    data['username'] = data.get("email")
+    new_user = User(**data)
+    try:
+        await sync_to_async(new_user.full_clean)()
+    except ValidationError as e:
+        return e
+    # same steps as UserManager.create_user with the hash computed on the pool
+    new_user.email = User.objects.normalize_email(new_user.email)
+    new_user.username = User.normalize_username(new_user.username)
+    new_user.password = await hashing_pool.run(make_password, data.get("password"))
+    new_user.is_staff = is_staff
+    new_user.is_superuser = is_staff
+    await new_user.asave()
+    token = await Token.objects.acreate(user=new_user)
+    await asession_login(request, new_user)
+    return [new_user, token]
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncAdmin(View):
+    is_staff = True
+    throttle_classes = AUTH_THROTTLES
+    throttle_scope = "register"
+
+    async def post(self, request):
+        data = read_json(request)
+        if data is None:
+            return JsonResponse("Invalid JSON body.", safe=False, status=HTTP_400_BAD_REQUEST)
+        rejected = await throttled(request, self, data)
+        if rejected:
+            return rejected
+        try:
+            creds_or_err = await acreate_user_or_return_exception(request, data, is_staff=self.is_staff)
+        except PoolSaturated:
+            return overloaded()
+        if type(creds_or_err) == list:
+            user, token = creds_or_err
+            return JsonResponse({"user":user.email, "token":token.key}, status=HTTP_201_CREATED)
+        return JsonResponse(creds_or_err.message_dict, status=HTTP_400_BAD_REQUEST)
+
+
+class AsyncRegister(AsyncAdmin):
+    is_staff = False
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncLogin(View):
+    throttle_classes = AUTH_THROTTLES
+    throttle_scope = "login"
+
+    async def post(self, request):
+        data = read_json(request)
+        if data is None:
+            return JsonResponse("Invalid JSON body.", safe=False, status=HTTP_400_BAD_REQUEST)
+        rejected = await throttled(request, self, data)
+        if rejected:
+            return rejected
+        try:
+            # authenticate does the user lookup and the PBKDF2 check, both on the pool
+            user = await hashing_pool.run(authenticate, username=data.get("email"), password=data.get("password"))
+        except PoolSaturated:
+            return overloaded()
+        if user:
+            token, created = await Token.objects.aget_or_create(user = user)
+            await asession_login(request, user)
+            return JsonResponse({"user":user.email, "token":token.key}, status=HTTP_200_OK)
+        return JsonResponse("Invalid credentials.", safe=False, status=HTTP_404_NOT_FOUND)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncTokenReq(View):
+    '''TokenReq for async views: CachedTokenAuthentication and IsAuthenticated, on the event loop'''
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            credentials = await aauthenticate(request)
+        except APIException as e:
+            return api_error(e)
+        if credentials is None:
+            return api_error(NotAuthenticated())
+        request.user, request.auth = credentials
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncInfo(AsyncTokenReq):
+    async def get(self, request):
+        return json_response(request.user.email)
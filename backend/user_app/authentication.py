@@ -0,0 +1,181 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from core_app import asynccache
+
+
+class TokenCache:
+    '''Bounded in-process LRU of token key -> token (with its user), backed by an optional Django cache tier'''
+
+    def __init__(self, max_entries=None, ttl=None, local_ttl=None, alias=None):
+        self.max_entries = max_entries or getattr(settings, "TOKEN_CACHE_MAX_ENTRIES", 1024)
+        self.ttl = ttl or getattr(settings, "TOKEN_CACHE_TTL", 300)
+        # the local tier can't see invalidations made by other workers so it keeps a shorter ttl
+        self.local_ttl = local_ttl or getattr(settings, "TOKEN_CACHE_LOCAL_TTL", 30)
+        self.alias = alias if alias is not None else getattr(settings, "TOKEN_CACHE_ALIAS", None)
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def _shared(self):
+        # shared tier is only used when a cache alias is configured
+        if self.alias:
+            return caches[self.alias]
+        return None
+
+    def _shared_key(self, key):
+        # never put raw token keys into the shared cache
+        return "authtoken:" + hashlib.sha256(key.encode()).hexdigest()
+
+    def _get_local(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                token, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    return _detach(token)
+                self._drop(key)
+        return None
+
+    def get(self, key):
+        token = self._get_local(key)
+        if token is not None:
+            return token
+        shared = self._shared()
+        if shared is not None:
+            token = shared.get(self._shared_key(key))
+            if token is not None:
+                self._remember(key, token)
+                return _detach(token)
+        return None
+
+    async def aget(self, key):
+        # the local tier is a dict lookup, only the shared tier may leave the event loop
+        token = self._get_local(key)
+        if token is not None:
+            return token
+        shared = self._shared()
+        if shared is not None:
+            token = await asynccache.aget(shared, self._shared_key(key))
+            if token is not None:
+                self._remember(key, token)
+                return _detach(token)
+        return None
+
+    def set(self, key, token):
+        token = _detach(token)
+        self._remember(key, token)
+        shared = self._shared()
+        if shared is not None:
+            shared.set(self._shared_key(key), token, self.ttl)
+
+    async def aset(self, key, token):
+        token = _detach(token)
+        self._remember(key, token)
+        shared = self._shared()
+        if shared is not None:
+            await asynccache.aset(shared, self._shared_key(key), token, self.ttl)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._drop(key)
+        shared = self._shared()
+        if shared is not None:
+            shared.delete(self._shared_key(key))
+
+    def invalidate_user(self, user_pk, keys=()):
+        # drop every key we know belongs to the user plus any the caller looked up
+        with self._lock:
+            known = self._keys_by_user.get(user_pk, set())
+            keys = set(keys) | known
+            for key in keys:
+                self._drop(key)
+        shared = self._shared()
+        if shared is not None and keys:
+            shared.delete_many([self._shared_key(key) for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remember(self, key, token):
+        with self._lock:
+            self._entries[key] = (token, time.monotonic() + min(self.local_ttl, self.ttl))
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(token.user_id, set()).add(key)
+            # evict least recently used entries past the bound
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+
+    def _drop(self, key):
+        # caller must hold the lock
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._keys_by_user.get(entry[0].user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_user[entry[0].user_id]
+
+
+def _detach(token):
+    '''Copy a cached token and its user so a request can't mutate the shared instances'''
+    user = copy.copy(token.user)
+    token = copy.copy(token)
+    token.user = user
+    user.auth_token = token
+    return token
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    '''TokenAuthentication that serves warm tokens from token_cache instead of the Token + User join'''
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is not None:
+            return (token.user, token)
+        # cold path raises AuthenticationFailed for unknown tokens and inactive users
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, token)
+        return (user, token)
+
+
+class TokenKeyAuthentication(TokenAuthentication):
+    '''TokenAuthentication's header parsing on its own: authenticate() returns the key, or None'''
+
+    def authenticate_credentials(self, key):
+        return key
+
+
+_token_key = TokenKeyAuthentication()
+_authenticator = CachedTokenAuthentication()
+
+
+async def aauthenticate(request):
+    '''CachedTokenAuthentication for async views: (user, token), None without credentials
+
+    Parsing and the cold lookup are CachedTokenAuthentication's own, so the AuthenticationFailed
+    messages match; a warm token is read from token_cache without leaving the event loop.
+    '''
+    key = _token_key.authenticate(request)
+    if key is None:
+        return None
+    token = await token_cache.aget(key)
+    if token is None:
+        _, token = await sync_to_async(_authenticator.authenticate_credentials)(key)
+    # like a DRF view, so middleware sees who made the request
+    request.user = token.user
+    return (token.user, token)
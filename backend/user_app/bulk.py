@@ -0,0 +1,293 @@
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from rest_framework.authtoken.models import Token
+from profile_app.bootstrap import invalidate_bootstraps
+from profile_app.models import Profile
+from .models import User
+
+# exactly what import_users reads back
+EXPORT_FIELDS = ["email", "password_hash", "display_name"]
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+
+
+def open_private(path, mode="w"):
+    '''Open a file for writing that only its owner can read, whatever the umask: exports hold password hashes'''
+    flags = os.O_CREAT | (os.O_RDWR if "+" in mode else os.O_WRONLY)
+    if mode.startswith("w"):
+        flags |= os.O_TRUNC
+    fd = os.open(path, flags, 0o600)
+    # the mode only applies to new files, one left by an earlier run is tightened too
+    os.fchmod(fd, 0o600)
+    return os.fdopen(fd, mode, newline="")
+
+
+def read_rows(stream, fmt):
+    '''Yield (line number, row dict) from a CSV or NDJSON stream without loading it'''
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # physical line, which is what an error report should point at
+            yield reader.line_num, row
+    else:
+        for number, line in enumerate(stream, 1):
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield number, row if isinstance(row, dict) else {"__invalid__": "not a JSON object"}
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Checkpoint:
+    '''JSON file recording how far an import or export got, rewritten atomically after every batch'''
+
+    def __init__(self, path):
+        self.path = path
+        self.state = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def get(self, key, default=None):
+        return self.state.get(key, default)
+
+    def save(self, **state):
+        self.state.update(state)
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open_private(tmp) as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        self.state = {}
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    created: int = 0
+    existing: int = 0
+    errors: list = field(default_factory=list)
+
+
+def _init_worker():
+    # forked workers inherit configured settings, spawned ones have to set django up themselves
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _hash_password(password):
+    return make_password(password)
+
+
+class PasswordHasher:
+    '''Hashes a batch of passwords across worker processes, PBKDF2 being most of an import's CPU time'''
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+
+    def hash(self, passwords):
+        if not self.workers:
+            return [make_password(password) for password in passwords]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self._executor.map(_hash_password, passwords, chunksize=chunksize))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+
+
+def clean_batch(batch):
+    '''Validate a batch of rows with one query for existing emails
+
+    Returns (valid rows, number of rows whose email already exists, [(line, errors)]).
+    '''
+    email_field = User._meta.get_field("email")
+    username_field = User._meta.get_field("username")
+    display_name_field = Profile._meta.get_field("display_name")
+    valid, errors, seen = [], [], set()
+    for line, row in batch:
+        problems = {}
+        if "__invalid__" in row:
+            errors.append((line, {"row": [row["__invalid__"]]}))
+            continue
+        email = (row.get("email") or "").strip()
+        try:
+            email_field.clean(email, None)
+            username_field.clean(email, None)
+        except ValidationError as e:
+            problems["email"] = e.messages
+        if email in seen:
+            problems["email"] = ["duplicated in this batch"]
+        password, password_hash = row.get("password") or "", row.get("password_hash") or ""
+        if password_hash:
+            try:
+                identify_hasher(password_hash)
+            except ValueError:
+                problems["password_hash"] = ["unknown hashing algorithm"]
+        elif not password:
+            problems["password"] = ["password or password_hash is required"]
+        display_name = row.get("display_name") or None
+        if display_name is not None:
+            try:
+                display_name_field.clean(display_name, None)
+            except ValidationError as e:
+                problems["display_name"] = e.messages
+        if problems:
+            errors.append((line, problems))
+            continue
+        seen.add(email)
+        valid.append({"email": email, "password": password, "password_hash": password_hash, "display_name": display_name})
+    existing = set(User.objects.filter(email__in=[row["email"] for row in valid]).values_list("email", flat=True))
+    return [row for row in valid if row["email"] not in existing], len(existing), errors
+
+
+def copy_objects(model, objs):
+    '''Insert unsaved model instances with Postgres COPY, no ids come back'''
+    fields = [f for f in model._meta.concrete_fields if not f.primary_key or not f.auto_created]
+    columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+    with connection.cursor() as cursor:
+        # psycopg 3 streams rows straight into the table
+        with cursor.cursor.copy(f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN") as copy:
+            for obj in objs:
+                copy.write_row([f.get_db_prep_save(f.pre_save(obj, True), connection) for f in fields])
+
+
+def insert_users(rows, hasher, use_copy=False):
+    '''Create users, tokens and profiles for validated rows in one transaction'''
+    to_hash = [row["password"] for row in rows if not row["password_hash"]]
+    hashed = iter(hasher.hash(to_hash))
+    users = [
+        User(username=row["email"], email=row["email"], password=row["password_hash"] or next(hashed))
+        for row in rows
+    ]
+    with transaction.atomic():
+        if use_copy:
+            copy_objects(User, users)
+        else:
+            User.objects.bulk_create(users)
+        # COPY (and bulk_create on backends without RETURNING) leave ids unset
+        if all(user.pk for user in users):
+            ids = {user.email: user.pk for user in users}
+        else:
+            ids = dict(User.objects.filter(email__in=[user.email for user in users]).values_list("email", "id"))
+        tokens = [Token(key=Token.generate_key(), user_id=ids[row["email"]]) for row in rows]
+        profiles = [Profile(user_id=ids[row["email"]], display_name=row["display_name"]) for row in rows]
+        if use_copy:
+            copy_objects(Token, tokens)
+            copy_objects(Profile, profiles)
+        else:
+            Token.objects.bulk_create(tokens)
+            Profile.objects.bulk_create(profiles)
+    # bulk inserts send no post_save, so a bootstrap cached before the profile existed goes here
+    invalidate_bootstraps(ids.values())
+    return len(users)
+
+
+def import_users(stream, fmt, batch_size=1000, workers=None, use_copy=False, checkpoint=None, progress=None):
+    '''Stream rows into User, Token and Profile a batch at a time, resuming after the last committed batch
+
+    Rows for emails that already exist are skipped, so re-running an interrupted import is safe
+    even without a checkpoint.
+    '''
+    checkpoint = checkpoint or Checkpoint(None)
+    stats = ImportStats(rows=checkpoint.get("rows", 0), created=checkpoint.get("created", 0), existing=checkpoint.get("existing", 0))
+    skip = stats.rows
+    hasher = PasswordHasher(os.cpu_count() if workers is None else workers)
+    rows = ((line, row) for number, (line, row) in enumerate(read_rows(stream, fmt)) if number >= skip)
+    try:
+        for batch in batched(rows, batch_size):
+            valid, existing, errors = clean_batch(batch)
+            if valid:
+                stats.created += insert_users(valid, hasher, use_copy)
+            stats.rows += len(batch)
+            stats.existing += existing
+            stats.errors.extend(errors)
+            checkpoint.save(rows=stats.rows, created=stats.created, existing=stats.existing)
+            if progress:
+                progress(stats)
+    finally:
+        hasher.close()
+    checkpoint.clear()
+    return stats
+
+
+def export_rows(batch_size=1000, after_id=0):
+    '''Yield (id, row) for every user in id order, one keyset page in memory at a time'''
+    while True:
+        page = list(
+            User.objects.filter(id__gt=after_id).order_by("id")
+            .values_list("id", "email", "password", "user_profile__display_name")[:batch_size]
+        )
+        if not page:
+            return
+        for user_id, email, password, display_name in page:
+            yield user_id, dict(zip(EXPORT_FIELDS, (email, password, display_name or "")))
+        after_id = page[-1][0]
+
+
+class RowWriter:
+    def __init__(self, stream, fmt, header):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == "csv":
+            self.writer = csv.DictWriter(stream, fieldnames=EXPORT_FIELDS)
+            if header:
+                self.writer.writeheader()
+
+    def write(self, row):
+        if self.fmt == "csv":
+            self.writer.writerow(row)
+        else:
+            self.stream.write(json.dumps(row) + "\n")
+
+
+def export_users(stream, fmt, batch_size=1000, checkpoint=None, progress=None):
+    '''Write users to stream, saving the last written id after each page so a rerun can append'''
+    checkpoint = checkpoint or Checkpoint(None)
+    after_id = checkpoint.get("last_id", 0)
+    exported = checkpoint.get("exported", 0)
+    writer = RowWriter(stream, fmt, header=not after_id)
+    for number, (user_id, row) in enumerate(export_rows(batch_size, after_id), 1):
+        writer.write(row)
+        exported += 1
+        if number % batch_size == 0:
+            stream.flush()
+            # the byte offset lets a resumed export cut off rows written after this checkpoint
+            checkpoint.save(last_id=user_id, exported=exported, offset=stream.tell())
+            if progress:
+                progress(exported)
+    stream.flush()
+    checkpoint.clear()
+    return exported
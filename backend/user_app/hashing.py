@@ -0,0 +1,57 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+
+
+class PoolSaturated(Exception):
+    '''Raised instead of queueing when the hashing pool is already at its limit'''
+
+
+class HashingPool:
+    '''Size-bounded executor for password hashing with a queue-depth limit
+
+    PBKDF2 releases the GIL, so a few threads keep the hashing off the event loop and off
+    the thread every sync view shares. Work beyond max_workers + max_queue is rejected
+    right away so callers can shed load instead of piling up behind a login burst.
+    '''
+
+    def __init__(self, max_workers=None, max_queue=None):
+        self.max_workers = max_workers or getattr(settings, "HASHING_POOL_WORKERS", 4)
+        self.max_queue = max_queue if max_queue is not None else getattr(settings, "HASHING_POOL_QUEUE", 32)
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hashing")
+        return self._executor
+
+    def _call(self, fn, args, kwargs):
+        # pool threads keep their own db connections, so recycle them like a request would
+        close_old_connections()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    async def run(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise PoolSaturated()
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), self._call, fn, args, kwargs)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+hashing_pool = HashingPool()
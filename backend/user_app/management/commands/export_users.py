@@ -0,0 +1,36 @@
+import os
+from django.core.management.base import BaseCommand
+from user_app.bulk import Checkpoint, detect_format, export_users, open_private
+
+
+class Command(BaseCommand):
+    help = "Stream every user (email, password_hash, display_name) to a CSV or NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="default from the file extension")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--checkpoint", help="checkpoint file, default <path>.checkpoint")
+        parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and rewrite the file")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        checkpoint = Checkpoint(options["checkpoint"] or f"{path}.checkpoint")
+        if options["restart"]:
+            checkpoint.clear()
+        offset = checkpoint.get("offset")
+        if offset is not None and os.path.exists(path):
+            # drop anything written after the last checkpoint, then append from there
+            stream = open_private(path, "r+")
+            stream.truncate(offset)
+            stream.seek(offset)
+            self.stdout.write(f"resuming after {checkpoint.get('exported')} users")
+        else:
+            checkpoint.clear()
+            stream = open_private(path)
+        with stream:
+            exported = export_users(
+                stream, detect_format(path, options["format"]), batch_size=options["batch_size"], checkpoint=checkpoint,
+                progress=lambda count: self.stdout.write(f"{count} users exported"),
+            )
+        self.stdout.write(self.style.SUCCESS(f"done: {exported} users exported"))
@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from user_app.bulk import Checkpoint, detect_format, import_users
+
+
+class Command(BaseCommand):
+    help = "Bulk create users, tokens and profiles from a CSV or NDJSON file (email, password or password_hash, display_name)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV with a header row, or NDJSON with one object per line")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="default from the file extension")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--workers", type=int, help="password hashing processes, default one per CPU, 0 hashes in-process")
+        parser.add_argument("--copy", action="store_true", help="insert with COPY instead of bulk_create (PostgreSQL only)")
+        parser.add_argument("--checkpoint", help="checkpoint file, default <path>.checkpoint")
+        parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the first row")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if options["copy"] and connection.vendor != "postgresql":
+            raise CommandError("--copy needs PostgreSQL")
+        checkpoint = Checkpoint(options["checkpoint"] or f"{path}.checkpoint")
+        if options["restart"]:
+            checkpoint.clear()
+        if checkpoint.get("source", path) != path:
+            raise CommandError(f"checkpoint belongs to {checkpoint.get('source')}, pass --restart to discard it")
+        if checkpoint.get("rows"):
+            self.stdout.write(f"resuming after row {checkpoint.get('rows')}")
+        checkpoint.save(source=path)
+        start = time.monotonic()
+        resumed_at = checkpoint.get("rows", 0)
+
+        def progress(stats):
+            rate = (stats.rows - resumed_at) / max(time.monotonic() - start, 1e-6)
+            self.stdout.write(f"{stats.rows} rows: {stats.created} created, {stats.existing} existing, {len(stats.errors)} invalid ({rate:.0f} rows/s)")
+
+        with open(path, newline="") as stream:
+            stats = import_users(
+                stream, detect_format(path, options["format"]), batch_size=options["batch_size"], workers=options["workers"],
+                use_copy=options["copy"], checkpoint=checkpoint, progress=progress,
+            )
+        for line, problems in stats.errors:
+            self.stderr.write(f"line {line}: " + "; ".join(f"{name}: {' '.join(messages)}" for name, messages in problems.items()))
+        self.stdout.write(self.style.SUCCESS(f"done: {stats.created} created, {stats.existing} existing, {len(stats.errors)} invalid"))
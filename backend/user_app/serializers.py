@@ -1,7 +1,8 @@
 from rest_framework.serializers import ModelSerializer
+from core_app.instrumentation import TimedSerializerMixin
 from .models import User
 
-class UserSerializer(ModelSerializer):
+class UserSerializer(TimedSerializerMixin, ModelSerializer):
     class Meta:
         model = User
         fields = ["email", "password"]
\ No newline at end of file
@@ -0,0 +1,23 @@
+from django.contrib.auth import alogin, login, logout
+from django.contrib.auth.signals import user_logged_in
+
+
+def session_login(request, user):
+    '''login() where sessions are installed; token-only API workers just send user_logged_in'''
+    if hasattr(request, "session"):
+        login(request, user)
+    else:
+        # keeps last_login and the bootstrap build that hang off the signal
+        user_logged_in.send(sender=user.__class__, request=request, user=user)
+
+
+async def asession_login(request, user):
+    if hasattr(request, "session"):
+        await alogin(request, user)
+    else:
+        await user_logged_in.asend(sender=user.__class__, request=request, user=user)
+
+
+def session_logout(request):
+    if hasattr(request, "session"):
+        logout(request)
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import token_cache
+from .models import User
+
+
+@receiver(post_delete, sender=Token)
+def drop_deleted_token(sender, instance, **kwargs):
+    # logout, account deletion and admin deletes all remove the token row
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def drop_tokens_for_changed_user(sender, instance, update_fields=None, **kwargs):
+    # login() only touches last_login which doesn't affect authentication
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    keys = Token.objects.filter(user_id=instance.pk).values_list("key", flat=True)
+    token_cache.invalidate_user(instance.pk, keys)
@@ -1,3 +1,262 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+from django.conf import settings
+from django.core.management import call_command
+from django.test import AsyncClient, Client, TestCase, TransactionTestCase, override_settings
+from django.urls import path
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from core_app.instrumentation import registry
+from core_app.throttling import get_store
+from profile_app.models import Profile
+from affiliation_app.async_views import AsyncAllAffiliations
+from affiliation_app.models import Affiliation
+from affiliation_app.views import AllAffiliations
+from profile_app.async_views import AsyncCurrentUserProfile, AsyncDisplayName
+from profile_app.views import CurrentUserProfile, DisplayName
+from .async_views import AsyncInfo, AsyncLogin, AsyncRegister
+from .views import Info
+from .bulk import Checkpoint, import_users
+from .hashing import hashing_pool
+from .authentication import token_cache
+from .models import User
 
 # Create your tests here.
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username="a@a.com", email="a@a.com", password="pass12345!")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_warm_info_makes_no_queries(self):
+        self.client.get("/api/v1/users/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/v1/users/")
+        self.assertEqual(response.data, "a@a.com")
+
+    def test_logout_invalidates_token(self):
+        self.client.get("/api/v1/users/")
+        self.client.post("/api/v1/users/logout/")
+        response = self.client.get("/api/v1/users/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivated_user_is_dropped(self):
+        self.client.get("/api/v1/users/")
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get("/api/v1/users/")
+        self.assertEqual(response.status_code, 401)
+
+
+urlpatterns = [
+    path("register/", AsyncRegister.as_view()),
+    path("login/", AsyncLogin.as_view()),
+    path("sync/users/", Info.as_view()),
+    path("sync/profile/", CurrentUserProfile.as_view()),
+    path("sync/display_name/", DisplayName.as_view()),
+    path("sync/affiliations/", AllAffiliations.as_view()),
+    path("async/users/", AsyncInfo.as_view()),
+    path("async/profile/", AsyncCurrentUserProfile.as_view()),
+    path("async/display_name/", AsyncDisplayName.as_view()),
+    path("async/affiliations/", AsyncAllAffiliations.as_view()),
+]
+
+
+@override_settings(ROOT_URLCONF="user_app.tests")
+class AsyncAuthViewTests(TransactionTestCase):
+    async def test_register_then_login(self):
+        client = AsyncClient()
+        response = await client.post("/register/", {"email": "b@b.com", "password": "pass12345!"}, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["user"], "b@b.com")
+        response = await client.post("/login/", {"email": "b@b.com", "password": "pass12345!"}, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(await Token.objects.filter(key=response.json()["token"]).aexists())
+        response = await client.post("/login/", {"email": "b@b.com", "password": "wrong"}, content_type="application/json")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_saturated_pool_sheds_with_503(self):
+        with patch.object(hashing_pool, "_pending", hashing_pool.max_workers + hashing_pool.max_queue):
+            response = await AsyncClient().post("/login/", {"email": "b@b.com", "password": "x"}, content_type="application/json")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+    @override_settings(THROTTLE_STORE="memory", THROTTLE_RATES={"login_account": "1/min"})
+    async def test_throttled_with_429(self):
+        get_store().clear()
+        statuses = []
+        for _ in range(2):
+            response = await AsyncClient().post("/login/", {"email": "z@b.com", "password": "x"}, content_type="application/json")
+            statuses.append(response.status_code)
+        get_store().clear()
+        self.assertEqual(statuses, [404, 429])
+
+
+class AsyncSchemaTests(TestCase):
+    def test_async_routes_stay_documented(self):
+        import os
+        import subprocess
+        import sys
+        script = (
+            "import django; django.setup();"
+            "from django.urls import resolve; from drf_yasg.generators import OpenAPISchemaGenerator;"
+            "from publiceyeusa.urls import api_info;"
+            "print(resolve('/api/v1/users/login/').func.view_class.__name__);"
+            "paths = OpenAPISchemaGenerator(api_info()).get_schema(request=None, public=True)['paths'];"
+            "print(sorted(p for p in ('/users/', '/users/login/', '/users/register/', '/profile/', '/profile/display_name/', '/affiliations/') if p in paths))"
+        )
+        env = {**os.environ, "DB_ENGINE": "sqlite", "DJANGO_KEY": "x", "ASYNC_AUTH_VIEWS": "True", "ASYNC_READ_VIEWS": "True"}
+        result = subprocess.run([sys.executable, "-c", script], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split("\n", 1), ["AsyncLogin", str(sorted(["/users/", "/users/login/", "/users/register/", "/profile/", "/profile/display_name/", "/affiliations/"])) + "\n"])
+
+
+@override_settings(ROOT_URLCONF="user_app.tests")
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        user = User.objects.create_user(username="r@r.com", email="r@r.com", password="pass12345!")
+        self.auth = {"Authorization": f"Token {Token.objects.create(user=user).key}"}
+        profile = Profile.objects.create(user=user, display_name="reader")
+        profile.affiliations.set(Affiliation.objects.bulk_create([Affiliation(category=f"Party {i}") for i in range(3)]))
+
+    async def test_same_bytes_as_sync_views(self):
+        client = AsyncClient()
+        for name in ("users", "profile", "display_name", "affiliations"):
+            sync = await client.get(f"/sync/{name}/", headers={"Accept": "application/json", **self.auth})
+            asynchronous = await client.get(f"/async/{name}/", headers=self.auth)
+            self.assertEqual(asynchronous.status_code, 200, name)
+            self.assertEqual(asynchronous.content, sync.content, name)
+        etag = asynchronous["ETag"]
+        response = await client.get("/async/affiliations/", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        response = await client.get("/async/affiliations/", {"limit": 2, "fields": "category"})
+        self.assertEqual(response.json()["results"], [{"category": "Party 0"}, {"category": "Party 1"}])
+
+    async def test_unauthenticated(self):
+        client = AsyncClient()
+        for headers in ({}, {"Authorization": "Token nope"}, {"Authorization": "Token a b"}):
+            sync = await client.get("/sync/profile/", headers={"Accept": "application/json", **headers})
+            asynchronous = await client.get("/async/profile/", headers=headers)
+            self.assertEqual(asynchronous.status_code, 401)
+            self.assertEqual(asynchronous.content, sync.content)
+            self.assertEqual(asynchronous["WWW-Authenticate"], "Token")
+
+    def test_warm_reads_make_no_queries(self):
+        client = Client()
+        client.get("/async/users/", headers=self.auth)
+        client.get("/async/affiliations/")
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get("/async/users/", headers=self.auth).json(), "r@r.com")
+            self.assertEqual(client.get("/async/affiliations/").status_code, 200)
+
+
+@override_settings(THROTTLE_STORE="memory", THROTTLE_RATES={"login_ip": "3/min", "login_account": "2/min", "register_ip": "1/hour"})
+class ThrottleTests(TestCase):
+    def setUp(self):
+        get_store().clear()
+        registry.reset()
+        User.objects.create_user(username="t@t.com", email="t@t.com", password="pass12345!")
+
+    def tearDown(self):
+        get_store().clear()
+
+    def login(self, email, **extra):
+        return APIClient().post("/api/v1/users/login/", {"email": email, "password": "wrong"}, format="json", **extra)
+
+    def test_account_limit_applies_across_addresses(self):
+        self.assertEqual(self.login("t@t.com", REMOTE_ADDR="10.0.0.1").status_code, 404)
+        self.assertEqual(self.login("T@t.com", REMOTE_ADDR="10.0.0.2").status_code, 404)
+        response = self.login("t@t.com", REMOTE_ADDR="10.0.0.3")
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(int(response["Retry-After"]) >= 1)
+        self.assertEqual(registry.snapshot()["events"], {"throttled": {"login_account": 1}})
+
+    def test_ip_limit(self):
+        statuses = [self.login(f"{i}@t.com").status_code for i in range(4)]
+        self.assertEqual(statuses, [404, 404, 404, 429])
+        # another address is unaffected
+        self.assertEqual(self.login("9@t.com", REMOTE_ADDR="10.0.0.9").status_code, 404)
+
+    def test_forwarded_for_is_not_trusted_without_proxies(self):
+        statuses = [self.login(f"{i}@t.com", HTTP_X_FORWARDED_FOR=f"10.1.0.{i}").status_code for i in range(4)]
+        self.assertEqual(statuses, [404, 404, 404, 429])
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}):
+            # behind one proxy the last hop is the client, whatever it claims before that
+            self.assertEqual(self.login("8@t.com", HTTP_X_FORWARDED_FOR="10.9.9.9, 10.2.0.1").status_code, 404)
+
+    def test_register_limit(self):
+        first = APIClient().post("/api/v1/users/register/", {"email": "n@t.com", "password": "pass12345!"}, format="json")
+        second = APIClient().post("/api/v1/users/register/", {"email": "m@t.com", "password": "pass12345!"}, format="json")
+        self.assertEqual((first.status_code, second.status_code), (201, 429))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class BulkUserCommandTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = Path(directory.name)
+
+    def write(self, name, text):
+        path = self.dir / name
+        path.write_text(text)
+        return str(path)
+
+    def call(self, *args):
+        out, err = io.StringIO(), io.StringIO()
+        call_command(*args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_csv_creates_users_tokens_profiles(self):
+        User.objects.create_user(username="old@a.com", email="old@a.com", password="pass12345!")
+        path = self.write("users.csv", "email,password,display_name\nn1@a.com,pass12345!,first\nold@a.com,x,\nbad,x,\nn2@a.com,pass12345!,\n")
+        out, err = self.call("import_users", path, "--workers", "2", "--batch-size", "2")
+        self.assertIn("2 created, 1 existing, 1 invalid", out)
+        self.assertIn("line 4: email", err)
+        user = User.objects.get(email="n1@a.com")
+        self.assertTrue(user.check_password("pass12345!"))
+        self.assertTrue(Token.objects.filter(user=user).exists())
+        self.assertEqual(Profile.objects.get(user=user).display_name, "first")
+        self.assertFalse(Path(f"{path}.checkpoint").exists())
+
+    def test_import_resumes_from_checkpoint(self):
+        path = self.write("users.ndjson", "".join(json.dumps({"email": f"r{i}@a.com", "password": "p"}) + "\n" for i in range(5)))
+        # the first two rows were committed by an earlier run
+        Checkpoint(f"{path}.checkpoint").save(source=path, rows=2, created=2, existing=0)
+        out, err = self.call("import_users", path, "--workers", "0")
+        self.assertIn("resuming after row 2", out)
+        self.assertEqual(sorted(User.objects.values_list("email", flat=True)), ["r2@a.com", "r3@a.com", "r4@a.com"])
+
+    def test_export_round_trips_through_import(self):
+        for i in range(5):
+            user = User.objects.create_user(username=f"e{i}@a.com", email=f"e{i}@a.com", password="pass12345!")
+            Profile.objects.create(user=user, display_name=f"name {i}")
+        path = str(self.dir / "users.ndjson")
+        self.call("export_users", path, "--batch-size", "2")
+        # password hashes, so owner only
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+        rows = [json.loads(line) for line in open(path)]
+        self.assertEqual([row["email"] for row in rows], [f"e{i}@a.com" for i in range(5)])
+        User.objects.all().delete()
+        self.call("import_users", path, "--workers", "0")
+        self.assertTrue(User.objects.get(email="e3@a.com").check_password("pass12345!"))
+        self.assertEqual(Profile.objects.get(user__email="e3@a.com").display_name, "name 3")
+
+    def test_export_resume_drops_rows_after_checkpoint(self):
+        for i in range(3):
+            User.objects.create_user(username=f"x{i}@a.com", email=f"x{i}@a.com", password="p")
+        first = User.objects.order_by("id").first()
+        path = self.write("users.csv", "email,password_hash,display_name\nx0@a.com,h,\npartial")
+        Checkpoint(f"{path}.checkpoint").save(last_id=first.id, exported=1, offset=len(open(path).read()) - len("partial"))
+        os.chmod(path, 0o644)
+        self.call("export_users", path)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+        lines = open(path).read().splitlines()
+        self.assertEqual([line.split(",")[0] for line in lines], ["email", "x0@a.com", "x1@a.com", "x2@a.com"])
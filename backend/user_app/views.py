@@ -9,12 +9,14 @@ from rest_framework.status import (
     HTTP_400_BAD_REQUEST,
 )
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.authentication import TokenAuthentication
+from .authentication import CachedTokenAuthentication, token_cache
+from core_app.throttling import AUTH_THROTTLES
+from profile_app.bootstrap import invalidate_bootstrap
 from django.core.exceptions import ValidationError
 from .models import User
-from django.contrib.auth import authenticate, login, logout
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from django.contrib.auth import authenticate
+from .sessions import session_login, session_logout
+from core_app.docs import openapi, swagger_auto_schema
 
 # Create your views here.
 
@@ -26,7 +28,7 @@ def create_user_or_return_exception(request):
         new_user.full_clean()
         new_user = User.objects.create_user(**data)
         token = Token.objects.create(user= new_user)
-        login(request, new_user)
+        session_login(request, new_user)
         return [new_user, token]
     except ValidationError as e:
         print(e.message_dict)
@@ -34,6 +36,9 @@ def create_user_or_return_exception(request):
 
 
 class Admin(APIView):
+    throttle_classes = AUTH_THROTTLES
+    throttle_scope = "register"
+
     @swagger_auto_schema(auto_schema=None)
     def post(self, request):
         creds_or_err = create_user_or_return_exception(request)
@@ -47,6 +52,9 @@ class Admin(APIView):
 
 
 class Register(APIView):
+    throttle_classes = AUTH_THROTTLES
+    throttle_scope = "register"
+
     @swagger_auto_schema(
         operation_summary="User sign-up",
         operation_description="Register a new user.",
@@ -71,6 +79,9 @@ class Register(APIView):
         return Response(creds_or_err.message_dict, status=HTTP_400_BAD_REQUEST)
         
 class Login(APIView):
+    throttle_classes = AUTH_THROTTLES
+    throttle_scope = "login"
+
     @swagger_auto_schema(
         operation_summary="User login",
         operation_description="Log in an existing user.",
@@ -90,12 +101,12 @@ class Login(APIView):
         user = authenticate(username=data.get("username"), password=data.get("password"))
         if user:
             token, created = Token.objects.get_or_create(user = user)
-            login(request, user)
+            session_login(request, user)
             return Response({"user":user.email, "token":token.key}, status=HTTP_200_OK)
         return Response("Invalid credentials.", status=HTTP_404_NOT_FOUND)
     
 class TokenReq(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
     
 class Info(TokenReq):
@@ -115,8 +126,9 @@ class Logout(TokenReq):
         responses={204: "User logged out successfully."},
     )
     def post(self, request):
+        token_cache.invalidate(request.auth.key)
         request.user.auth_token.delete()
-        logout(request)
+        session_logout(request)
         return Response("User logged out successfully.", status=HTTP_204_NO_CONTENT)
 
 class DeleteUser(TokenReq):
@@ -128,8 +140,10 @@ class DeleteUser(TokenReq):
     def delete(self, request):
         try:
             user = request.user
+            token_cache.invalidate_user(user.pk, [request.auth.key])
+            invalidate_bootstrap(user.pk)
             user.delete()
-            logout(request)
+            session_logout(request)
             return Response("User account deleted successfully", status=HTTP_204_NO_CONTENT)
         except HTTP_404_NOT_FOUND:
             return Response("User not found", status=HTTP_404_NOT_FOUND)
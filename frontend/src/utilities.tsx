@@ -97,4 +97,17 @@ export const getAffilations = async () => {
   const response = await api.get("affiliations/");
   const affiliations = response.data;
   return affiliations;
-};
\ No newline at end of file
+};
+
+// run several api calls in one round trip, e.g. batchRequests([{ path: "profile/" }, { path: "affiliations/" }])
+// resolves to [{ status, body }] in the same order
+export const batchRequests = async (requests) => {
+  const response = await api.post("batch/", { requests });
+  return response.data.responses;
+};
+
+// user, profile, display name and affiliations in one cached response, right after login
+export const getSessionBootstrap = async () => {
+  const response = await api.get("profile/bootstrap/");
+  return response.data;
+};